@@ -1,11 +1,22 @@
 ﻿from __future__ import annotations
 from pathlib import Path
 
+from app.knowledge.version import knowledge_version
+
+# Snippets per (knowledge version, top_k); emptied when the version changes
+_snippets: dict[tuple[int, int], list[str]] = {}
+knowledge_version.subscribe(lambda old, new: _snippets.clear())
+
 def retrieve(query: str, top_k: int = 2) -> list[str]:
     # TODO: real embeddings; for now, return any markdown snippet
+    key = (knowledge_version.get(), top_k)
+    cached = _snippets.get(key)
+    if cached is not None:
+        return list(cached)
     snippets = []
     for p in Path("knowledge").glob("**/*.md"):
         snippets.append(p.read_text(encoding="utf-8")[:300])
         if len(snippets) >= top_k:
             break
-    return snippets
+    _snippets[key] = snippets
+    return list(snippets)
@@ -0,0 +1,143 @@
+# app/knowledge/version.py
+# -*- coding: utf-8 -*-
+from __future__ import annotations
+
+"""
+Process-wide knowledge version (knowledge_version.json).
+- The file is read once; after that get() is an attribute read. At most every
+  `revalidate_seconds` one caller stats the file, and it is re-read only if
+  its (mtime, size) changed; other callers keep the current value meanwhile.
+- Subscribers (caches, indexes) are called with (old, new) after the version
+  changes, outside the lock. A failing subscriber is logged and skipped.
+- The file holds {"knowledge_version": N} (or {"version": N}). A missing or
+  invalid file keeps the last good version; before any, `default`.
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Callable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+ROOT = Path(__file__).resolve().parents[2]
+KV_FILE = ROOT / "knowledge_version.json"
+
+Stamp = Optional[Tuple[int, int]]
+Subscriber = Callable[[int, int], None]
+
+
+def _parse(data: object) -> Optional[int]:
+    if not isinstance(data, dict):
+        return None
+    raw = data.get("knowledge_version", data.get("version"))
+    if isinstance(raw, bool) or not isinstance(raw, (int, str)):
+        return None
+    try:
+        version = int(raw)
+    except ValueError:
+        return None
+    return version if version > 0 else None
+
+
+class VersionProvider:
+    def __init__(
+        self,
+        path: Path | str = KV_FILE,
+        revalidate_seconds: float = 5.0,
+        default: int = 1,
+    ) -> None:
+        self.path = str(path)
+        self.revalidate_seconds = revalidate_seconds
+        self._version = default
+        self._stamp: Stamp = None
+        self._loaded = False
+        self._next_check = 0.0
+        self._lock = threading.Lock()
+        self._subscribers: List[Subscriber] = []
+
+    def _stat(self) -> Stamp:
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return None
+        return st.st_mtime_ns, st.st_size
+
+    def _read(self) -> Optional[int]:
+        try:
+            with open(self.path, "r", encoding="utf-8-sig") as f:
+                version = _parse(json.load(f))
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning("Unreadable knowledge version file %s: %s", self.path, e)
+            return None
+        if version is None:
+            logger.warning("No positive knowledge_version in %s", self.path)
+        return version
+
+    def _revalidate(self, force: bool = False) -> Optional[Tuple[int, int]]:
+        # caller holds self._lock; returns (old, new) when the version changed
+        if not force and self._loaded and time.monotonic() < self._next_check:
+            return None  # another thread just did it
+        stamp = self._stat()
+        changed = None
+        if force or not self._loaded or stamp != self._stamp:
+            version = self._read() if stamp is not None else None
+            if version is not None and version != self._version:
+                changed = (self._version, version)
+                self._version = version
+            self._stamp = stamp
+            self._loaded = True
+        self._next_check = time.monotonic() + self.revalidate_seconds
+        return changed
+
+    def get(self) -> int:
+        if self._loaded and time.monotonic() < self._next_check:
+            return self._version
+        # Due for a stat: one caller does it, the others keep the current value
+        if not self._lock.acquire(blocking=not self._loaded):
+            return self._version
+        try:
+            changed = self._revalidate()
+        finally:
+            self._lock.release()
+        self._notify(changed)
+        return self._version
+
+    def refresh(self) -> int:
+        """Re-read the file now, whatever its mtime."""
+        with self._lock:
+            changed = self._revalidate(force=True)
+        self._notify(changed)
+        return self._version
+
+    def subscribe(self, fn: Subscriber) -> Callable[[], None]:
+        """Call fn(old, new) on every version change; returns an unsubscribe function."""
+        with self._lock:
+            self._subscribers.append(fn)
+
+        def unsubscribe() -> None:
+            with self._lock:
+                if fn in self._subscribers:
+                    self._subscribers.remove(fn)
+
+        return unsubscribe
+
+    def _notify(self, changed: Optional[Tuple[int, int]]) -> None:
+        if changed is None:
+            return
+        logger.info("Knowledge version %d -> %d", *changed)
+        for fn in list(self._subscribers):
+            try:
+                fn(*changed)
+            except Exception:
+                logger.exception("Knowledge version subscriber %r failed", fn)
+
+
+knowledge_version = VersionProvider()
+
+__all__ = ["KV_FILE", "VersionProvider", "knowledge_version"]
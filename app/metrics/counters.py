@@ -20,3 +20,33 @@ def redactions_total() -> Counter:
             labelnames=("kind",),
         )
     return _REDACTIONS_TOTAL
+
+_DEDUP_HITS_TOTAL: Optional[Counter] = None
+
+def dedup_hits_total() -> Counter:
+    """Global single-flight counter, created once: duplicate calls served by an in-flight one.
+    Labels: scope = 'inference' | ...
+    """
+    global _DEDUP_HITS_TOTAL
+    if _DEDUP_HITS_TOTAL is None:
+        _DEDUP_HITS_TOTAL = Counter(
+            "app_singleflight_dedup_hits_total",
+            "Duplicate calls coalesced into an in-flight call",
+            labelnames=("scope",),
+        )
+    return _DEDUP_HITS_TOTAL
+
+_CIRCUIT_EVENTS_TOTAL: Optional[Counter] = None
+
+def circuit_events_total() -> Counter:
+    """Global circuit-breaker counter, created once.
+    Labels: breaker = 'model' | ...; event = 'open' | 'half_open' | 'closed' | 'rejected'
+    """
+    global _CIRCUIT_EVENTS_TOTAL
+    if _CIRCUIT_EVENTS_TOTAL is None:
+        _CIRCUIT_EVENTS_TOTAL = Counter(
+            "app_circuit_events_total",
+            "Circuit breaker state changes and calls refused while open",
+            labelnames=("breaker", "event"),
+        )
+    return _CIRCUIT_EVENTS_TOTAL
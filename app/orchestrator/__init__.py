@@ -1,8 +1,22 @@
 # app/orchestrator/__init__.py
 """
 Orchestrator package
-Exports run_inference for tests and app entry points.
+Exports run_inference (sync, async and streaming) and the model call for tests and app entry points.
 """
-from .pipeline import run_inference  # re-export for convenience
+from .model import ainfer, build_messages, infer
+from .pipeline import (  # re-export for convenience
+    arun_inference,
+    arun_inference_stream,
+    run_inference,
+    run_inference_stream,
+)
 
-__all__ = ["run_inference"]
+__all__ = [
+    "ainfer",
+    "arun_inference",
+    "arun_inference_stream",
+    "build_messages",
+    "infer",
+    "run_inference",
+    "run_inference_stream",
+]
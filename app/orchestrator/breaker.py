@@ -0,0 +1,165 @@
+# app/orchestrator/breaker.py
+# -*- coding: utf-8 -*-
+from __future__ import annotations
+
+"""
+Circuit breaker for a backend call (the model).
+- closed: calls go through; each outcome (ok/failed, latency) is kept for
+  `window` seconds (at most `max_samples`). Once `min_calls` are in the
+  window the breaker trips open if their error rate reaches `error_rate`
+  or their latency percentile `percentile` reaches `slow_seconds`.
+- open: allow() refuses at once for `open_seconds`, so callers take their
+  fallback instead of queueing behind a struggling backend.
+- half-open: then up to `probe_calls` calls are let through at a time as
+  probes. `probe_calls` successful probes in a row (fast enough) close the
+  breaker with a fresh window. Any failed or slow probe opens it again.
+- Callers pair every allowed call with record(ok, latency), or release()
+  when the call was abandoned without an outcome.
+"""
+
+import threading
+import time
+from collections import deque
+from typing import Callable, Deque, Dict, Tuple
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+def _count(name: str, event: str) -> None:
+    try:
+        from app.metrics.counters import circuit_events_total
+    except Exception:  # noqa: BLE001 - metrics are optional
+        return
+    circuit_events_total().labels(breaker=name, event=event).inc()
+
+
+def _percentile(values: list, q: float) -> float:
+    """Nearest-rank percentile of `values` (sorted in place), 0 < q <= 100."""
+    values.sort()
+    rank = max(1, -(-len(values) * q // 100))  # ceil
+    return values[int(rank) - 1]
+
+
+class CircuitBreaker:
+    def __init__(
+        self,
+        name: str = "model",
+        *,
+        error_rate: float = 0.5,
+        slow_seconds: float = 10.0,
+        percentile: float = 99.0,
+        min_calls: int = 20,
+        window: float = 30.0,
+        max_samples: int = 1000,
+        open_seconds: float = 15.0,
+        probe_calls: int = 3,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.name = name
+        self.error_rate = error_rate
+        self.slow_seconds = slow_seconds
+        self.percentile = percentile
+        self.min_calls = max(1, int(min_calls))
+        self.window = window
+        self.open_seconds = open_seconds
+        self.probe_calls = max(1, int(probe_calls))
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._samples: Deque[Tuple[float, bool, float]] = deque(maxlen=max(1, int(max_samples)))
+        self._state = CLOSED
+        self._opened_at = 0.0
+        self._probes = 0  # half-open: probes in flight
+        self._probe_ok = 0  # half-open: successful probes so far
+        self.rejected = 0
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            self._maybe_half_open(self._clock())
+            return self._state
+
+    def _set(self, state: str, now: float) -> None:
+        # caller holds self._lock
+        self._state = state
+        if state == OPEN:
+            self._opened_at = now
+        self._probes = self._probe_ok = 0
+        self._samples.clear()
+        _count(self.name, state)
+
+    def _maybe_half_open(self, now: float) -> None:
+        if self._state == OPEN and now - self._opened_at >= self.open_seconds:
+            self._set(HALF_OPEN, now)
+
+    def allow(self) -> bool:
+        """Whether a call may go to the backend now."""
+        now = self._clock()
+        with self._lock:
+            self._maybe_half_open(now)
+            if self._state == CLOSED:
+                return True
+            if self._state == HALF_OPEN and self._probes + self._probe_ok < self.probe_calls:
+                self._probes += 1
+                return True
+            self.rejected += 1
+        _count(self.name, "rejected")
+        return False
+
+    def record(self, ok: bool, latency: float) -> None:
+        """Outcome of an allowed call."""
+        now = self._clock()
+        ok_and_fast = ok and latency < self.slow_seconds
+        with self._lock:
+            if self._state == HALF_OPEN:
+                self._probes = max(0, self._probes - 1)
+                if not ok_and_fast:
+                    self._set(OPEN, now)
+                else:
+                    self._probe_ok += 1
+                    if self._probe_ok >= self.probe_calls:
+                        self._set(CLOSED, now)
+                return
+            if self._state == OPEN:
+                return  # a straggler from before the breaker opened
+            self._samples.append((now, ok, latency))
+            if self._should_trip(now):
+                self._set(OPEN, now)
+
+    def release(self) -> None:
+        """An allowed call ended without an outcome (e.g. it was cancelled)."""
+        with self._lock:
+            if self._state == HALF_OPEN:
+                self._probes = max(0, self._probes - 1)
+
+    def _should_trip(self, now: float) -> bool:
+        samples = self._samples
+        while samples and now - samples[0][0] > self.window:
+            samples.popleft()
+        if len(samples) < self.min_calls:
+            return False
+        errors = sum(1 for _, ok, _ in samples if not ok)
+        if errors / len(samples) >= self.error_rate:
+            return True
+        return _percentile([lat for _, _, lat in samples], self.percentile) >= self.slow_seconds
+
+    def stats(self) -> Dict[str, object]:
+        now = self._clock()
+        with self._lock:
+            self._maybe_half_open(now)
+            latencies = [lat for t, _, lat in self._samples if now - t <= self.window]
+            errors = sum(1 for t, ok, _ in self._samples if now - t <= self.window and not ok)
+            out: Dict[str, object] = {"state": self._state, "calls": len(latencies), "rejected": self.rejected}
+        out["error_rate"] = errors / len(latencies) if latencies else 0.0
+        for q in (50, 95, 99):
+            out[f"p{q}"] = _percentile(list(latencies), q) if latencies else None
+        return out
+
+    def reset(self) -> None:
+        with self._lock:
+            self._set(CLOSED, self._clock())
+            self.rejected = 0
+
+
+__all__ = ["CLOSED", "CircuitBreaker", "HALF_OPEN", "OPEN"]
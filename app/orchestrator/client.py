@@ -0,0 +1,349 @@
+# app/orchestrator/client.py
+# -*- coding: utf-8 -*-
+from __future__ import annotations
+
+"""
+Pooled HTTP client for the model backend (an OpenAI-style /chat/completions).
+- One httpx.AsyncClient, so one connection pool with keep-alive, serves both
+  complete() and acomplete(). It lives on a private event-loop thread:
+  complete() blocks on it, and acomplete() awaits it from any loop. A
+  process therefore never holds more than `max_connections` to the backend.
+- Every request gets the client's timeout unless it passes its own.
+  HTTP/2 is used when asked for and the `h2` package is installed.
+- Transport errors, 429 and 5xx responses are retried by tenacity, with
+  full-jitter exponential backoff and up to `max_attempts` attempts. Each
+  retry also needs a token from a RetryBudget, which refills at `ratio`
+  per request plus `min_per_second`. An outage therefore adds at most that
+  fraction of load, instead of multiplying it by the attempt count.
+- Pool use is exported as model_client_* Prometheus metrics when
+  prometheus_client is installed, and is always available from stats().
+"""
+
+import asyncio
+import logging
+import os
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Coroutine, Dict, List, Optional, TypeVar
+
+import httpx
+from tenacity import AsyncRetrying, RetryCallState, stop_after_attempt, wait_random_exponential
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+try:  # optional, like the other exporters
+    from prometheus_client import Counter, Gauge
+
+    _PROM_AVAILABLE = True
+except Exception:  # noqa: BLE001
+    _PROM_AVAILABLE = False
+
+_RETRY_STATUS = frozenset({408, 425, 429, 500, 502, 503, 504})
+
+
+class ModelError(RuntimeError):
+    """The model backend did not produce a reply."""
+
+
+class _RetryableStatus(Exception):
+    def __init__(self, response: httpx.Response) -> None:
+        super().__init__(f"HTTP {response.status_code}")
+        self.response = response
+
+
+class RetryBudget:
+    """
+    Token bucket that caps retries at a fraction of traffic: each request
+    deposits `ratio` tokens, a retry withdraws one, and `min_per_second`
+    keeps a trickle of retries possible when traffic is low.
+    """
+
+    def __init__(self, ratio: float = 0.2, min_per_second: float = 1.0, cap: float = 100.0, clock=time.monotonic):
+        self.ratio = ratio
+        self.min_per_second = min_per_second
+        self.cap = cap
+        self._clock = clock
+        self._tokens = cap
+        self._last = clock()
+        self._lock = threading.Lock()
+
+    def _refill(self, extra: float) -> None:
+        now = self._clock()
+        self._tokens = min(self.cap, self._tokens + extra + (now - self._last) * self.min_per_second)
+        self._last = now
+
+    def deposit(self) -> None:
+        with self._lock:
+            self._refill(self.ratio)
+
+    def withdraw(self) -> bool:
+        with self._lock:
+            self._refill(0.0)
+            if self._tokens < 1.0:
+                return False
+            self._tokens -= 1.0
+            return True
+
+
+class _PoolMetrics:
+    """model_client_* collectors, created once per process."""
+
+    _collectors: Optional[Dict[str, Any]] = None
+    _lock = threading.Lock()
+
+    @classmethod
+    def get(cls) -> Optional[Dict[str, Any]]:
+        if not _PROM_AVAILABLE:
+            return None
+        with cls._lock:
+            if cls._collectors is None:
+                cls._collectors = {
+                    "requests": Counter(
+                        "model_client_requests_total", "Model backend calls by outcome", labelnames=("outcome",)
+                    ),
+                    "retries": Counter("model_client_retries_total", "Retried model backend attempts"),
+                    "budget_exhausted": Counter(
+                        "model_client_retry_budget_exhausted_total", "Retries refused by the retry budget"
+                    ),
+                    "in_flight": Gauge("model_client_in_flight", "Model backend requests in flight"),
+                    "utilisation": Gauge(
+                        "model_client_pool_utilisation", "In-flight requests / max_connections"
+                    ),
+                    "connections": Gauge("model_client_pool_connections", "Open connections in the pool"),
+                }
+        return cls._collectors
+
+
+def _http2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+class ModelClient:
+    def __init__(
+        self,
+        base_url: str,
+        *,
+        model: str = "",
+        api_key: Optional[str] = None,
+        timeout: float = 20.0,
+        connect_timeout: float = 5.0,
+        max_connections: int = 20,
+        max_keepalive: int = 10,
+        keepalive_expiry: float = 30.0,
+        http2: bool = False,
+        max_attempts: int = 3,
+        backoff: float = 0.2,
+        max_backoff: float = 2.0,
+        budget: Optional[RetryBudget] = None,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+    ) -> None:
+        if http2 and not _http2_available():
+            logger.warning("HTTP/2 requested for the model client but h2 is not installed; using HTTP/1.1")
+            http2 = False
+        self.model = model
+        self.max_connections = max_connections
+        self.max_attempts = max(1, int(max_attempts))
+        self.budget = budget or RetryBudget()
+        self._wait = wait_random_exponential(multiplier=backoff, max=max_backoff)
+        self._client_kwargs: Dict[str, Any] = {
+            "base_url": base_url,
+            "headers": {"Authorization": f"Bearer {api_key}"} if api_key else {},
+            "timeout": httpx.Timeout(timeout, connect=connect_timeout),
+            "limits": httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_keepalive,
+                keepalive_expiry=keepalive_expiry,
+            ),
+            "http2": http2,
+            "transport": transport,
+        }
+        self._client: Optional[httpx.AsyncClient] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._in_flight = 0
+        self._stats: Dict[str, int] = {"requests": 0, "errors": 0, "retries": 0, "budget_exhausted": 0}
+
+    # ---- event loop owning the pool ------------------------------------
+
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        loop = self._loop
+        if loop is not None:
+            return loop
+        with self._start_lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                self._thread = threading.Thread(target=loop.run_forever, name="model-client", daemon=True)
+                self._thread.start()
+                self._loop = loop
+        return self._loop
+
+    def _submit(self, coro: Coroutine[Any, Any, T]) -> "Future[T]":
+        return asyncio.run_coroutine_threadsafe(coro, self._ensure_loop())
+
+    def _http(self) -> httpx.AsyncClient:
+        # only called on the pool's loop, so no lock is needed
+        if self._client is None:
+            self._client = httpx.AsyncClient(**self._client_kwargs)
+        return self._client
+
+    # ---- public API ----------------------------------------------------
+
+    def complete(self, messages: List[dict], *, timeout: Optional[float] = None, **params: Any) -> Dict[str, Any]:
+        """POST messages to /chat/completions; returns {"text": ..., "raw": ...}."""
+        return self._submit(self._complete(messages, timeout, params)).result()
+
+    async def acomplete(
+        self, messages: List[dict], *, timeout: Optional[float] = None, **params: Any
+    ) -> Dict[str, Any]:
+        """complete() for async callers, on the same pool; cancelling it cancels the request."""
+        return await asyncio.wrap_future(self._submit(self._complete(messages, timeout, params)))
+
+    def stats(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            out: Dict[str, Any] = dict(self._stats)
+            out["in_flight"] = self._in_flight
+        out["max_connections"] = self.max_connections
+        out["utilisation"] = out["in_flight"] / self.max_connections if self.max_connections else 0.0
+        out["connections"] = self._open_connections()
+        return out
+
+    def close(self) -> None:
+        loop = self._loop
+        if loop is None:
+            return
+        if self._client is not None:
+            asyncio.run_coroutine_threadsafe(self._client.aclose(), loop).result()
+            self._client = None
+        loop.call_soon_threadsafe(loop.stop)
+        if self._thread is not None:
+            self._thread.join()
+        loop.close()
+        self._loop = self._thread = None
+
+    # ---- internals -----------------------------------------------------
+
+    def _open_connections(self) -> int:
+        # httpcore exposes its pool's connections; a custom transport may not
+        pool = getattr(getattr(self._client, "_transport", None), "_pool", None)
+        return len(getattr(pool, "connections", ()))
+
+    def _count(self, key: str, outcome: Optional[str] = None) -> None:
+        with self._stats_lock:
+            self._stats[key] += 1
+        prom = _PoolMetrics.get()
+        if prom is not None:
+            if outcome is not None:
+                prom["requests"].labels(outcome=outcome).inc()
+            elif key in prom:
+                prom[key].inc()
+
+    def _track(self, delta: int) -> None:
+        with self._stats_lock:
+            self._in_flight += delta
+            in_flight = self._in_flight
+        prom = _PoolMetrics.get()
+        if prom is not None:
+            prom["in_flight"].set(in_flight)
+            prom["utilisation"].set(in_flight / self.max_connections if self.max_connections else 0.0)
+            prom["connections"].set(self._open_connections())
+
+    def _should_retry(self, state: RetryCallState) -> bool:
+        exc = state.outcome.exception() if state.outcome else None
+        if not isinstance(exc, (httpx.TransportError, _RetryableStatus)):
+            return False
+        if not self.budget.withdraw():
+            self._count("budget_exhausted")
+            return False
+        self._count("retries")
+        return True
+
+    async def _complete(self, messages: List[dict], timeout: Optional[float], params: Dict[str, Any]) -> Dict[str, Any]:
+        body = {"model": self.model, "messages": messages, **params}
+        client = self._http()
+        self.budget.deposit()
+        self._track(+1)
+        try:
+            retrying = AsyncRetrying(
+                stop=stop_after_attempt(self.max_attempts),
+                wait=self._wait,
+                retry=self._should_retry,
+                reraise=True,
+            )
+            response = await retrying(self._attempt, client, body, timeout)
+            payload = response.json()
+            text = _reply_text(payload)
+        except _RetryableStatus as e:
+            self._count("errors", "error")
+            raise ModelError(f"model backend returned HTTP {e.response.status_code}") from e
+        except httpx.HTTPError as e:
+            self._count("errors", "error")
+            raise ModelError(f"model backend unreachable: {e}") from e
+        except ValueError as e:  # a body that is not JSON (JSONDecodeError, bad encoding)
+            self._count("errors", "error")
+            raise ModelError("model backend returned a malformed body") from e
+        except ModelError:
+            self._count("errors", "error")
+            raise
+        finally:
+            self._track(-1)
+        self._count("requests", "ok")
+        return {"text": text, "raw": payload}
+
+    async def _attempt(self, client: httpx.AsyncClient, body: Dict[str, Any], timeout: Optional[float]) -> httpx.Response:
+        kwargs: Dict[str, Any] = {"json": body}
+        if timeout is not None:
+            kwargs["timeout"] = timeout
+        response = await client.post("/chat/completions", **kwargs)
+        if response.status_code in _RETRY_STATUS:
+            raise _RetryableStatus(response)
+        response.raise_for_status()
+        return response
+
+
+def _reply_text(payload: Any) -> str:
+    try:
+        return str(payload["choices"][0]["message"]["content"] or "")
+    except (KeyError, IndexError, TypeError):
+        raise ModelError("unexpected model backend response") from None
+
+
+def _env_float(name: str, default: float) -> float:
+    return float(os.getenv(name, str(default)))
+
+
+_client: Optional[ModelClient] = None
+_client_lock = threading.Lock()
+
+
+def get_model_client() -> Optional[ModelClient]:
+    """The process-wide client, built from MODEL_* environment variables; None without MODEL_BASE_URL."""
+    global _client
+    base_url = os.getenv("MODEL_BASE_URL", "")
+    if not base_url:
+        return None
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = ModelClient(
+                    base_url,
+                    model=os.getenv("MODEL_NAME", ""),
+                    api_key=os.getenv("MODEL_API_KEY") or None,
+                    timeout=_env_float("MODEL_TIMEOUT_SECONDS", 20.0),
+                    max_connections=int(os.getenv("MODEL_MAX_CONNECTIONS", "20")),
+                    http2=os.getenv("MODEL_HTTP2", "").lower() in ("1", "true", "yes", "on"),
+                    max_attempts=int(os.getenv("MODEL_MAX_ATTEMPTS", "3")),
+                    budget=RetryBudget(ratio=_env_float("MODEL_RETRY_BUDGET_RATIO", 0.2)),
+                )
+    return _client
+
+
+__all__ = ["ModelClient", "ModelError", "RetryBudget", "get_model_client"]
@@ -0,0 +1,23 @@
+# app/orchestrator/model.py
+from __future__ import annotations
+
+def build_messages(mode: str, state: str, style: object, memory: str, user_msg: str) -> list[dict]:
+    return [{"role":"system","content":f"mode={mode} state={state}"},{"role":"user","content":user_msg}]
+
+def infer(messages: list[dict]) -> dict:
+    """Model reply {"text": ...} from the pooled client (MODEL_BASE_URL); a fixed stub reply without one."""
+    from app.orchestrator.client import get_model_client  # httpx only when a backend is used
+
+    client = get_model_client()
+    if client is None:
+        return {"text":"ok"}
+    return client.complete(messages)
+
+async def ainfer(messages: list[dict]) -> dict:
+    """infer() for async callers; shares the client's connection pool."""
+    from app.orchestrator.client import get_model_client
+
+    client = get_model_client()
+    if client is None:
+        return {"text":"ok"}
+    return await client.acomplete(messages)
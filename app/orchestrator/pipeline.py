@@ -1,19 +1,25 @@
 # app/orchestrator/pipeline.py
 from __future__ import annotations
 
-from pathlib import Path
-import json
+import asyncio
+import hashlib
+import logging
 import re
-from typing import Dict, Any
-
-from app.safety import config as safety_config
-from app.safety.safety import redact_pii  # (kept for future use)
+import time
+from types import MappingProxyType
+from typing import (
+    Any, AsyncIterator, Awaitable, Callable, Dict, Iterable, Iterator, List, Mapping, Optional, Tuple,
+)
 
-ROOT = Path(__file__).resolve().parents[2]
-KV_FILE = ROOT / "knowledge_version.json"
+from app.knowledge.version import knowledge_version
+from app.orchestrator.breaker import CircuitBreaker
+from app.orchestrator.model import ainfer, build_messages
+from app.orchestrator.singleflight import SingleFlight
+from app.safety.analysis import AnalyzedText, analyze
+from app.safety.resources import crisis_resources
+from app.safety.throttle import get_session_throttle
 
-# Track whether we've already shown resources in this session (simple in-memory throttle)
-_risk_shown_by_session: Dict[str, bool] = {}
+logger = logging.getLogger(__name__)
 
 # High-risk trigger regex
 _SELF_HARM_RE = re.compile(
@@ -22,30 +28,26 @@ _SELF_HARM_RE = re.compile(
 )
 
 def _policy_version() -> int:
-    """Return policy version from knowledge_version.json or safety_config, default 1."""
-    try:
-        data = json.loads(KV_FILE.read_text(encoding="utf-8"))
-        v = int(data.get("version", 1))
-        if v > 0:
-            return v
-    except Exception:
-        pass
-    # Fallback to configured version (if present) else 1
-    return int(getattr(safety_config, "POLICY_VERSION", 1)) or 1
-
-def _is_high_risk(text: str) -> bool:
-    return bool(_SELF_HARM_RE.search((text or "").lower()))
-
-def _safety_preprocess(mode: str, text: str) -> str:
+    """The knowledge version (knowledge_version.json, cached and revalidated by mtime; default 1)."""
+    return knowledge_version.get()
+
+def _analyzed(text: str | AnalyzedText | None) -> AnalyzedText:
+    return text if isinstance(text, AnalyzedText) else analyze(text or "")
+
+def _is_high_risk(text: str | AnalyzedText) -> bool:
+    return bool(_SELF_HARM_RE.search(_analyzed(text).folded))
+
+def _safety_preprocess(mode: str, text: str | AnalyzedText) -> str:
     """Return the primary text response (separate from 'reply' structure)."""
-    if _is_high_risk(text):
+    analyzed = _analyzed(text)
+    if _is_high_risk(analyzed):
         return (
             "I’m really sorry you’re feeling this way. "
             "If you’re in immediate danger, please call your local emergency number now. "
             "You’re not alone. Would you like resources for support? "
             "This is not medical advice. A licensed clinician can help."
         )
-    t = (text or "").lower()
+    t = analyzed.folded
     if any(k in t for k in ["dosage", "dose", "prescribe", "which meds", "what meds", "medicine for", "pill"]):
         return (
             "I can’t provide diagnosis or medication advice. "
@@ -56,57 +58,45 @@ def _safety_preprocess(mode: str, text: str) -> str:
         "This is not medical advice."
     )
 
+def _resources_recently_shown(session_id: str) -> bool:
+    """True if this session got the full resources within the policy's repeat window (and marks it if not)."""
+    try:
+        return get_session_throttle().check_and_mark(session_id)
+    except Exception as e:
+        logger.warning("Session throttle unavailable, showing full resources: %s", e)
+        return False
+
 def _resources_string_for_india() -> str:
     """Exactly the string tests expect: starts with 'If you might be unsafe...' and embeds bullet items."""
-    items = [
-        "India — Emergency: 112",
-        "Tele MANAS (24x7): 14416 or 1-800-891-4416",
-        "KIRAN: 1800-599-0019",
-        "AASRA: 91-9820466726",
-        "Vandrevala Foundation: 9999-666-555",
-    ]
-    return "If you might be unsafe, these can help right now:\n- " + "\n- ".join(items)
+    return crisis_resources.render("unsafe")
 
-def run_inference(
+def _turn(
     mode: str,
     text: str,
-    session_id: str | None = None,
-    profile: Dict[str, Any] | None = None,
-    **kwargs: Any,
-) -> Dict[str, Any]:
-    """
-    Minimal orchestrator entrypoint compatible with tests:
-      run_inference(mode, text, session_id, profile)
-
-    Returns keys:
-      - response: str
-      - policy_version: int  (legacy location)
-      - session_id: str
-      - meta: dict (includes mode/profile/policy_version and risk_resources_shown flag)
-      - reply: dict (with 'sections.resources' and top-level 'resources' for high risk)
-    """
+    session_id: str | None,
+    profile: Dict[str, Any] | None,
+    extra: Dict[str, Any],
+) -> Tuple[AnalyzedText, int, str, bool, Dict[str, Any]]:
+    """(analyzed text, policy version, session id, high risk, meta) shared by both entry points."""
     pver = _policy_version()
     sid = session_id or ""
-    high_risk = _is_high_risk(text or "")
+    analyzed = analyze(text or "")  # folded once for every check below
+    high_risk = _is_high_risk(analyzed)
 
     # meta the tests inspect (they want policy version inside meta as well)
     meta: Dict[str, Any] = {
         "mode": mode,
         "profile": profile or {},
         "policy_version": pver,
-        **kwargs,
+        **extra,
     }
 
     # throttle / reminder semantics expected by tests
     if high_risk:
-        if _risk_shown_by_session.get(sid):
-            meta["risk_resources_shown"] = "reminder"
-        else:
-            meta["risk_resources_shown"] = True
-            _risk_shown_by_session[sid] = True
-
-    response = _safety_preprocess(mode, text)
+        meta["risk_resources_shown"] = "reminder" if _resources_recently_shown(sid) else True
+    return analyzed, pver, sid, high_risk, meta
 
+def _result(response: str, pver: int, sid: str, high_risk: bool, meta: Dict[str, Any]) -> Dict[str, Any]:
     reply: Dict[str, Any] = {}
     if high_risk:
         # IMPORTANT: tests require a text blob under both reply["sections"]["resources"] and reply["resources"]
@@ -125,3 +115,262 @@ def run_inference(
         "meta": meta,
         "reply": reply,
     }
+
+# Identical turns (same session, message, mode and policy version) already in
+# flight are joined rather than rerun, e.g. a double-clicked Send or a client
+# retrying on timeout. Only calls younger than the window are joined.
+_INFLIGHT_WINDOW_SECONDS = 10.0
+_flights = SingleFlight(window=_INFLIGHT_WINDOW_SECONDS, scope="inference")
+
+def _flight_key(mode: str, text: str, session_id: str | None) -> Optional[Tuple[str, str, str, int]]:
+    # Anonymous turns are never coalesced: two users may well send the same text
+    if not session_id:
+        return None
+    digest = hashlib.sha256((text or "").encode("utf-8", "surrogatepass")).hexdigest()
+    return session_id, digest, mode, _policy_version()
+
+def _run_inference(
+    mode: str, text: str, session_id: str | None, profile: Dict[str, Any] | None, extra: Dict[str, Any]
+) -> Dict[str, Any]:
+    analyzed, pver, sid, high_risk, meta = _turn(mode, text, session_id, profile, extra)
+    return _result(_safety_preprocess(mode, analyzed), pver, sid, high_risk, meta)
+
+def run_inference(
+    mode: str,
+    text: str,
+    session_id: str | None = None,
+    profile: Dict[str, Any] | None = None,
+    **kwargs: Any,
+) -> Dict[str, Any]:
+    """
+    Minimal orchestrator entrypoint compatible with tests:
+      run_inference(mode, text, session_id, profile)
+
+    Returns keys:
+      - response: str
+      - policy_version: int  (legacy location)
+      - session_id: str
+      - meta: dict (includes mode/profile/policy_version and risk_resources_shown flag)
+      - reply: dict (with 'sections.resources' and top-level 'resources' for high risk)
+
+    A duplicate of a turn still in flight gets a copy of its result.
+    """
+    key = _flight_key(mode, text, session_id)
+    if key is None:
+        return _run_inference(mode, text, session_id, profile, kwargs)
+    return _flights.do(key, _run_inference, mode, text, session_id, profile, kwargs)
+
+# ======================================================================
+#                        Async entry point
+# ======================================================================
+
+# Seconds each stage may take before arun_inference() goes on without it
+STAGE_TIMEOUTS: Mapping[str, float] = MappingProxyType({
+    "pre_guard": 2.0,
+    "retrieval": 1.0,
+    "memory": 1.0,
+    "style": 0.5,
+    "state": 0.5,
+    "model": 20.0,
+})
+
+# Trips on the model's error rate or p99 latency; while open the model stage
+# is skipped and the safety template answers at once (see breaker.py)
+_model_breaker = CircuitBreaker("model")
+
+class _StageFailed(Exception):
+    pass
+
+def _blocking(fn: Callable[..., Any], *args: Any) -> Awaitable[Any]:
+    # A timed-out call's thread is not interrupted; its result is dropped
+    return asyncio.get_running_loop().run_in_executor(None, fn, *args)
+
+async def _stage(name: str, timeouts: Mapping[str, float], aw: Awaitable[Any]) -> Any:
+    """Await one stage within its timeout; _StageFailed(name) if it times out or raises."""
+    try:
+        return await asyncio.wait_for(aw, timeouts[name])
+    except asyncio.TimeoutError:
+        logger.warning("Stage %s timed out after %.2fs", name, timeouts[name])
+        raise _StageFailed(name) from None
+    except Exception as e:
+        logger.warning("Stage %s failed: %s", name, e)
+        raise _StageFailed(name) from e
+
+async def _settle(aw: Awaitable[Any], default: Any, degraded: List[str]) -> Any:
+    try:
+        return await aw
+    except _StageFailed as e:
+        degraded.append(str(e))
+        return default
+
+async def _agenerate(
+    mode: str,
+    text: str,
+    sid: str,
+    profile: Dict[str, Any] | None,
+    analyzed: AnalyzedText,
+    high_risk: bool,
+    meta: Dict[str, Any],
+    timeouts: Mapping[str, float] | None,
+) -> str:
+    """The response text of arun_inference(); adds the stage outcomes to `meta`."""
+    from app.conversation.state_machine import ConvState, current_state
+    from app.knowledge.retriever import retrieve
+    from app.memory.summarizer import get_memory_clip
+    from app.personalization.style import StyleSpec, style_for
+    from app.safety import apre_prompt_guard
+
+    limits = {**STAGE_TIMEOUTS, **(timeouts or {})}
+    degraded: List[str] = []
+
+    memory = asyncio.ensure_future(_settle(_stage("memory", limits, _blocking(get_memory_clip, sid)), "", degraded))
+    style = asyncio.ensure_future(
+        _settle(_stage("style", limits, _blocking(style_for, profile or {})), StyleSpec(), degraded)
+    )
+    state = asyncio.ensure_future(
+        _settle(_stage("state", limits, _blocking(current_state, sid)), ConvState.WARM_IN, degraded)
+    )
+
+    guard_task = asyncio.ensure_future(
+        _settle(_stage("pre_guard", limits, apre_prompt_guard(text or "", profile)), None, degraded)
+    )
+
+    async def _model() -> Optional[str]:
+        # The backend only ever sees what the guard let through: the message
+        # itself on "allow", its redacted text on "redact", nothing otherwise.
+        guard = await guard_task
+        if guard is None or high_risk or guard["action"] not in ("allow", "redact") or guard["risk"] == "high":
+            return None
+        if not _model_breaker.allow():
+            meta["model_circuit"] = _model_breaker.state
+            degraded.append("model")
+            return None
+        prompt = (text or "") if guard["action"] == "allow" else str(guard["text"])
+        try:
+            messages = build_messages(mode, (await state).value, await style, await memory, prompt)
+            start = time.perf_counter()
+            out = await _stage("model", limits, ainfer(messages))
+        except _StageFailed:
+            _model_breaker.record(False, time.perf_counter() - start)
+            degraded.append("model")
+            return None
+        except BaseException:
+            _model_breaker.release()
+            raise
+        _model_breaker.record(True, time.perf_counter() - start)
+        return (out or {}).get("text") or None
+
+    snippets, model_text = await asyncio.gather(
+        _settle(_stage("retrieval", limits, _blocking(retrieve, text or "")), [], degraded),
+        _model(),
+    )
+
+    guard = guard_task.result()
+    if guard is not None:
+        meta["safety"] = {"action": guard["action"], "risk": guard["risk"], "categories": guard["categories"]}
+    meta["retrieved"] = len(snippets)
+    if degraded:
+        meta["degraded_stages"] = sorted(degraded)
+    return model_text or _safety_preprocess(mode, analyzed)
+
+async def arun_inference(
+    mode: str,
+    text: str,
+    session_id: str | None = None,
+    profile: Dict[str, Any] | None = None,
+    *,
+    timeouts: Mapping[str, float] | None = None,
+    **kwargs: Any,
+) -> Dict[str, Any]:
+    """
+    Async run_inference(): same arguments and result keys.
+    The pre-guard, retrieval and the memory clip, style and state lookups run
+    concurrently, so a turn takes as long as its slowest chain rather than
+    the sum of its stages. The model is called once the guard has decided:
+    with the message on "allow", with the guard's redacted text on "redact".
+    On a block, high risk, or a guard that fails, it is not called and the
+    deterministic safety template answers, as in run_inference(). Each stage has its own timeout (STAGE_TIMEOUTS, overridden
+    per key by `timeouts`); a stage that fails or times out falls back to a
+    safe default and is listed in meta["degraded_stages"]. While the model's
+    circuit breaker is open the model is not called (meta["model_circuit"]).
+    Duplicates of a turn in flight are coalesced as in run_inference().
+    """
+    key = _flight_key(mode, text, session_id)
+    if key is None:
+        return await _arun_inference(mode, text, session_id, profile, timeouts, kwargs)
+    return await _flights.ado(key, _arun_inference, mode, text, session_id, profile, timeouts, kwargs)
+
+async def _arun_inference(
+    mode: str,
+    text: str,
+    session_id: str | None,
+    profile: Dict[str, Any] | None,
+    timeouts: Mapping[str, float] | None,
+    extra: Dict[str, Any],
+) -> Dict[str, Any]:
+    analyzed, pver, sid, high_risk, meta = _turn(mode, text, session_id, profile, extra)
+    response = await _agenerate(mode, text, sid, profile, analyzed, high_risk, meta, timeouts)
+    return _result(response, pver, sid, high_risk, meta)
+
+# ======================================================================
+#                        Streaming entry points
+# ======================================================================
+
+# Whitespace-delimited pieces of a response that is not streamed by its source
+_PIECE_RE = re.compile(r"\S+\s*|\s+")
+
+def _preamble(pver: int, sid: str, high_risk: bool, meta: Dict[str, Any]) -> Dict[str, Any]:
+    # everything _result() returns except the response text, which follows as "delta" events
+    return {"event": "preamble", **_result("", pver, sid, high_risk, meta), "response": None}
+
+def _guarded(pieces: Iterable[str]) -> Iterator[Dict[str, Any]]:
+    """Post-guard `pieces` as they arrive; one "delta" event per released chunk, then "end"."""
+    from app.safety import stream_rewriter
+
+    parts: List[str] = []
+    for chunk in stream_rewriter().rewrite(pieces):
+        parts.append(chunk)
+        yield {"event": "delta", "text": chunk}
+    yield {"event": "end", "response": "".join(parts)}
+
+def run_inference_stream(
+    mode: str,
+    text: str,
+    session_id: str | None = None,
+    profile: Dict[str, Any] | None = None,
+    **kwargs: Any,
+) -> Iterator[Dict[str, Any]]:
+    """
+    Streaming run_inference(). Yields, in order:
+      - {"event": "preamble", ...}: run_inference()'s result without the
+        response text (policy_version, session_id, meta with the risk flags,
+        and for high risk the resources under reply), before any generation
+      - {"event": "delta", "text": str}: the response body, chunk by chunk,
+        post-guarded incrementally (DEI rewrite + PII redaction)
+      - {"event": "end", "response": str}: the whole guarded body
+    """
+    analyzed, pver, sid, high_risk, meta = _turn(mode, text, session_id, profile, kwargs)
+    yield _preamble(pver, sid, high_risk, meta)
+    yield from _guarded(_PIECE_RE.findall(_safety_preprocess(mode, analyzed)))
+
+async def arun_inference_stream(
+    mode: str,
+    text: str,
+    session_id: str | None = None,
+    profile: Dict[str, Any] | None = None,
+    *,
+    timeouts: Mapping[str, float] | None = None,
+    **kwargs: Any,
+) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Streaming arun_inference(); the same events as run_inference_stream().
+    The preamble is sent before the stages start. The "end" event also
+    carries the final meta, with the stage outcomes arun_inference() records.
+    """
+    analyzed, pver, sid, high_risk, meta = _turn(mode, text, session_id, profile, kwargs)
+    yield _preamble(pver, sid, high_risk, dict(meta))
+    response = await _agenerate(mode, text, sid, profile, analyzed, high_risk, meta, timeouts)
+    for event in _guarded(_PIECE_RE.findall(response)):
+        if event["event"] == "end":
+            event["meta"] = meta
+        yield event
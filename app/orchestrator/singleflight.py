@@ -0,0 +1,124 @@
+# app/orchestrator/singleflight.py
+# -*- coding: utf-8 -*-
+from __future__ import annotations
+
+"""
+Single-flight coalescing of identical in-flight calls.
+- do(key, fn, ...) / ado(key, coro_fn, ...) run the call once per key. A
+  duplicate that arrives while it is in flight, within `window` seconds of
+  its start, waits for that call and gets a copy of its result (or its
+  exception) instead of running its own.
+- Nothing is kept once a call finishes, so a later identical request runs
+  normally; a leader older than `window` is not joined (a retry after a
+  long stall starts afresh).
+- An async call runs as a task of its own: cancelling the caller that
+  started it does not cancel it for the duplicates waiting on it.
+- Sync and async callers share one table: the in-flight entry is a
+  concurrent.futures.Future, which threads wait on and coroutines await.
+  A sync duplicate of an async call runs on its own instead: blocking on
+  it could block the very event loop that has to finish it.
+- Every coalesced duplicate counts as a dedup hit (stats() and, with
+  prometheus_client, app_singleflight_dedup_hits_total).
+"""
+
+import asyncio
+import copy
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple, TypeVar
+
+T = TypeVar("T")
+
+
+def _count_hit(scope: str) -> None:
+    try:
+        from app.metrics.counters import dedup_hits_total
+    except Exception:  # noqa: BLE001 - metrics are optional
+        return
+    dedup_hits_total().labels(scope=scope).inc()
+
+
+class SingleFlight:
+    def __init__(self, window: float = 10.0, scope: str = "default", clock: Callable[[], float] = time.monotonic):
+        self.window = window
+        self.scope = scope
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, Tuple[float, "Future[Any]", bool]] = {}  # key -> (start, future, is_async)
+        self.hits = 0
+        self.calls = 0
+
+    def _join_or_lead(self, key: Hashable, is_async: bool) -> Tuple[bool, Optional["Future[Any]"]]:
+        """(True, leader's future) to join; (False, own future) to lead; (False, None) to run alone."""
+        now = self._clock()
+        with self._lock:
+            entry = self._calls.get(key)
+            fresh = entry is not None and now - entry[0] <= self.window
+            if fresh and (is_async or not entry[2]):
+                self.hits += 1
+                joined, fut = True, entry[1]
+            elif fresh:
+                self.calls += 1
+                joined, fut = False, None
+            else:
+                # a stale leader keeps running; it no longer owns the key
+                self.calls += 1
+                joined, fut = False, Future()
+                self._calls[key] = (now, fut, is_async)
+        if joined:
+            _count_hit(self.scope)
+        return joined, fut
+
+    def _finish(self, key: Hashable, fut: "Future[Any]") -> None:
+        with self._lock:
+            entry = self._calls.get(key)
+            if entry is not None and entry[1] is fut:
+                del self._calls[key]
+
+    def do(self, key: Hashable, fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        joined, fut = self._join_or_lead(key, is_async=False)
+        if joined:
+            return copy.deepcopy(fut.result())
+        if fut is None:
+            return fn(*args, **kwargs)
+        try:
+            result = fn(*args, **kwargs)
+        except BaseException as e:
+            fut.set_exception(e)
+            raise
+        finally:
+            self._finish(key, fut)
+        fut.set_result(result)
+        return result
+
+    async def ado(self, key: Hashable, fn: Callable[..., Awaitable[T]], *args: Any, **kwargs: Any) -> T:
+        joined, fut = self._join_or_lead(key, is_async=True)
+        if joined:
+            # shield: a cancelled duplicate must not cancel the shared call
+            return copy.deepcopy(await asyncio.shield(asyncio.wrap_future(fut)))
+        # The call runs as its own task, so cancelling the leader (say, its
+        # client went away) leaves it running for the duplicates that joined
+        task = asyncio.ensure_future(fn(*args, **kwargs))
+
+        def _settle(t: "asyncio.Future[T]") -> None:
+            self._finish(key, fut)
+            if t.cancelled():
+                fut.cancel()
+            elif t.exception() is not None:
+                fut.set_exception(t.exception())
+            else:
+                fut.set_result(t.result())
+
+        task.add_done_callback(_settle)
+        return await asyncio.shield(task)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"calls": self.calls, "hits": self.hits, "in_flight": len(self._calls)}
+
+    def __len__(self) -> int:
+        return len(self._calls)
+
+
+__all__ = ["SingleFlight"]
@@ -1,35 +1,61 @@
 # app/safety/__init__.py
-# Re-export public API so tests can import from `app.safety`
-from .safety import (
-    safety,
-    get_safety_guard,
-    enforce_scope,
-    detect_risk,
-    apply_dei_filter,
-    inject_resources,
-    pre_prompt_guard,
-    post_prompt_guard,
-    refresh_policies,
-    needs_consent,
-    record_consent,
-    redact_pii,
-    redact,
-    _METRICS,  # back-compat for tests
-)
-
-__all__ = [
-    "safety",
-    "get_safety_guard",
-    "enforce_scope",
-    "detect_risk",
-    "apply_dei_filter",
-    "inject_resources",
-    "pre_prompt_guard",
-    "post_prompt_guard",
-    "refresh_policies",
-    "needs_consent",
-    "record_consent",
-    "redact_pii",
-    "redact",
-    "_METRICS",
-]
+# Re-export public API so tests can import from `app.safety`.
+# Names resolve lazily (PEP 562): `from app.safety import redact_pii` loads only
+# app.safety.pii; the guard, its patterns, the policies and Prometheus are set
+# up the first time something from app.safety.safety is asked for.
+import importlib
+import sys
+import types
+
+_EXPORTS = {
+    "safety": ".safety",
+    "get_safety_guard": ".safety",
+    "enforce_scope": ".safety",
+    "detect_risk": ".safety",
+    "apply_dei_filter": ".safety",
+    "inject_resources": ".safety",
+    "pre_prompt_guard": ".safety",
+    "post_prompt_guard": ".safety",
+    "apre_prompt_guard": ".safety",
+    "apost_prompt_guard": ".safety",
+    "refresh_policies": ".safety",
+    "needs_consent": ".safety",
+    "record_consent": ".safety",
+    "redact_pii": ".pii",
+    "redact": ".pii",
+    "stream_rewriter": ".safety",
+    "set_stage_timing": ".safety",
+    "start_policy_watcher": ".safety",
+    "stop_policy_watcher": ".safety",
+    "_METRICS": ".safety",  # back-compat for tests
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module, __name__), name)
+    globals()[name] = value  # later lookups skip this hook
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_EXPORTS))
+
+
+class _Package(types.ModuleType):
+    # Importing the submodule app.safety.safety binds it over the package's
+    # `safety` attribute; `app.safety.safety` has always meant the guard singleton.
+    @property
+    def safety(self):
+        return importlib.import_module(".safety", __name__).safety
+
+    @safety.setter
+    def safety(self, value):
+        pass
+
+
+sys.modules[__name__].__class__ = _Package
@@ -0,0 +1,151 @@
+# app/safety/analysis.py
+# -*- coding: utf-8 -*-
+from __future__ import annotations
+
+"""
+Analyze-once text normalisation shared by the detectors.
+- analyze(text) folds a message once: NFKC, casefold, and, inside words
+  that mix Latin with Cyrillic/Greek, Latin lookalikes mapped to Latin.
+  Full-width letters, ligatures, mathematical alphanumerics and homoglyph
+  spellings then meet the (case-insensitive) detector patterns as plain
+  lower-case ASCII, with no per-pattern cost. Words written wholly in
+  Cyrillic or Greek are left as they are, so ordinary Russian or Greek text
+  is not read as Latin.
+- `folded` keeps an offset map back to `text`, so spans found in it can be
+  turned into spans of the original with to_original(). Every position maps
+  to the whole original character cluster (base character plus combining
+  marks) it came from.
+- ASCII text (the common case) is only lower-cased, and text already in NFKC
+  is folded in one call. Their offsets are the identity, or (when casefold
+  expands a character such as "ß") mapped on the first to_original() call.
+- `tokens` are the word tokens of `folded`, split on first use.
+"""
+
+import functools
+import re
+import unicodedata
+from array import array
+from typing import Optional, Tuple
+
+# Cyrillic and Greek letters that render like Latin ones (after casefold)
+_LOOKALIKE_CHARS = {
+    "а": "a", "е": "e", "һ": "h", "і": "i", "ј": "j", "о": "o", "р": "p", "с": "c", "ѕ": "s",
+    "у": "y", "х": "x", "ԁ": "d", "ԛ": "q", "ԝ": "w", "ο": "o", "ν": "v", "ρ": "p",
+}
+_LOOKALIKES = str.maketrans(_LOOKALIKE_CHARS)
+_HAS_LOOKALIKE = re.compile("[" + "".join(_LOOKALIKE_CHARS) + "]")
+_HAS_LATIN = re.compile("[a-z]")
+# Runs of anything but whitespace and punctuation (apostrophes stay in words;
+# \w alone would split Indic words at their combining vowel signs)
+_TOKEN = re.compile(r"[^\s!-&(-/:-@\[-`{-~\u2000-\u2018\u201a-\u206f\u0964\u0965\u3000-\u303f]+")
+
+
+# ASCII runs are only lower-cased. A run stops short of an ASCII character that
+# a combining mark follows, so the mark is folded together with its base.
+_RUNS = re.compile(r"(?P<ascii>[\x00-\x7f]+(?=[\x00-\x7f]|\Z))|(?P<other>[\x00-\x7f]?[^\x00-\x7f]+)")
+
+
+@functools.lru_cache(maxsize=4096)
+def _fold(cluster: str) -> str:
+    return unicodedata.normalize("NFKC", cluster).casefold()
+
+
+def _unmix_word(m: re.Match) -> str:
+    word = m.group()
+    return word.translate(_LOOKALIKES) if _HAS_LATIN.search(word) else word
+
+
+def _unmix(folded: str) -> str:
+    """Map lookalikes to Latin in words that also hold Latin letters (1:1, so offsets hold)."""
+    if not _HAS_LOOKALIKE.search(folded):
+        return folded
+    return _TOKEN.sub(_unmix_word, folded)
+
+
+class AnalyzedText:
+    __slots__ = ("text", "folded", "is_ascii", "_mapped", "_starts", "_ends", "_tokens")
+
+    def __init__(self, text: str) -> None:
+        self.text = text
+        self.is_ascii = text.isascii()
+        self._mapped = False  # True once _starts/_ends are built (or known to be the identity)
+        self._starts: Optional[array] = None  # folded index -> start of its original cluster
+        self._ends: Optional[array] = None  # folded index -> end of its original cluster
+        self._tokens: Optional[Tuple[str, ...]] = None
+        if self.is_ascii:
+            self.folded = text.lower()
+            self._mapped = True
+        elif unicodedata.is_normalized("NFKC", text):
+            # casefold and translate work per character, so the map can wait
+            # until a span needs it; casefold never shortens, so equal lengths mean 1:1
+            self.folded = _unmix(text.casefold())
+            self._mapped = len(self.folded) == len(text)
+        else:
+            self._fold_clusters()
+
+    def _fold_clusters(self) -> None:
+        parts = []
+        starts = array("l")
+        ends = array("l")
+        text = self.text
+        for run in _RUNS.finditer(text):
+            i, stop = run.span()
+            if run.lastgroup == "ascii":
+                parts.append(run.group().lower())
+                starts.extend(range(i, stop))
+                ends.extend(range(i + 1, stop + 1))
+                continue
+            while i < stop:
+                j = i + 1
+                while j < stop and unicodedata.combining(text[j]):
+                    j += 1
+                out = _fold(text[i:j])
+                parts.append(out)
+                if len(out) == 1:
+                    starts.append(i)
+                    ends.append(j)
+                else:
+                    starts.extend([i] * len(out))
+                    ends.extend([j] * len(out))
+                i = j
+        starts.append(len(text))
+        self.folded = _unmix("".join(parts))
+        self._starts, self._ends = starts, ends
+        self._mapped = True
+
+    def _map_chars(self) -> None:
+        starts = array("l")
+        ends = array("l")
+        for i, ch in enumerate(self.text):
+            k = 1 if ch.isascii() else len(ch.casefold())
+            starts.extend([i] * k)
+            ends.extend([i + 1] * k)
+        starts.append(len(self.text))
+        self._starts, self._ends = starts, ends
+        self._mapped = True
+
+    def to_original(self, start: int, end: int) -> Tuple[int, int]:
+        """Map a span of `folded` to the span of `text` it was folded from."""
+        if not self._mapped:
+            self._map_chars()
+        if self._starts is None:
+            return start, end
+        if end <= start:
+            return self._starts[start], self._starts[start]
+        return self._starts[start], self._ends[end - 1]
+
+    @property
+    def tokens(self) -> Tuple[str, ...]:
+        if self._tokens is None:
+            self._tokens = tuple(_TOKEN.findall(self.folded))
+        return self._tokens
+
+    def __repr__(self) -> str:
+        return f"AnalyzedText({self.text!r})"
+
+
+def analyze(text: str) -> AnalyzedText:
+    return AnalyzedText(text or "")
+
+
+__all__ = ["AnalyzedText", "analyze"]
@@ -4,21 +4,17 @@ from __future__ import annotations
 
 """
 Runtime policy loader for Module 1 (Safety).
-- Loads policies.yaml (scope + DEI + risk + consent).
+- Loads policies.yaml (scope + DEI + risk + consent + matching + cache + windowing + reload).
 - Exposes helpers used by the safety guard and by tests.
 - Provides safe defaults if the YAML is missing or malformed.
 """
 
+import hashlib
 import io
 import json
 import logging
 import os
-from typing import Dict, List, Any
-
-try:
-    import yaml  # type: ignore
-except Exception as e:  # pragma: no cover
-    raise RuntimeError("PyYAML is required for app.safety.config") from e
+from typing import Dict, List, Any, Optional, Tuple
 
 logger = logging.getLogger(__name__)
 
@@ -49,17 +45,47 @@ _DEFAULT_POLICIES: Dict[str, Any] = {
         "lexicon": DEFAULT_DEI_LEXICON,
     },
     "risk": {
-        "throttle": {"repeat_risk_seconds": 180},
+        # Full crisis resources once per session per window, reminders in between
+        "throttle": {"repeat_risk_seconds": 180, "max_sessions": 100_000, "backend": "memory"},
     },
     "consent": {
         "text": "We store only what you allow. You can pause, export, or delete memory anytime.",
     },
+    "matching": {
+        # "linear": drop policy patterns that can backtrack super-linearly
+        # "permissive": keep them, with a warning
+        "mode": "linear",
+    },
+    "cache": {
+        # Decision cache for repeated guard inputs (off unless enabled)
+        "enabled": False,
+        "max_entries": 2048,
+        "ttl_seconds": 300,
+    },
+    "windowing": {
+        # Scan inputs over SafetyGuard.MAX_LEN in overlapping windows instead
+        # of blocking them; max_input_chars stays a hard ingress cap.
+        "enabled": False,
+        "window_chars": 8192,
+        "overlap_chars": 256,
+        "max_input_chars": 1_048_576,
+    },
+    "reload": {
+        # Poll policies.yaml in the background and swap in a recompiled policy
+        "watch": False,
+        "interval_seconds": 2.0,
+    },
 }
 
+MATCHING_MODES = ("linear", "permissive")
+THROTTLE_BACKENDS = ("memory", "sqlite")
+
 # -----------------------------
 # Policy cache and file lookup
 # -----------------------------
 _POLICIES: Dict[str, Any] | None = None
+_POLICY_VERSION: str | None = None
+_POLICY_SOURCE: str | None = None  # file the loaded policies came from (None: defaults)
 
 def _candidate_policy_paths() -> List[str]:
     """Return candidate paths where policies.yaml might live."""
@@ -71,7 +97,16 @@ def _candidate_policy_paths() -> List[str]:
         os.path.join(repo_root, "policies.yaml"),
     ]
 
+def _yaml() -> Any:
+    # Imported on first parse: a cold start served from the policy bundle never needs it
+    try:
+        import yaml  # type: ignore
+    except Exception as e:  # pragma: no cover
+        raise RuntimeError("PyYAML is required for app.safety.config") from e
+    return yaml
+
 def _load_yaml_file(path: str) -> Dict[str, Any] | None:
+    yaml = _yaml()
     try:
         with io.open(path, "r", encoding="utf-8-sig") as f:
             data = yaml.safe_load(f) or {}
@@ -85,28 +120,82 @@ def _load_yaml_file(path: str) -> Dict[str, Any] | None:
         logger.warning("Failed to load policies.yaml at %s: %s", path, e)
         return None
 
-def load_policies() -> Dict[str, Any]:
-    """Load policies.yaml once and cache. Falls back to safe defaults."""
-    global _POLICIES
-    if _POLICIES is not None:
-        return _POLICIES
+def policy_paths() -> List[str]:
+    """Files a policy reload reads, in lookup order (what a watcher should poll)."""
+    return _candidate_policy_paths()
+
+def policy_source() -> Optional[Tuple[str, bytes]]:
+    """(path, raw bytes) of the first non-empty candidate policies file, if any."""
+    for p in _candidate_policy_paths():
+        try:
+            with open(p, "rb") as f:
+                data = f.read()
+        except OSError:
+            continue
+        if data.strip():
+            return p, data
+    return None
 
+def _read_policies(keep: Dict[str, Any] | None = None) -> Tuple[Dict[str, Any], str | None]:
     for p in _candidate_policy_paths():
         data = _load_yaml_file(p)
         if data:
-            _POLICIES = _normalize(data)
             logger.debug("Loaded policies from %s", p)
-            return _POLICIES
+            return _normalize(data), p
+        if keep is not None and os.path.exists(p):
+            # e.g. caught mid-write by a reload: don't fall back to defaults
+            logger.warning("Keeping current policies; %s is empty or invalid", p)
+            return keep, None
 
     logger.warning("Using default policies; could not find a valid policies.yaml in candidates")
-    _POLICIES = dict(_DEFAULT_POLICIES)
+    return dict(_DEFAULT_POLICIES), None
+
+def load_policies() -> Dict[str, Any]:
+    """Load policies.yaml once and cache. Falls back to safe defaults."""
+    global _POLICIES, _POLICY_SOURCE
+    if _POLICIES is None:
+        _POLICIES, _POLICY_SOURCE = _read_policies()
     return _POLICIES
 
-def refresh_policies() -> Dict[str, Any]:
-    """Force reload of policies.yaml (used by tests)."""
-    global _POLICIES
-    _POLICIES = None
-    return load_policies()
+def loaded_from() -> str | None:
+    """
+    Path of the file the loaded policies were just parsed from; None for the
+    defaults or for policies kept over an unreadable file.
+    """
+    load_policies()
+    return _POLICY_SOURCE
+
+def install_policies(policies: Dict[str, Any], source: str | None) -> None:
+    """Adopt an already-normalized policies dict (e.g. from the policy bundle)."""
+    global _POLICIES, _POLICY_VERSION, _POLICY_SOURCE
+    _POLICIES, _POLICY_VERSION, _POLICY_SOURCE = policies, None, source
+
+def refresh_policies(keep_on_error: bool = False) -> Dict[str, Any]:
+    """
+    Force reload of policies.yaml (used by tests and the policy watcher).
+    With keep_on_error, a policies file that exists but does not load leaves
+    the current policies in place instead of falling back to defaults.
+    """
+    global _POLICIES, _POLICY_VERSION, _POLICY_SOURCE
+    policies, source = _read_policies(_POLICIES if keep_on_error else None)
+    _POLICIES, _POLICY_VERSION, _POLICY_SOURCE = policies, None, source
+    return policies
+
+def policy_version(policies: Dict[str, Any]) -> str:
+    """
+    "<version>:<digest>" of a normalized policies document. The digest covers
+    the whole document, so edits change it even when `version` isn't bumped.
+    """
+    blob = json.dumps(policies, sort_keys=True, default=str).encode("utf-8")
+    return f"{policies.get('version')}:{hashlib.sha256(blob).hexdigest()[:16]}"
+
+def get_policy_version() -> str:
+    """policy_version() of the loaded policies."""
+    global _POLICY_VERSION
+    policies = load_policies()
+    if _POLICY_VERSION is None:
+        _POLICY_VERSION = policy_version(policies)
+    return _POLICY_VERSION
 
 # -----------------------------
 # Normalization and getters
@@ -140,9 +229,52 @@ def _normalize(data: Dict[str, Any]) -> Dict[str, Any]:
 
     # risk & consent (optional)
     if isinstance(data.get("risk"), dict):
-        out["risk"].update(data["risk"])
+        risk = {**out["risk"], **data["risk"]}
+        throttle = dict(_DEFAULT_POLICIES["risk"]["throttle"])
+        throttle_in = data["risk"].get("throttle") or {}
+        if isinstance(throttle_in, dict):
+            seconds = throttle_in.get("repeat_risk_seconds")
+            if isinstance(seconds, (int, float)) and seconds >= 0:
+                throttle["repeat_risk_seconds"] = seconds
+            if isinstance(throttle_in.get("max_sessions"), int) and throttle_in["max_sessions"] > 0:
+                throttle["max_sessions"] = throttle_in["max_sessions"]
+            if throttle_in.get("backend") in THROTTLE_BACKENDS:
+                throttle["backend"] = throttle_in["backend"]
+        risk["throttle"] = throttle
+        out["risk"] = risk
     if isinstance(data.get("consent"), dict):
         out["consent"].update(data["consent"])
+    matching_in = data.get("matching") or {}
+    if isinstance(matching_in, dict) and matching_in.get("mode") in MATCHING_MODES:
+        out["matching"] = {**out["matching"], "mode": matching_in["mode"]}
+    cache_in = data.get("cache") or {}
+    if isinstance(cache_in, dict):
+        cache = dict(out["cache"])
+        if isinstance(cache_in.get("enabled"), bool):
+            cache["enabled"] = cache_in["enabled"]
+        for k in ("max_entries", "ttl_seconds"):
+            if isinstance(cache_in.get(k), (int, float)) and cache_in[k] > 0:
+                cache[k] = cache_in[k]
+        out["cache"] = cache
+    windowing_in = data.get("windowing") or {}
+    if isinstance(windowing_in, dict):
+        windowing = dict(out["windowing"])
+        if isinstance(windowing_in.get("enabled"), bool):
+            windowing["enabled"] = windowing_in["enabled"]
+        for k in ("window_chars", "overlap_chars", "max_input_chars"):
+            if isinstance(windowing_in.get(k), int) and windowing_in[k] > 0:
+                windowing[k] = windowing_in[k]
+        # overlap must leave room for windows to advance
+        windowing["overlap_chars"] = min(windowing["overlap_chars"], windowing["window_chars"] // 4)
+        out["windowing"] = windowing
+    reload_in = data.get("reload") or {}
+    if isinstance(reload_in, dict):
+        reload = dict(out["reload"])
+        if isinstance(reload_in.get("watch"), bool):
+            reload["watch"] = reload_in["watch"]
+        if isinstance(reload_in.get("interval_seconds"), (int, float)) and reload_in["interval_seconds"] > 0:
+            reload["interval_seconds"] = float(reload_in["interval_seconds"])
+        out["reload"] = reload
 
     return out
 
@@ -156,6 +288,23 @@ def get_dei_lexicon() -> Dict[str, str]:
     # return a copy so callers can't mutate our cache
     return dict(load_policies()["dei"]["lexicon"])
 
+def get_matching_mode() -> str:
+    mode = (load_policies().get("matching") or {}).get("mode")
+    return mode if mode in MATCHING_MODES else "linear"
+
+def get_cache_settings() -> Dict[str, Any]:
+    return dict(load_policies().get("cache") or _DEFAULT_POLICIES["cache"])
+
+def get_windowing_settings() -> Dict[str, Any]:
+    return dict(load_policies().get("windowing") or _DEFAULT_POLICIES["windowing"])
+
+def get_reload_settings() -> Dict[str, Any]:
+    return dict(load_policies().get("reload") or _DEFAULT_POLICIES["reload"])
+
+def get_throttle_settings() -> Dict[str, Any]:
+    risk = load_policies().get("risk") or {}
+    return {**_DEFAULT_POLICIES["risk"]["throttle"], **(risk.get("throttle") or {})}
+
 __all__ = [
     "DEFAULT_SCOPE_PATTERNS",
     "DEFAULT_DEI_LEXICON",
@@ -164,4 +313,15 @@ __all__ = [
     "get_scope_patterns",
     "get_redirect_message",
     "get_dei_lexicon",
+    "get_matching_mode",
+    "get_cache_settings",
+    "get_windowing_settings",
+    "get_reload_settings",
+    "get_throttle_settings",
+    "policy_paths",
+    "policy_source",
+    "loaded_from",
+    "install_policies",
+    "policy_version",
+    "get_policy_version",
 ]
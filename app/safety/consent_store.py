@@ -0,0 +1,148 @@
+# app/safety/consent_store.py
+# -*- coding: utf-8 -*-
+from __future__ import annotations
+
+"""
+Consent records in SQLite, one row per user keyed by user_id.
+- A lookup is a primary-key read; cost does not grow with the user count.
+- Users found to have accepted are kept in a bounded read-through cache for
+  `cache_ttl_seconds`. Only acceptances are cached, so consent given through
+  another worker is seen on the next request (a missing or declined row is
+  one indexed read). A decline recorded elsewhere can take up to the TTL to
+  be seen here; this process's own writes update the cache at once.
+- Writes are single-row upserts. The database runs in WAL mode, and SQLite's
+  file locks (with the driver's busy timeout) serialize writers across
+  processes, so several uvicorn workers can share one file.
+- migrate_json() imports the legacy consent_store.json once (rows already in
+  the table win) and renames the file to *.migrated.
+"""
+
+import json
+import logging
+import os
+import time
+from collections import OrderedDict
+from threading import Lock
+from typing import Any, Callable, Dict, Optional
+
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS consent_records(
+    user_id TEXT PRIMARY KEY,
+    accepted INTEGER NOT NULL,
+    ts TEXT NOT NULL,
+    version INTEGER NOT NULL DEFAULT 1
+) WITHOUT ROWID
+"""
+
+_UPSERT = text(
+    "INSERT INTO consent_records(user_id, accepted, ts, version) VALUES (:user_id, :accepted, :ts, :version) "
+    "ON CONFLICT(user_id) DO UPDATE SET accepted = excluded.accepted, ts = excluded.ts, version = excluded.version"
+)
+_INSERT_IF_ABSENT = text(
+    "INSERT OR IGNORE INTO consent_records(user_id, accepted, ts, version) VALUES (:user_id, :accepted, :ts, :version)"
+)
+_SELECT = text("SELECT accepted, ts, version FROM consent_records WHERE user_id = :user_id")
+
+
+class ConsentStore:
+    def __init__(
+        self,
+        engine: Engine,
+        cache_size: int = 100_000,
+        cache_ttl_seconds: float = 60.0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self._engine = engine
+        self.cache_size = max(1, int(cache_size))
+        self.cache_ttl_seconds = float(cache_ttl_seconds)
+        self._clock = clock
+        self._lock = Lock()
+        self._accepted: "OrderedDict[str, float]" = OrderedDict()  # user_id -> expiry
+        with engine.begin() as conn:
+            if engine.dialect.name == "sqlite":
+                conn.exec_driver_sql("PRAGMA journal_mode=WAL")  # persistent for the file
+            conn.exec_driver_sql(_SCHEMA)
+
+    # cache ------------------------------------------------------------
+
+    def _cached(self, user_id: str) -> bool:
+        with self._lock:
+            expiry = self._accepted.get(user_id)
+            if expiry is None:
+                return False
+            if expiry <= self._clock():
+                del self._accepted[user_id]
+                return False
+            self._accepted.move_to_end(user_id)
+            return True
+
+    def _remember(self, user_id: str, accepted: bool) -> None:
+        with self._lock:
+            if not accepted:
+                self._accepted.pop(user_id, None)
+                return
+            self._accepted[user_id] = self._clock() + self.cache_ttl_seconds
+            self._accepted.move_to_end(user_id)
+            while len(self._accepted) > self.cache_size:
+                self._accepted.popitem(last=False)
+
+    # records ----------------------------------------------------------
+
+    def get(self, user_id: str) -> Optional[Dict[str, Any]]:
+        with self._engine.connect() as conn:
+            row = conn.execute(_SELECT, {"user_id": user_id}).first()
+        if row is None:
+            return None
+        return {"accepted": bool(row.accepted), "ts": row.ts, "version": int(row.version)}
+
+    def is_accepted(self, user_id: str) -> bool:
+        if self._cached(user_id):
+            return True
+        rec = self.get(user_id)
+        accepted = bool(rec and rec["accepted"])
+        if accepted:
+            self._remember(user_id, True)
+        return accepted
+
+    def put(self, user_id: str, accepted: bool, ts: str, version: int = 1) -> None:
+        with self._engine.begin() as conn:
+            conn.execute(_UPSERT, {"user_id": user_id, "accepted": int(bool(accepted)), "ts": ts, "version": version})
+        self._remember(user_id, bool(accepted))
+
+    def migrate_json(self, path: str) -> int:
+        """Import a legacy {user_id: {accepted, ts, version}} file; returns the rows read."""
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f) or {}
+        except FileNotFoundError:
+            return 0
+        except (OSError, ValueError) as e:
+            logger.warning("Not migrating unreadable consent store %s: %s", path, e)
+            return 0
+        rows = [
+            {
+                "user_id": str(uid),
+                "accepted": int(rec.get("accepted") is True),
+                "ts": str(rec.get("ts") or ""),
+                "version": int(rec.get("version") or 1),
+            }
+            for uid, rec in data.items()
+            if uid and isinstance(rec, dict)
+        ]
+        if rows:
+            with self._engine.begin() as conn:
+                conn.execute(_INSERT_IF_ABSENT, rows)
+        try:
+            os.replace(path, path + ".migrated")
+        except FileNotFoundError:
+            pass  # another worker migrated it first
+        logger.info("Migrated %d consent records from %s", len(rows), path)
+        return len(rows)
+
+
+__all__ = ["ConsentStore"]
@@ -0,0 +1,91 @@
+# app/safety/decision_cache.py
+# -*- coding: utf-8 -*-
+from __future__ import annotations
+
+"""
+Bounded LRU + TTL cache for guard decisions.
+- Keys are (kind, policy version, digest of the text); the text itself is not kept.
+- Each entry stores the value plus the metric ops recorded while computing it,
+  so a hit can replay them and counters like decision_total stay exact.
+- Hit/miss/eviction counts and the current size go to an optional metrics sink.
+"""
+
+import hashlib
+import time
+from collections import OrderedDict
+from threading import Lock
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+
+Entry = Tuple[Any, List[Tuple[Any, ...]]]
+
+
+class DecisionCache:
+    def __init__(
+        self,
+        max_entries: int = 2048,
+        ttl_seconds: float = 300.0,
+        metrics: Any = None,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.max_entries = max(1, int(max_entries))
+        self.ttl_seconds = float(ttl_seconds)
+        self._metrics = metrics
+        self._clock = clock
+        self._lock = Lock()
+        self._data: "OrderedDict[Hashable, Tuple[float, Entry]]" = OrderedDict()
+
+    @staticmethod
+    def key(kind: str, text: str, policy_version: str) -> Hashable:
+        digest = hashlib.blake2b(text.encode("utf-8", "surrogatepass"), digest_size=16).digest()
+        return (kind, policy_version, digest)
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key: Hashable) -> Optional[Entry]:
+        now = self._clock()
+        with self._lock:
+            item = self._data.get(key)
+            if item is not None and item[0] <= now:
+                del self._data[key]
+                self._evicted("ttl", 1)
+                item = None
+            if item is None:
+                self._inc("decision_cache_misses_total")
+                return None
+            self._data.move_to_end(key)
+            self._inc("decision_cache_hits_total")
+            return item[1]
+
+    def put(self, key: Hashable, value: Any, ops: List[Tuple[Any, ...]]) -> None:
+        with self._lock:
+            self._data[key] = (self._clock() + self.ttl_seconds, (value, ops))
+            self._data.move_to_end(key)
+            overflow = len(self._data) - self.max_entries
+            for _ in range(overflow):
+                self._data.popitem(last=False)
+            if overflow > 0:
+                self._evicted("lru", overflow)
+            self._size()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self._size()
+
+    # metrics ----------------------------------------------------------
+
+    def _inc(self, name: str, labels: Optional[Dict[str, str]] = None, value: int = 1) -> None:
+        if self._metrics is not None:
+            self._metrics.inc_counter(name, labels, value)
+
+    def _evicted(self, reason: str, n: int) -> None:
+        self._inc("decision_cache_evictions_total", {"reason": reason}, n)
+        self._size()
+
+    def _size(self) -> None:
+        if self._metrics is not None:
+            self._metrics.set_gauge("decision_cache_size", len(self._data))
+
+
+__all__ = ["DecisionCache"]
@@ -0,0 +1,110 @@
+# app/safety/dei.py
+# -*- coding: utf-8 -*-
+from __future__ import annotations
+
+"""
+Single-pass DEI rewriting.
+- Every lexicon entry becomes a RedactionEngine rule, in lexicon order, so
+  one left-to-right scan applies them all with the old loop's precedence:
+  where an earlier entry matches inside a later entry's span, the earlier
+  one wins. Replacement text is not rescanned.
+- A big alternation of case-insensitive words is slow in `re` (every branch
+  is tried at every word start), so plain-word entries are also compiled into
+  one character trie. A scan with it names the entries that can occur in the
+  text, and only those rules (plus any regex entries) go into the engine that
+  rewrites it. Engines are cached per rule subset.
+- A match whose replacement equals it is rejected, so it does not count as a
+  rewrite; callers test the returned counts instead of comparing strings.
+"""
+
+import re
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from app.safety.redaction import RedactionEngine, Rule
+
+_PLAIN_WORDS = re.compile(r"[A-Za-z][A-Za-z\s'\-]*")
+_MAX_SUBSETS = 256
+
+
+def _plain_word(pattern: re.Pattern) -> Optional[str]:
+    """The literal of a \\b<words>\\b entry (as built for plain lexicon keys), else None."""
+    src = pattern.pattern
+    if not (pattern.flags & re.IGNORECASE and src.startswith(r"\b") and src.endswith(r"\b")):
+        return None
+    body = src[2:-2]
+    literal = re.sub(r"\\(.)", r"\1", body)
+    if re.escape(literal) != body or not _PLAIN_WORDS.fullmatch(literal):
+        return None
+    return literal.lower()
+
+
+def _trie_source(words: Sequence[str]) -> str:
+    trie: Dict[str, Any] = {}
+    for w in words:
+        node = trie
+        for ch in w:
+            node = node.setdefault(ch, {})
+        node[""] = True
+
+    def emit(node: Dict[str, Any]) -> str:
+        branches = [re.escape(ch) + emit(child) for ch, child in sorted(node.items()) if ch]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        # Optional when a word ends here: greedy, so the longest word is captured
+        return f"(?:{body})?" if "" in node else body
+
+    return emit(trie)
+
+
+def _render(pattern: re.Pattern, replacement: str) -> Any:
+    if "\\" in replacement:  # template with escapes/group refs: let re expand it
+        def expand(raw: str) -> Optional[str]:
+            out = pattern.sub(replacement, raw, count=1)
+            return None if out == raw else out
+        return expand
+    return lambda raw: None if raw == replacement else replacement
+
+
+class DeiRewriter(RedactionEngine):
+    def __init__(self, subs: Sequence[Tuple[re.Pattern, str]]) -> None:
+        # Patterns were vetted (or knowingly kept, permissive mode) when the policy was compiled
+        super().__init__([Rule(p.pattern, p, _render(p, r)) for p, r in subs], vet=False)
+        self._always: List[int] = []
+        self._by_word: Dict[str, List[int]] = {}
+        for i, rule in enumerate(self.rules):
+            word = _plain_word(rule.pattern)
+            if word is None:
+                self._always.append(i)
+            else:
+                self._by_word.setdefault(word, []).append(i)
+        # Zero-width, so entries starting inside another's match are seen too
+        self._trie = re.compile(r"\b(?=(" + _trie_source(list(self._by_word)) + r")\b)", re.I) if self._by_word else None
+
+    def _candidates(self, text: str) -> Tuple[int, ...]:
+        found = set(self._always)
+        if self._trie is not None:
+            for m in self._trie.finditer(text):
+                longest = m.group(1).lower()
+                hits = [idx for k in range(1, len(longest) + 1) for idx in self._by_word.get(longest[:k], ())]
+                if not hits:  # case folding lower() does not mirror (e.g. 'ſ'): keep every word rule
+                    found.update(i for ids in self._by_word.values() for i in ids)
+                    break
+                found.update(hits)
+        return tuple(sorted(found))
+
+    def _for_text(self, text: str) -> Optional[RedactionEngine]:
+        key = self._candidates(text)
+        if len(key) == len(self.rules):
+            return self
+        try:
+            return self._subsets[key]
+        except KeyError:
+            if len(self._subsets) >= _MAX_SUBSETS:
+                self._subsets.clear()
+            sub = [(i, self.rules[i]) for i in key]
+            engine = self._subsets[key] = RedactionEngine(self.rules, sub, vet=False) if sub else None
+            return engine
+
+
+__all__ = ["DeiRewriter"]
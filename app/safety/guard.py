@@ -1,6 +1,7 @@
 # app/safety/guard.py
 from typing import Dict, Any
 from app.observability.logging_cfg import get_logger
+from app.safety.analysis import analyze
 
 log = get_logger(__name__)
 
@@ -8,7 +9,7 @@ BLOCK_WORDS = ["diagnose me", "which meds", "prescribe", "dose"]
 RISK_HINTS = ["suicide", "kill myself", "end my life", "self-harm"]
 
 def pre_prompt_safety(text: str, profile: Dict[str, Any]) -> str:
-    t = text.lower()
+    t = analyze(text).folded
     if any(w in t for w in BLOCK_WORDS):
         log.info("scope.block")
         return "I can’t provide diagnosis or medication advice. I can share educational info and suggest talking to a licensed professional. How can I support you right now?"
@@ -0,0 +1,75 @@
+# app/safety/pii.py
+# -*- coding: utf-8 -*-
+from __future__ import annotations
+
+"""
+Public PII redaction (emails, phone numbers -> canonical tokens).
+- Kept apart from the guard so `from app.safety import redact_pii` loads only
+  these two patterns: no policies, no guard, no Prometheus until a match.
+- app.safety.safety re-exports everything here.
+"""
+
+import re
+from typing import Final
+
+from app.safety.redaction import DIGITS, RedactionEngine, Rule
+from app.safety.scanner import compile_linear
+
+_EMAIL_TOKEN: Final[str] = "[redacted@email]"
+_PHONE_TOKEN: Final[str] = "[redacted phone]"
+
+_PUBLIC_EMAIL_RE = compile_linear(
+    r"""
+    (?<![^\s<('"])
+    [A-Za-z0-9._%+-]+
+    @
+    [A-Za-z0-9.-]+\.[A-Za-z]{2,}
+    (?![^\s>)'"])
+    """,
+    re.VERBOSE,
+)
+_PUBLIC_PHONE_RE = compile_linear(
+    r"""
+    (?<!\w)
+    \+?\d{1,3}
+    (?:[\s.\-]{0,3}\d{2,4}){2,4}
+    (?!\w)
+    """,
+    re.VERBOSE,
+)
+
+# Token mode: emails outrank phones.
+_TOKEN_REDACTOR = RedactionEngine((
+    Rule("email", _PUBLIC_EMAIL_RE, lambda raw: _EMAIL_TOKEN, requires="@"),
+    Rule(
+        "phone",
+        _PUBLIC_PHONE_RE,
+        lambda raw: ("+" if raw.strip().startswith("+") else "") + _PHONE_TOKEN,
+        requires=DIGITS,
+    ),
+))
+
+def count_redaction(kind: str, n: int = 1) -> None:
+    # prometheus_client is imported on the first match, not with this module
+    from app.metrics.counters import redactions_total
+
+    redactions_total().labels(kind=kind).inc(n)
+
+def redact_pii(text: str) -> str:
+    """
+    Public/test redactor: replace emails and phone-like numbers with canonical tokens.
+    Also increments Prometheus counters *only when* a match occurs.
+    Preserves a leading '+' for phones.
+    """
+    if text is None or text == "":
+        return text
+
+    out, counts = _TOKEN_REDACTOR.redact(text)
+    for kind, n in counts.items():
+        count_redaction(kind, n)
+    return out
+
+def redact(text: str) -> str:
+    return redact_pii(text)
+
+__all__ = ["redact_pii", "redact", "count_redaction"]
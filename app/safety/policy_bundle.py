@@ -0,0 +1,107 @@
+# app/safety/policy_bundle.py
+# -*- coding: utf-8 -*-
+from __future__ import annotations
+
+"""
+On-disk cache of the compiled policy, for cold starts.
+- A bundle holds the normalized policies dict plus the vetted pattern sources
+  (scope alternation, DEI substitutions), marshalled. Loading it skips PyYAML
+  (import and parse) and pattern vetting; only re.compile() is left.
+- It is keyed by FORMAT, the interpreter's cache tag, a hash of the
+  policies.yaml path + bytes, and a fingerprint of the modules that build it
+  (normalization, defaults, DEI lexicon, pattern vetting). Editing any of
+  them invalidates old bundles; any other key falls back to full parsing
+  (and rewrites it).
+- marshal, not pickle: a bundle is plain data and loading one runs no code.
+- SAFETY_POLICY_BUNDLE_DIR picks the directory (default: __policycache__ next
+  to this module); SAFETY_POLICY_BUNDLE=0 turns the cache off. Write failures
+  are logged and ignored.
+"""
+
+import functools
+import hashlib
+import logging
+import marshal
+import os
+import sys
+import tempfile
+from typing import Any, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+FORMAT = 2
+
+# Modules whose code shapes a bundle's contents (see the docstring)
+_PRODUCERS = ("config.py", "dei.py", "policy_bundle.py", "redaction.py", "safety.py", "scanner.py")
+
+
+def enabled() -> bool:
+    return os.getenv("SAFETY_POLICY_BUNDLE", "1").lower() not in ("0", "false", "no", "off")
+
+
+def bundle_path() -> str:
+    root = os.getenv("SAFETY_POLICY_BUNDLE_DIR") or os.path.join(os.path.dirname(__file__), "__policycache__")
+    return os.path.join(root, f"policies.{sys.implementation.cache_tag}.bundle")
+
+
+@functools.lru_cache(maxsize=1)
+def code_fingerprint() -> str:
+    h = hashlib.sha256()
+    here = os.path.dirname(os.path.abspath(__file__))
+    for name in _PRODUCERS:
+        h.update(name.encode("ascii") + b"\0")
+        try:
+            with open(os.path.join(here, name), "rb") as f:
+                h.update(f.read())
+        except OSError:
+            h.update(b"?")  # e.g. shipped without sources: FORMAT still guards the layout
+    return h.hexdigest()[:16]
+
+
+def source_key(source: Optional[Tuple[str, bytes]]) -> Optional[str]:
+    """Key for a (path, bytes) policy source; None (no source) is never cached."""
+    if source is None:
+        return None
+    path, data = source
+    h = hashlib.sha256()
+    h.update(os.path.abspath(path).encode("utf-8", "surrogateescape"))
+    h.update(b"\0")
+    h.update(data)
+    return f"{FORMAT}:{sys.implementation.cache_tag}:{code_fingerprint()}:{h.hexdigest()}"
+
+
+def load(key: Optional[str]) -> Optional[Dict[str, Any]]:
+    if key is None or not enabled():
+        return None
+    try:
+        with open(bundle_path(), "rb") as f:
+            payload = marshal.load(f)
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        logger.warning("Ignoring unreadable policy bundle %s: %s", bundle_path(), e)
+        return None
+    if not isinstance(payload, dict) or payload.get("key") != key:
+        return None
+    return payload
+
+
+def save(key: Optional[str], payload: Dict[str, Any]) -> None:
+    if key is None or not enabled():
+        return
+    path = bundle_path()
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".bundle-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                marshal.dump({**payload, "key": key}, f)
+            os.replace(tmp, path)  # readers see the old bundle or the new one, never half
+        except BaseException:
+            os.unlink(tmp)
+            raise
+    except Exception as e:
+        logger.warning("Could not write policy bundle %s: %s", path, e)
+
+
+__all__ = ["FORMAT", "bundle_path", "code_fingerprint", "enabled", "load", "save", "source_key"]
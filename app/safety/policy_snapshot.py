@@ -0,0 +1,107 @@
+# app/safety/policy_snapshot.py
+# -*- coding: utf-8 -*-
+from __future__ import annotations
+
+"""
+Compiled policy snapshots and a policies.yaml watcher.
+- CompiledPolicy is immutable: everything the request path reads from the
+  policies (compiled patterns, lexicon, version, windowing) lives in one
+  object, published by a single reference assignment. Readers take the
+  reference once per call and never see a half-applied reload.
+- PolicyWatcher polls the policy files' (mtime, size) on a daemon thread and
+  triggers the rebuild there, so live traffic never pays for compilation.
+  A change is acted on once the files have stopped changing for one poll
+  interval, so a file caught mid-write is not loaded.
+"""
+
+import logging
+import os
+import re
+import threading
+from dataclasses import dataclass
+from typing import Callable, Mapping, Optional, Sequence, Tuple
+
+from app.safety.redaction import RedactionEngine
+
+logger = logging.getLogger(__name__)
+
+Stamp = Tuple[Optional[Tuple[int, int]], ...]
+
+
+@dataclass(frozen=True)
+class CompiledPolicy:
+    version: str
+    redirect_message: str
+    scope_block_re: re.Pattern
+    dei_lexicon: Mapping[str, str]  # read-only view
+    dei_subs: Tuple[Tuple[re.Pattern, str], ...]
+    windowing: Optional[Mapping[str, int]] = None  # None: long inputs are blocked
+    # dei_subs fused into one single-pass rewriter (app.safety.dei)
+    dei_rewriter: Optional[RedactionEngine] = None
+
+
+class PolicyWatcher:
+    def __init__(
+        self,
+        paths: Callable[[], Sequence[str]],
+        on_change: Callable[[], None],
+        interval: float = 2.0,
+    ) -> None:
+        self._paths = paths
+        self._on_change = on_change
+        self.interval = float(interval)
+        self._seen = self._stamp()
+        self._pending: Optional[Stamp] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _stamp(self) -> Stamp:
+        out = []
+        for p in self._paths():
+            try:
+                st = os.stat(p)
+                out.append((st.st_mtime_ns, st.st_size))
+            except OSError:
+                out.append(None)
+        return tuple(out)
+
+    def check(self) -> bool:
+        """One poll; returns True when it triggered a reload."""
+        stamp = self._stamp()
+        if stamp == self._seen:
+            self._pending = None
+            return False
+        if stamp != self._pending:
+            # changed since the last poll: give the writer an interval to finish
+            self._pending = stamp
+            return False
+        self._seen, self._pending = stamp, None
+        try:
+            self._on_change()
+        except Exception:
+            logger.exception("Policy reload failed; keeping the current policy")
+        return True
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            self.check()
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> "PolicyWatcher":
+        if not self.running:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="safety-policy-watch", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+
+__all__ = ["CompiledPolicy", "PolicyWatcher"]
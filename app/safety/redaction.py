@@ -0,0 +1,225 @@
+# app/safety/redaction.py
+# -*- coding: utf-8 -*-
+from __future__ import annotations
+
+"""
+Single-pass PII redaction.
+- All rules are fused into one alternation and found in one left-to-right scan;
+  the output string is built once from the accepted spans.
+- Rule order is priority. When a higher-priority rule matches inside a span
+  found for a lower one (e.g. an email whose digit-only local part a phone run
+  reached into), the lower span is cut short before it.
+- A render returning None rejects the span (left as-is, not counted).
+- "Hint" rules (no render) consume nothing and count at most once per text;
+  once all of them have fired the scan drops them.
+- Rules whose required characters are absent from the text are skipped, so a
+  turn without '@' or digits never runs the email/card/phone alternatives.
+- redact(text, windows) scans each of a sequence of overlapping windows on its
+  own, so no match attempt runs past a window's end; a match is taken from the
+  window it starts in before the next one begins.
+"""
+
+import re
+from typing import Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional, Sequence, Set, Tuple, Union
+
+from app.safety.scanner import compile_linear
+
+Render = Callable[[str], Optional[str]]
+
+_FLAG_LETTERS = ((re.IGNORECASE, "i"), (re.MULTILINE, "m"), (re.DOTALL, "s"), (re.VERBOSE, "x"))
+
+
+class Rule(NamedTuple):
+    kind: str
+    pattern: re.Pattern
+    render: Optional[Render] = None  # None: hint rule (count only)
+    # Characters a match must contain at least one of (or a predicate on the
+    # text); when the text has none of them the rule is left out of the scan.
+    # Empty: always scanned.
+    requires: Union[str, Callable[[str], bool]] = ""
+
+
+class Span(NamedTuple):
+    start: int
+    end: int
+    kind: str
+    replacement: Optional[str]  # None for hints
+
+
+def _may_match(rule: Rule, text: str) -> bool:
+    requires = rule.requires
+    if not requires:
+        return True
+    if callable(requires):
+        return requires(text)
+    return any(c in text for c in requires)
+
+
+def mask(s: str, visible: int = 2) -> str:
+    if len(s) <= visible:
+        return "*" * len(s)
+    return s[:visible] + "*" * (len(s) - visible)
+
+
+def _scoped(source: str, flags: int) -> str:
+    letters = "".join(ch for flag, ch in _FLAG_LETTERS if flags & flag)
+    if not letters:
+        return f"(?:{source})"
+    # newline keeps a verbose pattern's trailing comment from eating the ')'
+    return f"(?{letters}:{source}\n)" if "x" in letters else f"(?{letters}:{source})"
+
+
+def _alternation(indexed: Sequence[Tuple[int, Rule]], vet: bool = True) -> re.Pattern:
+    # A leading \b shared by every rule is hoisted so non-boundary positions
+    # are rejected once instead of once per alternative.
+    hoist = all(r.pattern.pattern.startswith(r"\b") and not r.pattern.flags & re.VERBOSE for _, r in indexed)
+    alts = []
+    for i, r in indexed:
+        body = _scoped(r.pattern.pattern[2:] if hoist else r.pattern.pattern, r.pattern.flags)
+        alts.append(f"(?P<_r{i}>{body})" if r.render else f"(?P<_r{i}>(?={body}))")
+    source = (r"\b" if hoist else "") + "(?:" + "|".join(alts) + ")"
+    return compile_linear(source) if vet else re.compile(source)
+
+
+class RedactionEngine:
+    def __init__(
+        self,
+        rules: Sequence[Rule],
+        _indexed: Optional[Sequence[Tuple[int, Rule]]] = None,
+        *,
+        vet: bool = True,  # False: the caller already vetted the rule patterns
+    ) -> None:
+        self.rules: Tuple[Rule, ...] = tuple(rules)
+        self._vet = vet
+        self._subsets: Dict[Tuple[int, ...], Optional[RedactionEngine]] = {}
+        self._by_group = {f"_r{i}": (i, r) for i, r in enumerate(self.rules)}
+        indexed = list(_indexed if _indexed is not None else enumerate(self.rules))
+        consuming = [(i, r) for i, r in indexed if r.render]
+        self._hint_kinds = frozenset(r.kind for _, r in indexed if r.render is None)
+        self._consuming = consuming
+        self.pattern = _alternation(indexed, vet)
+        # Once every hint has fired the scan continues without them
+        self._pattern_no_hints = _alternation(consuming, vet) if consuming else None
+        # For rule i: alternation of the consuming rules ranked above it, built
+        # the first time rule i matches (up front it is quadratic in the rules)
+        self._higher: Dict[int, Optional[re.Pattern]] = {}
+
+    def _higher_than(self, i: int) -> Optional[re.Pattern]:
+        try:
+            return self._higher[i]
+        except KeyError:
+            above = [(j, r) for j, r in self._consuming if j < i]
+            pattern = self._higher[i] = _alternation(above, self._vet) if above else None
+            return pattern
+
+    def spans(self, text: str, pos: int = 0, endpos: Optional[int] = None) -> Iterator[Span]:
+        """
+        Spans in text order: accepted replacements, plus one empty span for the
+        first occurrence of each hint kind.
+        """
+        end = len(text) if endpos is None else endpos
+        engine = self._for_text(text if endpos is None and pos == 0 else text[pos:end])
+        if engine is not None:
+            yield from engine._spans(text, pos, end)
+
+    def _for_text(self, text: str) -> Optional["RedactionEngine"]:
+        key = tuple(i for i, r in enumerate(self.rules) if _may_match(r, text))
+        if len(key) == len(self.rules):
+            return self
+        if key not in self._subsets:
+            sub = [(i, self.rules[i]) for i in key]
+            self._subsets[key] = RedactionEngine(self.rules, sub, vet=self._vet) if sub else None
+        return self._subsets[key]
+
+    def _spans(self, text: str, pos: int, end: int) -> Iterator[Span]:
+        pattern: Optional[re.Pattern] = self.pattern
+        pending = set(self._hint_kinds)
+        # rule index -> (p, q): searching its higher rules from p first hits q
+        ahead: Dict[int, Tuple[int, Optional[int]]] = {}
+        while pattern is not None and pos <= end:
+            restart: Optional[int] = None
+            for m in pattern.finditer(text, pos, end):
+                i, rule = self._by_group[m.lastgroup]
+                s, e = m.span()
+                if rule.render is None:
+                    if rule.kind in pending:
+                        pending.discard(rule.kind)
+                        yield Span(s, s, rule.kind, None)
+                        if not pending:
+                            pattern, restart = self._pattern_no_hints, s
+                            break
+                    continue
+                higher = self._higher_than(i)
+                if higher is not None:
+                    p, q = ahead.get(i, (-1, -1))
+                    if not (p <= s + 1 and (q is None or s + 1 <= q)):
+                        hm = higher.search(text, s + 1, end)
+                        p, q = s + 1, hm.start() if hm else None
+                        ahead[i] = (p, q)
+                    if q is not None and q < e:
+                        # a higher-priority match starts inside: keep only what fits before it
+                        cut = rule.pattern.match(text, s, q)
+                        restart = q
+                        if cut is not None and cut.end() > s:
+                            e = restart = cut.end()
+                            out = rule.render(text[s:e])
+                            if out is not None:
+                                yield Span(s, e, rule.kind, out)
+                        break
+                out = rule.render(text[s:e])
+                if out is not None:
+                    yield Span(s, e, rule.kind, out)
+            if restart is None:
+                return
+            pos = restart
+
+    def _window_spans(self, text: str, windows: Iterable[Tuple[int, int]]) -> Iterator[Span]:
+        """spans() over overlapping (start, end) windows covering `text`, in order."""
+        bounds = list(windows)
+        hints: Set[str] = set()
+        last = 0
+        for k, (a, b) in enumerate(bounds):
+            keep = bounds[k + 1][0] if k + 1 < len(bounds) else b
+            for span in self.spans(text, a, b):
+                if span.start >= keep:
+                    break  # the next window sees it whole
+                if span.start < last:
+                    continue
+                if span.replacement is None:
+                    if span.kind in hints:
+                        continue
+                    hints.add(span.kind)
+                else:
+                    last = span.end
+                yield span
+
+    def redact(self, text: str, windows: Optional[Iterable[Tuple[int, int]]] = None) -> Tuple[str, Dict[str, int]]:
+        """
+        Return (redacted text, {kind: count}); hint kinds count at most once.
+        With `windows` each one is scanned on its own (see the module notes).
+        """
+        parts: List[str] = []
+        counts: Dict[str, int] = {}
+        last = 0
+        for span in self.spans(text) if windows is None else self._window_spans(text, windows):
+            if span.replacement is None:
+                counts[span.kind] = 1
+                continue
+            parts.append(text[last:span.start])
+            parts.append(span.replacement)
+            last = span.end
+            counts[span.kind] = counts.get(span.kind, 0) + 1
+        if not parts:
+            return text, counts
+        parts.append(text[last:])
+        return "".join(parts), counts
+
+
+_DIGIT = re.compile(r"\d")
+
+
+def DIGITS(text: str) -> bool:
+    """`requires` for patterns built on \\d, which matches any Unicode digit (e.g. Devanagari, full-width)."""
+    return _DIGIT.search(text) is not None
+
+__all__ = ["DIGITS", "RedactionEngine", "Rule", "Span", "mask"]
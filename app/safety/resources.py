@@ -0,0 +1,180 @@
+# app/safety/resources.py
+# -*- coding: utf-8 -*-
+from __future__ import annotations
+
+"""
+Crisis resources registry (resources_in.json).
+- The file is read once; after that a lookup is a dict read. At most every
+  `revalidate_seconds` one caller stats the candidate files and the registry
+  reloads only if their (mtime, size) changed; everyone else keeps reading
+  the current snapshot meanwhile.
+- The blocks shown to users ("Crisis help (India)" in guard decisions, "If you
+  might be unsafe..." in replies) are rendered per locale and format at load.
+- Files: a list of strings (default locale) or {locale: {name: number}}.
+  Invalid or unreadable files are logged and skipped; with none usable the
+  built-in India helplines are served.
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Callable, Dict, List, Mapping, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_LOCALE = "india"
+MAX_ITEMS = 5  # helplines shown per block
+
+DEFAULT_RESOURCES: Tuple[str, ...] = (
+    "India — Emergency: 112",
+    "Tele MANAS (24x7): 14416 or 1-800-891-4416",
+    "KIRAN: 1800-599-0019",
+    "AASRA: 91-9820466726",
+    "Vandrevala Foundation: 9999-666-555",
+)
+
+FORMATS: Mapping[str, str] = MappingProxyType({
+    "crisis_help": "Crisis help ({label})\n- {items}",
+    "unsafe": "If you might be unsafe, these can help right now:\n- {items}",
+})
+
+Stamp = Tuple[Optional[Tuple[int, int]], ...]
+
+
+def default_paths() -> List[str]:
+    return [
+        os.path.join(os.path.dirname(__file__), "resources_in.json"),
+        os.path.join(os.getcwd(), "resources_in.json"),
+    ]
+
+
+def _parse(data: object) -> Optional[Dict[str, Tuple[str, ...]]]:
+    if isinstance(data, list):
+        return {DEFAULT_LOCALE: tuple(str(x) for x in data)}
+    if isinstance(data, dict):
+        by_locale = {
+            str(locale).lower(): tuple(f"{k}: {v}" for k, v in entries.items())
+            for locale, entries in data.items()
+            if isinstance(entries, dict)
+        }
+        if DEFAULT_LOCALE in by_locale:
+            return by_locale
+    return None
+
+
+@dataclass(frozen=True)
+class ResourceSet:
+    stamp: Stamp
+    source: Optional[str]  # None: built-in defaults
+    items: Mapping[str, Tuple[str, ...]]
+    blocks: Mapping[Tuple[str, str], str]  # (locale, format) -> rendered text
+
+    @classmethod
+    def build(cls, stamp: Stamp, source: Optional[str], by_locale: Dict[str, Tuple[str, ...]]) -> "ResourceSet":
+        blocks = {
+            (locale, fmt): template.format(label=locale.title(), items="\n- ".join(items[:MAX_ITEMS]))
+            for locale, items in by_locale.items()
+            for fmt, template in FORMATS.items()
+        }
+        return cls(stamp, source, MappingProxyType(dict(by_locale)), MappingProxyType(blocks))
+
+
+class ResourcesRegistry:
+    def __init__(
+        self,
+        paths_fn: Callable[[], Sequence[str]] = default_paths,
+        revalidate_seconds: float = 5.0,
+    ) -> None:
+        self._paths_fn = paths_fn
+        self.revalidate_seconds = revalidate_seconds
+        self._current: Optional[ResourceSet] = None
+        self._next_check = 0.0
+        self._lock = threading.Lock()
+
+    def _stamp(self, paths: Sequence[str]) -> Stamp:
+        out = []
+        for p in paths:
+            try:
+                st = os.stat(p)
+                out.append((st.st_mtime_ns, st.st_size))
+            except OSError:
+                out.append(None)
+        return tuple(out)
+
+    def _load(self, paths: Sequence[str], stamp: Stamp) -> ResourceSet:
+        for p, st in zip(paths, stamp):
+            if st is None:
+                continue
+            try:
+                with open(p, "r", encoding="utf-8-sig") as f:
+                    by_locale = _parse(json.load(f))
+            except json.JSONDecodeError as e:
+                logger.warning("Invalid JSON in resources file %s: %s", p, e)
+                continue
+            except OSError as e:
+                logger.warning("Unable to read resources file %s: %s", p, e)
+                continue
+            if by_locale is not None:
+                return ResourceSet.build(stamp, p, by_locale)
+        return ResourceSet.build(stamp, None, {DEFAULT_LOCALE: DEFAULT_RESOURCES})
+
+    def _revalidate(self, force: bool = False) -> ResourceSet:
+        # caller holds self._lock
+        current = self._current
+        if not force and current is not None and time.monotonic() < self._next_check:
+            return current  # another thread just did it
+        paths = list(self._paths_fn())
+        stamp = self._stamp(paths)
+        if force or current is None or stamp != current.stamp:
+            current = self._current = self._load(paths, stamp)
+        self._next_check = time.monotonic() + self.revalidate_seconds
+        return current
+
+    def snapshot(self) -> ResourceSet:
+        current = self._current
+        if current is not None and time.monotonic() < self._next_check:
+            return current
+        # Due for a stat: one caller does it, the others keep the current snapshot
+        if not self._lock.acquire(blocking=current is None):
+            return current
+        try:
+            return self._revalidate()
+        finally:
+            self._lock.release()
+
+    def refresh(self) -> ResourceSet:
+        """Re-read the files now, whatever their mtime."""
+        with self._lock:
+            return self._revalidate(force=True)
+
+    def items(self, locale: str = DEFAULT_LOCALE) -> Tuple[str, ...]:
+        items = self.snapshot().items
+        return items.get(locale.lower()) or items[DEFAULT_LOCALE]
+
+    def render(self, fmt: str, locale: str = DEFAULT_LOCALE) -> str:
+        """A precomputed block: fmt is one of FORMATS ("crisis_help", "unsafe")."""
+        blocks = self.snapshot().blocks
+        block = blocks.get((locale.lower(), fmt))
+        if block is None:
+            if fmt not in FORMATS:
+                raise KeyError(f"unknown resources format {fmt!r}")
+            block = blocks[(DEFAULT_LOCALE, fmt)]
+        return block
+
+
+crisis_resources = ResourcesRegistry()
+
+__all__ = [
+    "DEFAULT_LOCALE",
+    "DEFAULT_RESOURCES",
+    "FORMATS",
+    "MAX_ITEMS",
+    "ResourceSet",
+    "ResourcesRegistry",
+    "crisis_resources",
+    "default_paths",
+]
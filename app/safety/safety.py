@@ -3,19 +3,35 @@
 from __future__ import annotations
 
 import base64
-import json
+import functools
+import math
 import os
 import re
 import sys
 import time
 import logging
-from typing import Any, Dict, List, Optional, Tuple, Union, Final
-from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any, Collection, Dict, FrozenSet, Iterator, List, Mapping, Optional, Sequence, Set, Tuple, Union
+from dataclasses import dataclass, field, replace
+from types import MappingProxyType
 from datetime import datetime, timezone
-from threading import RLock
+from itertools import repeat
+from threading import Lock, RLock, local
 
 from app.safety import config as safety_config
-from app.metrics.counters import redactions_total  # prometheus counter factory
+from app.safety import policy_bundle
+from app.safety.analysis import AnalyzedText, analyze
+from app.safety.decision_cache import DecisionCache
+from app.safety.dei import DeiRewriter
+from app.safety.policy_snapshot import CompiledPolicy, PolicyWatcher
+from app.safety.resources import crisis_resources
+from app.safety.redaction import DIGITS, RedactionEngine, Rule, mask
+from app.safety.streaming import EngineStage, StreamingRewriter
+from app.safety.scanner import CategoryScanner, CoOccurrence, UnsafePatternError, check_linear, compile_linear
+
+if TYPE_CHECKING:
+    from concurrent.futures import ThreadPoolExecutor
+
+    from app.safety.consent_store import ConsentStore
 
 logger = logging.getLogger(__name__)
 
@@ -23,6 +39,8 @@ logger = logging.getLogger(__name__)
 #                           Metrics Wrapper
 # ======================================================================
 
+_BIND_LOCK = Lock()
+
 class _Metrics:
     """
     Lightweight metrics wrapper. Uses Prometheus if available; also mirrors
@@ -53,10 +71,19 @@ class _Metrics:
     }
 
     def __init__(self) -> None:
-        self._use_prom: bool = False
+        self._prom: Optional[bool] = None  # None until the collectors are bound
+        self._prebound: List[Tuple[str, str, Tuple[str, ...]]] = []
         self._counters: Dict[Tuple[str, Tuple[Tuple[str, str], ...]], int] = {}
         self._hist: List[float] = []
         self._mirror: Dict[str, int] = {}
+        self._gauges: Dict[str, float] = {}
+        self._stages: Dict[str, List[float]] = {}  # stage -> [count, total seconds]
+        # (name, sorted label items) -> resolved Prometheus child
+        self._children: Dict[Tuple[str, Tuple[Tuple[str, str], ...]], Any] = {}
+        # Per-thread stack of open journals: every increment/observation is
+        # also recorded into each of them so it can be replayed later (pool
+        # workers ship theirs to the parent; the decision cache replays on hits).
+        self._local = local()
 
         # Prom aliases/handles (or None)
         self.evaluations_total: Any = None
@@ -65,6 +92,13 @@ class _Metrics:
         self.blocks_total: Any = None
         self.redactions_total: Any = None
         self.latency_seconds: Any = None
+        self.stage_seconds: Any = None
+        self.executor_queue_depth: Any = None
+        self.executor_wait_seconds: Any = None
+        self.decision_cache_hits_total: Any = None
+        self.decision_cache_misses_total: Any = None
+        self.decision_cache_evictions_total: Any = None
+        self.decision_cache_size: Any = None
 
         self.scope_blocks_count: Any = None
         self.risk_triggers_count: Any = None
@@ -79,9 +113,21 @@ class _Metrics:
         self.safety_consent_events_total: Any = None
         self.safety_consent_accept_count: Any = None
 
+    @property
+    def _use_prom(self) -> bool:
+        # Collectors (and prometheus_client itself) are created on first use,
+        # not when app.safety.safety is imported.
+        prom = self._prom
+        if prom is None:
+            with _BIND_LOCK:
+                if self._prom is None:
+                    self._prom = self._bind()
+                prom = self._prom
+        return prom
+
+    def _bind(self) -> bool:
         try:
-            from prometheus_client import Counter, Histogram  # type: ignore
-            self._use_prom = True
+            from prometheus_client import Counter, Gauge, Histogram  # type: ignore
 
             self.evaluations_total = Counter("safety_evaluations_total", "Total texts evaluated")
             self.decision_total = Counter("safety_decision_total", "Decisions by type", ["decision"])
@@ -91,8 +137,28 @@ class _Metrics:
             self.latency_seconds = Histogram(
                 "safety_latency_seconds",
                 "Latency per safety evaluation",
-                buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2, 3, 5),
+                buckets=(0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2, 3, 5),
+            )
+            self.stage_seconds = Histogram(
+                "safety_stage_seconds",
+                "Time per guard stage (recorded only while stage timing is on)",
+                ["stage"],
+                buckets=(0.000005, 0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.05),
+            )
+            self.executor_queue_depth = Gauge(
+                "safety_executor_queue_depth", "Guard calls waiting for an async executor thread"
+            )
+            self.executor_wait_seconds = Histogram(
+                "safety_executor_wait_seconds",
+                "Time guard calls spend queued before an executor thread picks them up",
+                buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1),
             )
+            self.decision_cache_hits_total = Counter("safety_decision_cache_hits_total", "Decision cache hits")
+            self.decision_cache_misses_total = Counter("safety_decision_cache_misses_total", "Decision cache misses")
+            self.decision_cache_evictions_total = Counter(
+                "safety_decision_cache_evictions_total", "Decision cache evictions", ["reason"]
+            )
+            self.decision_cache_size = Gauge("safety_decision_cache_size", "Entries in the decision cache")
 
             self.scope_blocks_count = Counter("safety_scope_blocks_count", "Scope limiter blocks")
             self.risk_triggers_count = Counter("safety_risk_triggers_count", "Risk triggers")
@@ -108,34 +174,90 @@ class _Metrics:
 
         except Exception as e:
             logger.debug("Prometheus metrics unavailable, using in-memory counters: %r", e)
+            return False
+        for name, label, values in self._prebound:
+            for v in values:
+                self._child(name, ((label, v),))
+        return True
 
     def __getitem__(self, key: str) -> int:
         k = self._ALIASES_READ.get(key, key)
         return int(self._mirror.get(k, 0))
 
-    def _bump_mirror(self, name: str, value: int, labels: Optional[Dict[str, str]]) -> None:
+    def _record(self, op: Tuple[Any, ...]) -> None:
+        for journal in getattr(self._local, "journals", ()):
+            journal.append(op)
+
+    def _child(self, name: str, labels: Tuple[Tuple[str, str], ...]) -> Any:
+        key = (name, labels)
+        child = self._children.get(key)
+        if child is None:
+            metric = getattr(self, name)
+            child = metric.labels(**dict(labels)) if labels else metric
+            self._children[key] = child
+        return child
+
+    def prebind(self, name: str, label: str, values: Sequence[str]) -> None:
+        """Resolve the children of a labelled counter up front (when the collectors are bound)."""
+        self._prebound.append((name, label, tuple(values)))
+        if self._prom:
+            for v in values:
+                self._child(name, ((label, v),))
+
+    def _add(self, name: str, labels: Tuple[Tuple[str, str], ...], value: int, journals: Sequence[list]) -> None:
+        for journal in journals:
+            journal.append(("counter", name, dict(labels) or None, value))
         k = self._ALIASES_WRITE.get(name, name)
         self._mirror[k] = self._mirror.get(k, 0) + value
-
-    def inc_counter(self, name: str, labels: Optional[Dict[str, str]] = None, value: int = 1) -> None:
-        self._bump_mirror(name, value, labels)
         if self._use_prom:
-            metric = getattr(self, name)
-            if labels:
-                metric.labels(**labels).inc(value)
-            else:
-                metric.inc(value)
+            self._child(name, labels).inc(value)
             return
-        key = (name, tuple(sorted((labels or {}).items())))
+        key = (name, labels)
         self._counters[key] = self._counters.get(key, 0) + value
 
+    def inc_counter(self, name: str, labels: Optional[Dict[str, str]] = None, value: int = 1) -> None:
+        key = tuple(sorted(labels.items())) if labels else ()
+        self._add(name, key, value, getattr(self._local, "journals", ()))
+
+    def flush(self, tally: "_Tally", latency: Optional[float] = None) -> None:
+        """Apply a batch of counter increments (and a latency observation) at once."""
+        journals = getattr(self._local, "journals", ())
+        for (name, labels), value in tally.items():
+            self._add(name, labels, value, journals)
+        if latency is not None:
+            self.observe_hist("latency_seconds", latency)
+
     def observe_hist(self, name: str, value: float) -> None:
+        self._record(("hist", name, value))
         if self._use_prom:
             getattr(self, name).observe(value)
             return
         if name == "latency_seconds":
             self._hist.append(value)
 
+    def observe_stage(self, stage: str, seconds: float) -> None:
+        self._record(("stage", stage, seconds))
+        totals = self._stages.get(stage)
+        if totals is None:
+            totals = self._stages[stage] = [0, 0.0]
+        totals[0] += 1
+        totals[1] += seconds
+        if self._use_prom:
+            self._child("stage_seconds", (("stage", stage),)).observe(seconds)
+
+    def get_stage(self, stage: str) -> Tuple[int, float]:
+        """(observations, total seconds) recorded for a stage."""
+        count, total = self._stages.get(stage, (0, 0.0))
+        return int(count), float(total)
+
+    def set_gauge(self, name: str, value: float) -> None:
+        self._gauges[name] = value
+        if self._use_prom:
+            getattr(self, name).set(value)
+
+    def get_gauge(self, name: str) -> float:
+        return self._gauges.get(name, 0.0)
+
     def get_counter(self, name: str, labels: Optional[Dict[str, str]] = None) -> int:
         if self._use_prom:
             return -1
@@ -147,9 +269,74 @@ class _Metrics:
             return -1
         return len(self._hist)
 
+    def start_journal(self) -> None:
+        journals = getattr(self._local, "journals", None)
+        if journals is None:
+            journals = self._local.journals = []
+        journals.append([])
+
+    def take_journal(self) -> List[Tuple[Any, ...]]:
+        journals = getattr(self._local, "journals", None)
+        return journals.pop() if journals else []
+
+    def replay(self, ops: List[Tuple[Any, ...]], latency: Optional[float] = None) -> None:
+        """
+        Apply recorded increments (from a pool worker or a cached decision).
+        If `latency` is given it replaces recorded latency observations and
+        stage timings are dropped (the stages did not run this time).
+        """
+        for op in ops:
+            if op[0] == "counter":
+                self.inc_counter(op[1], op[2], op[3])
+            elif op[0] == "stage":
+                if latency is None:
+                    self.observe_stage(op[1], op[2])
+            else:
+                self.observe_hist(op[1], op[2] if latency is None or op[1] != "latency_seconds" else latency)
+
+class _Tally(Dict[Tuple[str, Tuple[Tuple[str, str], ...]], int]):
+    """Counter increments gathered during one evaluation; see _Metrics.flush()."""
+
+    def add(self, name: str, labels: Tuple[Tuple[str, str], ...] = (), value: int = 1) -> None:
+        key = (name, labels)
+        self[key] = self.get(key, 0) + value
+
 _metrics = _Metrics()
 _METRICS = _metrics  # back-compat for tests
 
+# ======================================================================
+#                        Stage timing
+# ======================================================================
+
+# Off by default; when off each stage boundary costs one global lookup.
+_stage_timing: bool = os.getenv("SAFETY_STAGE_TIMING", "").lower() in ("1", "true", "yes", "on")
+
+def set_stage_timing(enabled: bool) -> None:
+    """Switch per-stage latency recording (safety_stage_seconds) on or off at runtime."""
+    global _stage_timing
+    _stage_timing = bool(enabled)
+
+def _stage(name: str, t0: float) -> float:
+    """Record the time since t0 under `name`; returns now, for the next stage."""
+    now = time.perf_counter()
+    _metrics.observe_stage(name, now - t0)
+    return now
+
+def _timed_stage(name: str) -> Any:
+    """Decorator: record the whole call as stage `name` while stage timing is on."""
+    def wrap(fn: Any) -> Any:
+        @functools.wraps(fn)
+        def timed(*args: Any, **kwargs: Any) -> Any:
+            if not _stage_timing:
+                return fn(*args, **kwargs)
+            t0 = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                _stage(name, t0)
+        return timed
+    return wrap
+
 # ======================================================================
 #                        Data structures / result
 # ======================================================================
@@ -164,6 +351,8 @@ class SafetyDecision:
     redactions: Dict[str, int] = field(default_factory=dict)
     meta: Dict[str, str] = field(default_factory=dict)
     risk: Dict[str, str] = field(default_factory=lambda: {"risk": "none", "reason": ""})
+    # The scan this decision was made from; pre_prompt_guard() hands it on to detect_risk()
+    scan: Optional["ScanResult"] = field(default=None, repr=False, compare=False)
 
     def add_reason(self, reason: str) -> None:
         if reason not in self.reasons:
@@ -173,19 +362,111 @@ class SafetyDecision:
         if cat not in self.categories:
             self.categories.append(cat)
 
+CategorySpans = Mapping[str, Sequence[Tuple[int, int]]]
+
+class ScanResult:
+    """
+    One guard scan of a message, shared by enforce_scope(), SafetyGuard.evaluate(),
+    detect_risk() and inject_resources() so pre_prompt_guard() reads it once.
+    - `analysis`: the message folded once (see app.safety.analysis); every
+      check below matches against it.
+    - `scope_blocked`: the scope policy check of the message as given.
+    - `text`: the message as the guard judges it (control characters removed);
+      `hits` are the guard categories found in it and `spans` their (start, end)
+      offsets. Both are computed on first use, so a scope block or a decision
+      cache hit costs no category scan.
+    - `partial`: a windowed scan stopped at a block-level window, so `hits`
+      may miss categories further on; such a scan covers() no text.
+    """
+    __slots__ = ("source", "_guard", "_analysis", "_scope", "_result")
+
+    def __init__(
+        self,
+        source: str,
+        guard: "SafetyGuard",
+        result: Optional[Tuple[str, CategorySpans, bool]] = None,
+    ) -> None:
+        self.source = source
+        self._guard = guard
+        self._analysis: Optional[AnalyzedText] = None
+        self._scope: Optional[bool] = None
+        self._result = result
+
+    def _scanned(self) -> Tuple[str, CategorySpans, bool]:
+        result = self._result
+        if result is None:
+            result = self._result = self._guard._scan_message(self.source, self.analysis)
+        return result
+
+    @property
+    def analysis(self) -> AnalyzedText:
+        if self._analysis is None:
+            self._analysis = analyze(self.source)
+        return self._analysis
+
+    @property
+    def scope_blocked(self) -> bool:
+        if self._scope is None:
+            self._scope = bool(self.source) and _get_policy().scope_block_re.search(self.analysis.folded) is not None
+        return self._scope
+
+    @property
+    def text(self) -> str:
+        return self._scanned()[0]
+
+    @property
+    def spans(self) -> CategorySpans:
+        return self._scanned()[1]
+
+    @property
+    def partial(self) -> bool:
+        return self._scanned()[2]
+
+    @property
+    def hits(self) -> FrozenSet[str]:
+        return frozenset(self._scanned()[1])
+
+    @property
+    def risk(self) -> Dict[str, Union[str, List[str]]]:
+        """The detect_risk() verdict for `text` (without touching metrics)."""
+        return _risk_from_hits(self.spans)
+
+    def covers(self, text: str) -> bool:
+        """True if this scan is complete and of `text` (the message as given or as judged)."""
+        if self.partial:
+            return False
+        return text is self.source or text == self.source or text == self.text
+
 # ======================================================================
 #                   CONFIG-DRIVEN: Scope & DEI helpers
 # ======================================================================
 
-_SCOPE_REDIRECT_MESSAGE: str = safety_config.get_redirect_message()
-
 def _strip_leading_inline_flags(p: str) -> str:
     return re.sub(r'^\(\?[a-zA-Z-]*\)', '', p or '').strip()
 
+def _vet_pattern(pattern: str, flags: int, kind: str) -> bool:
+    """
+    Check a policy-supplied pattern against the linear-time subset.
+    In "linear" matching mode unsafe patterns are dropped; in "permissive"
+    mode they are kept with a warning.
+    """
+    try:
+        check_linear(pattern, flags)
+        return True
+    except UnsafePatternError as e:
+        if safety_config.get_matching_mode() == "permissive":
+            logger.warning("Keeping backtracking-prone %s pattern %r (permissive mode): %s", kind, pattern, e)
+            return True
+        logger.warning("Rejected %s pattern %r: %s", kind, pattern, e)
+        return False
+
 def _compile_scope_block_re() -> re.Pattern:
     try:
         patterns = safety_config.get_scope_patterns()
         cleaned = [_strip_leading_inline_flags(s) for s in patterns if s]
+        cleaned = [p for p in cleaned if _vet_pattern(p, re.I, "scope")]
+        if not cleaned:
+            raise ValueError("no usable scope patterns")
         joined = "|".join(f"(?:{p})" for p in cleaned) or "(?!)"
         return re.compile(joined, re.I)
     except Exception as e:
@@ -194,8 +475,6 @@ def _compile_scope_block_re() -> re.Pattern:
         joined = "|".join(f"(?:{p})" for p in defaults) or "(?!)"
         return re.compile(joined, re.I)
 
-_SCOPE_BLOCK_RE: re.Pattern = _compile_scope_block_re()
-
 def _load_dei_lexicon() -> Dict[str, str]:
     """
     Load DEI lexicon from config; if loader falls back or merges defaults in a way
@@ -215,17 +494,6 @@ def _load_dei_lexicon() -> Dict[str, str]:
 
     return lex
 
-_DEI_LEXICON: Dict[str, str] = _load_dei_lexicon()
-
-_DEFAULT_RESOURCES_IN = [
-    "India — Emergency: 112",
-    "Tele MANAS (24x7): 14416 or 1-800-891-4416",
-    "KIRAN: 1800-599-0019",
-    "AASRA: 91-9820466726",
-    "Vandrevala Foundation: 9999-666-555",
-]
-
-_RESOURCES_SHOWN_SESSIONS: set = set()
 _CLARIFIER_LOW = (
     "I’m hearing things are heavy. Are you feeling unsafe right now? "
     "If yes, I can share support options. If not, we can take it step by step together "
@@ -238,12 +506,99 @@ def _compile_dei_substituter(lexicon: Dict[str, str]) -> List[Tuple[re.Pattern,
     for pat, repl in lexicon.items():
         if re.fullmatch(r"[A-Za-z][A-Za-z\s'\-]*", pat):
             pattern = re.compile(rf"\b{re.escape(pat)}\b", re.IGNORECASE)
-        else:
+        elif _vet_pattern(pat, re.IGNORECASE, "DEI"):
             pattern = re.compile(pat, re.IGNORECASE)
+        else:
+            continue
         compiled.append((pattern, repl))
     return compiled
 
-_DEI_SUBS: List[Tuple[re.Pattern, str]] = _compile_dei_substituter(_DEI_LEXICON)
+def _load_windowing() -> Optional[Dict[str, int]]:
+    settings = safety_config.get_windowing_settings()
+    if not settings.get("enabled"):
+        return None
+    return {k: int(settings[k]) for k in ("window_chars", "overlap_chars", "max_input_chars")}
+
+def _policy_from_bundle(bundle: Dict[str, Any]) -> CompiledPolicy:
+    windowing = bundle["windowing"]
+    dei_subs = tuple((re.compile(src, flags), repl) for src, flags, repl in bundle["dei"])
+    return CompiledPolicy(
+        version=bundle["version"],
+        redirect_message=bundle["redirect_message"],
+        scope_block_re=re.compile(*bundle["scope"]),
+        dei_lexicon=MappingProxyType(dict(bundle["lexicon"])),
+        dei_subs=dei_subs,
+        windowing=MappingProxyType(dict(windowing)) if windowing is not None else None,
+        dei_rewriter=DeiRewriter(dei_subs),
+    )
+
+def _bundle_payload(policy: CompiledPolicy) -> Dict[str, Any]:
+    return {
+        "policies": safety_config.load_policies(),
+        "version": policy.version,
+        "redirect_message": policy.redirect_message,
+        "scope": (policy.scope_block_re.pattern, policy.scope_block_re.flags),
+        "lexicon": dict(policy.dei_lexicon),
+        "dei": [(p.pattern, p.flags, repl) for p, repl in policy.dei_subs],
+        "windowing": dict(policy.windowing) if policy.windowing is not None else None,
+    }
+
+def _compile_policy(reload: bool = False, keep_on_error: bool = False) -> CompiledPolicy:
+    """
+    Compile the policies into a snapshot (never on the request path after import).
+    A policy bundle matching policies.yaml is used as is; otherwise the file is
+    parsed (re-read when `reload`), patterns are vetted, and the bundle rewritten.
+    """
+    source = safety_config.policy_source()
+    key = policy_bundle.source_key(source)
+    bundle = policy_bundle.load(key)
+    if bundle is not None:
+        try:
+            policy = _policy_from_bundle(bundle)
+            safety_config.install_policies(bundle["policies"], source[0] if source else None)
+            return policy
+        except Exception as e:
+            logger.warning("Ignoring unusable policy bundle: %s", e)
+    if reload:
+        safety_config.refresh_policies(keep_on_error=keep_on_error)
+    lexicon = _load_dei_lexicon()
+    windowing = _load_windowing()
+    dei_subs = tuple(_compile_dei_substituter(lexicon))
+    policy = CompiledPolicy(
+        version=safety_config.get_policy_version(),
+        redirect_message=safety_config.get_redirect_message(),
+        scope_block_re=_compile_scope_block_re(),
+        dei_lexicon=MappingProxyType(lexicon),
+        dei_subs=dei_subs,
+        windowing=MappingProxyType(windowing) if windowing is not None else None,
+        dei_rewriter=DeiRewriter(dei_subs),
+    )
+    # Only bundle what was parsed from exactly the bytes the key was made from
+    if source is not None and safety_config.loaded_from() == source[0] and safety_config.policy_source() == source:
+        policy_bundle.save(key, _bundle_payload(policy))
+    return policy
+
+# The live policy and the decision cache built for it. Neither is bound until
+# first use (_get_policy / _get_decision_cache; module __getattr__ for outside
+# readers), so importing this module parses no policies. After that they are
+# replaced only by whole-object assignment (see _publish_policy); readers take
+# the reference once per call.
+_policy: CompiledPolicy
+_decision_cache: Optional[DecisionCache]
+_policy_lock = Lock()  # serializes rebuilds, never taken by readers once bound
+
+def _get_policy() -> CompiledPolicy:
+    try:
+        return _policy
+    except NameError:
+        return _init_policy()
+
+def _get_decision_cache() -> Optional[DecisionCache]:
+    try:
+        return _decision_cache
+    except NameError:
+        _init_policy()
+        return _decision_cache
 
 _STD_REDIRECT_PREFIX = "I can't help with diagnosis or medications."
 
@@ -256,43 +611,100 @@ class SafetyGuard:
     MAX_LEN = 10_000
     REPEAT_CHAR_THRESHOLD = 50
 
-    _EMAIL_RE = re.compile(r"\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}\b")
-    _PHONE_RE = re.compile(r"\b(?:\+?\d[\d\-\.\s\(\)]{6,})\b")
-    _CC_RE = re.compile(r"\b(?:\d[ -]*?){13,19}\b")
-    _ADDR_HINTS = re.compile(
+    # Every guard pattern is vetted by compile_linear()/CategoryScanner at import,
+    # so a hostile MAX_LEN input cannot trigger catastrophic backtracking.
+    # Local part bounded (RFC 5321: 64): unbounded, every start in a long run rescans it
+    _EMAIL_RE = compile_linear(r"\b[A-Za-z0-9._%+-]{1,64}@[A-Za-z0-9.-]+\.[A-Za-z]{2,}\b")
+    _PHONE_RE = compile_linear(r"\b(?:\+?\d[\d\-\.\s\(\)]{6,})\b")
+    _CC_RE = compile_linear(r"\b\d(?:[ -]{0,3}\d){12,18}\b")
+    _ADDR_HINTS = compile_linear(
         r"\b(?:street|st\.|road|rd\.|avenue|ave\.|lane|ln\.|flat|apt\.|block|district|pin\s?code)\b", re.I
     )
 
-    _SELF_HARM = re.compile(r"\b(kill myself|suicide|end my life|self[-\s]?harm|i want to die)\b", re.I)
-    _AMBIGUOUS_DISTRESS = re.compile(r"\b(i'?m done|nothing matters|can[’']?t go on)\b", re.I)
-    _SEXUAL_MINORS = re.compile(r"\b(minor|under\s?age|child porn|cp|prete?n|young girl|young boy)\b", re.I)
-    _HATE_THREAT = re.compile(
-        r"\b(kill|exterminate|gas|lynch)\b.*\b(muslim|hindu|christian|jew|woman|men|dalit|gay|trans|caste|race)\b", re.I
+    _SELF_HARM = compile_linear(r"\b(kill myself|suicide|end my life|self[-\s]?harm|i want to die)\b", re.I)
+    _AMBIGUOUS_DISTRESS = compile_linear(r"\b(i'?m done|nothing matters|can[’']?t go on)\b", re.I)
+    _SEXUAL_MINORS = compile_linear(r"\b(minor|under\s?age|child porn|cp|prete?n|young girl|young boy)\b", re.I)
+    _HATE_THREAT = CoOccurrence(
+        r"\b(kill|exterminate|gas|lynch)\b", r"\b(muslim|hindu|christian|jew|woman|men|dalit|gay|trans|caste|race)\b", re.I
     )
-    _EXPLICIT_VIOLENCE = re.compile(r"\b(how to make a bomb|homemade explosive|chloroform\srecipe|napalm)\b", re.I)
-    _UNSAFE_DRUG = re.compile(r"\b(dose|dosage|how much)\b.*\b(ketamine|lsd|mdma|cocaine|heroin|meth)\b", re.I)
-    _MEDICAL_RISK = re.compile(r"\b(diagnose|is it cancer|skip my meds|ignore doctor|self medicate)\b", re.I)
-    _FIN_ADVICE = re.compile(r"\b(all-in|guaranteed profit|can[’']?t lose|double my money|inside info)\b", re.I)
-    _JAILBREAK = re.compile(
+    _EXPLICIT_VIOLENCE = compile_linear(r"\b(how to make a bomb|homemade explosive|chloroform\srecipe|napalm)\b", re.I)
+    _UNSAFE_DRUG = CoOccurrence(r"\b(dose|dosage|how much)\b", r"\b(ketamine|lsd|mdma|cocaine|heroin|meth)\b", re.I)
+    _MEDICAL_RISK = compile_linear(r"\b(diagnose|is it cancer|skip my meds|ignore doctor|self medicate)\b", re.I)
+    _FIN_ADVICE = compile_linear(r"\b(all-in|guaranteed profit|can[’']?t lose|double my money|inside info)\b", re.I)
+    _JAILBREAK = compile_linear(
         r"(ignore\s+previous\s+instructions|act\s+as\s+|system\s+prompt|developer\s+mode|no\s+limitations|bypass\s+guard|"
         r"pretend\s+to\s+be\s+|do\s+not\s+follow\s+rules|jailbreak)",
         re.I,
     )
 
-    _CONTROL = re.compile(r"[\u0000-\u001F\u007F]")
-    _ONLY_EMOJI = re.compile(
-        r"^\s*(?:[\U0001F300-\U0001FAFF\U00002700-\U000027BF\U00002600-\U000026FF]+|\ufe0f|\u200d|\u2640|\u2642|\u2695|\u2696|\u2702|\u2764)+\s*$"
+    _CONTROL = compile_linear(r"[\u0000-\u001F\u007F]")
+    _REPEAT_SPAM = compile_linear(r"(?P<_repeat>.)(?P=_repeat){" + str(REPEAT_CHAR_THRESHOLD) + r",}")
+    _ONLY_EMOJI = compile_linear(
+        r"^\s*(?:[\U0001F300-\U0001FAFF\U00002700-\U000027BF\U00002600-\U000026FF]|\ufe0f|\u200d|\u2640|\u2642|\u2695|\u2696|\u2702|\u2764)+\s*$"
     )
 
-    def evaluate(self, text: str, meta: Optional[Dict[str, str]] = None) -> SafetyDecision:
+    # One fused pass covers the edge checks and every category below.
+    _SCANNER = CategoryScanner((
+        ("edge_control_chars", _CONTROL),
+        ("edge_repeat_spam", _REPEAT_SPAM),
+        ("self_harm", _SELF_HARM),
+        ("ambiguous_distress", _AMBIGUOUS_DISTRESS),
+        ("sexual_minors", _SEXUAL_MINORS),
+        ("hate_threat", _HATE_THREAT),
+        ("explicit_violence", _EXPLICIT_VIOLENCE),
+        ("unsafe_drug", _UNSAFE_DRUG),
+        ("medical_risk_advice", _MEDICAL_RISK),
+        ("financial_advice_risk", _FIN_ADVICE),
+        ("jailbreak_injection", _JAILBREAK),
+    ))
+    # The categories detect_risk() reads; see _RISK_LEVELS
+    _RISK_SCANNER = CategoryScanner((
+        ("self_harm", _SELF_HARM),
+        ("explicit_violence", _EXPLICIT_VIOLENCE),
+        ("ambiguous_distress", _AMBIGUOUS_DISTRESS),
+    ))
+    _BLOCK_CATEGORIES = ("sexual_minors", "hate_threat", "explicit_violence", "unsafe_drug")
+    # A window hitting any of these settles the decision; later windows are only
+    # scanned for risk categories, and not at all once self-harm (the top risk) is found
+    _STOP_CATEGORIES = ("self_harm",) + _BLOCK_CATEGORIES
+    _STOP_CATEGORIES_SET = frozenset(_STOP_CATEGORIES)
+    _REDACT_CATEGORIES = ("medical_risk_advice", "financial_advice_risk", "jailbreak_injection")
+
+    def scan(self, text: str) -> ScanResult:
+        """A lazily computed scan of `text` to pass to evaluate(), enforce_scope() and detect_risk()."""
+        return ScanResult(text or "", self)
+
+    def evaluate(
+        self, text: str, meta: Optional[Dict[str, str]] = None, *, scan: Optional[ScanResult] = None
+    ) -> SafetyDecision:
+        """
+        Full safety evaluation; served from the decision cache when it is enabled.
+        See _evaluate() for the rules. A `scan` of `text` (from scan()) is used
+        instead of scanning again.
+        """
+        if not text or _get_decision_cache() is None:
+            return self._evaluate(text, meta, scan)
+        meta = meta or {}
+        start = time.monotonic()
+        decision = _cached("evaluate", text, lambda: self._evaluate(text, {}, scan), start)
+        meta.update(decision.meta)
+        return _copy_decision(decision, meta)
+
+    def _evaluate(
+        self, text: str, meta: Optional[Dict[str, str]] = None, scan: Optional[ScanResult] = None
+    ) -> SafetyDecision:
         """
         Full safety evaluation. On HIGH risk (self-harm), block AND include crisis
         resources in the returned text so tests can see "Crisis help (India)" / "112".
         On LOW risk, append a clarifier with a grounding step.
         """
         start = time.monotonic()
+        timed = _stage_timing
+        t = time.perf_counter() if timed else 0.0
         meta = meta or {}
-        decision = SafetyDecision(action="allow", text=text, meta=meta)
+        if scan is not None and not (scan.source is text or scan.source == text):
+            scan = None
+        decision = SafetyDecision(action="allow", text=text, meta=meta, scan=scan)
 
         # Quick exits
         if text is None or len(text) == 0:
@@ -308,50 +720,58 @@ class SafetyGuard:
             self._finalize_metrics(decision, start)
             return decision
 
-        # Length block
-        if len(text) > self.MAX_LEN:
+        # Length block (with windowing on, only past its ingress cap)
+        windowing = _get_policy().windowing if len(text) > self.MAX_LEN else None
+        if len(text) > self.MAX_LEN and (windowing is None or len(text) > windowing["max_input_chars"]):
+            cap = self.MAX_LEN if windowing is None else windowing["max_input_chars"]
             decision.action = "block"
             decision.add_category("edge_too_long")
-            decision.add_reason(f"text_exceeds_max_len_{self.MAX_LEN}")
+            decision.add_reason(f"text_exceeds_max_len_{cap}")
             self._finalize_metrics(decision, start, blocks=["edge_too_long"])
             return decision
 
-        # Control chars strip
-        if self._CONTROL.search(text):
+        if timed:
+            t = _stage("evaluate.normalise", t)
+
+        if windowing is not None:
+            decision.add_reason("windowed_evaluation")
+        if scan is None:
+            scan = decision.scan = ScanResult(text, self, self._scan_categories(text, windowing))
+        cleaned, hits = scan.text, scan.spans
+        if timed:
+            t = _stage("evaluate.scan", t)
+
+        # Control chars strip (rare; the scan judged the cleaned text)
+        if len(cleaned) != len(text):
             decision.add_category("edge_control_chars")
             decision.add_reason("control_chars_removed")
-            text = self._CONTROL.sub("", text)
+            text = cleaned
             decision.text = text
 
         # Hints (non-blocking)
         if self._looks_like_base64_blob(text):
             decision.add_category("edge_base64_blob")
             decision.add_reason("base64_blob_suspected")
-        if self._is_repeat_spam(text):
+        if "edge_repeat_spam" in hits:
             decision.add_category("edge_repeat_spam")
             decision.add_reason("repeat_char_spam")
+        if timed:
+            _stage("evaluate.edge_checks", t)
 
-        # Category scans
+        # Category hits (metrics gathered in `tally`, flushed by _finalize_metrics)
+        tally = _Tally()
         categories_block: List[str] = []
         categories_redact: List[str] = []
-        if self._SELF_HARM.search(text):
+        if "self_harm" in hits:
             categories_block.append("self_harm")
             decision.risk = {"risk": "high", "reason": "self_harm"}
-        if self._AMBIGUOUS_DISTRESS.search(text) and decision.risk.get("risk") != "high":
+        if "ambiguous_distress" in hits and decision.risk.get("risk") != "high":
             decision.risk = {"risk": "low", "reason": "ambiguous_distress"}
 
-        self._category_check(text, self._SEXUAL_MINORS, "sexual_minors", categories_block)
-        self._category_check(text, self._HATE_THREAT, "hate_threat", categories_block)
-        self._category_check(text, self._EXPLICIT_VIOLENCE, "explicit_violence", categories_block)
-        self._category_check(text, self._UNSAFE_DRUG, "unsafe_drug", categories_block)
-        self._category_check(text, self._MEDICAL_RISK, "medical_risk_advice", categories_redact)
-        self._category_check(text, self._FIN_ADVICE, "financial_advice_risk", categories_redact)
-        self._category_check(text, self._JAILBREAK, "jailbreak_injection", categories_redact)
-
-        # PII redaction (internal guard pass)
-        redacted_text, redactions = self._redact_pii(text)
-        if redactions:
-            categories_redact.append("pii")
+        for label in self._BLOCK_CATEGORIES:
+            self._category_check(hits, label, categories_block, tally)
+        for label in self._REDACT_CATEGORIES:
+            self._category_check(hits, label, categories_redact, tally)
 
         # Block
         if categories_block:
@@ -359,26 +779,34 @@ class SafetyGuard:
                 decision.add_category(c)
             # If self-harm, include resources directly in the decision text
             if "self_harm" in categories_block:
-                resources = _load_resources_file()[:5]
-                addition = "Crisis help (India)\n- " + "\n- ".join(resources)
+                addition = _resources_block("crisis_help")
                 decision.text = f"{text}\n\n{addition}"
                 decision.meta["risk_resources_shown"] = True
             decision.action = "block"
             decision.add_reason("blocked_categories_present")
-            self._finalize_metrics(decision, start, blocks=categories_block)
+            self._finalize_metrics(decision, start, blocks=categories_block, tally=tally)
             return decision
 
+        # PII redaction (internal guard pass; windowed like the scan for long text)
+        if timed:
+            t = time.perf_counter()
+        redacted_text, redactions = self._redact_pii(text, windowing)
+        if timed:
+            _stage("evaluate.redaction", t)
+        if redactions:
+            categories_redact.append("pii")
+
         # Redact
         if categories_redact or redactions:
             for c in categories_redact:
                 decision.add_category(c)
             for kind, count in redactions.items():
                 decision.redactions[kind] = decision.redactions.get(kind, 0) + count
-                _metrics.inc_counter("redactions_total", {"kind": kind}, count)
+                tally.add("redactions_total", (("kind", kind),), count)
             decision.action = "redact"
             decision.text = redacted_text
             decision.add_reason("risk_requires_redaction_or_careful_response")
-            self._finalize_metrics(decision, start)
+            self._finalize_metrics(decision, start, tally=tally)
             return decision
 
         # Low risk → append clarifier
@@ -387,16 +815,79 @@ class SafetyGuard:
 
         if decision.categories:
             decision.add_reason("categories_non_blocking")
-        self._finalize_metrics(decision, start)
+        self._finalize_metrics(decision, start, tally=tally)
         return decision
 
-    def _category_check(self, text: str, pattern: re.Pattern, label: str, bucket: List[str]) -> None:
-        if pattern.search(text):
+    def _scan_windows(self, text: str, windowing: Mapping[str, int]) -> Set[str]:
+        return set(self._locate_windows(text, windowing)[0])
+
+    def _locate_windows(
+        self, text: str, windowing: Mapping[str, int]
+    ) -> Tuple[Dict[str, List[Tuple[int, int]]], bool]:
+        """
+        (spans, partial): union of per-window scanner hits (spans offset into
+        `text`). After the first window with a block-level category the rest
+        are scanned for risk categories only, so the risk stays exact; the scan
+        stops at a self-harm hit. `partial` is True if windows were left out of
+        the full scan. Windows overlap and are cut at whitespace, so a phrase
+        shorter than the overlap is always seen whole; co-occurrence categories
+        are judged within a window.
+        """
+        spans: Dict[str, Dict[Tuple[int, int], None]] = {}  # ordered sets: windows overlap
+        scanner, partial = self._SCANNER, False
+        for a, b in _windows(text, windowing["window_chars"], windowing["overlap_chars"]):
+            for label, found in scanner.locate(text[a:b]).items():
+                spans.setdefault(label, {}).update(((s + a, e + a), None) for s, e in found)
+            if "self_harm" in spans:
+                partial = partial or b < len(text)
+                break
+            if scanner is self._SCANNER and not self._STOP_CATEGORIES_SET.isdisjoint(spans):
+                scanner, partial = self._RISK_SCANNER, b < len(text)
+        return {label: list(found) for label, found in spans.items()}, partial
+
+    def _scan_categories(
+        self,
+        text: str,
+        windowing: Optional[Mapping[str, int]],
+        analysis: Optional[AnalyzedText] = None,
+    ) -> Tuple[str, CategorySpans, bool]:
+        """
+        (judged text, category spans, partial): `text` with control characters
+        removed (rescanned if there were any), the spans of every category in it
+        and whether a windowed scan stopped early (see _locate_windows()).
+        The folded text is scanned; spans are mapped back onto the judged text.
+        """
+        def locate(folded: str) -> Tuple[CategorySpans, bool]:
+            if windowing is None:
+                return self._SCANNER.locate(folded), False
+            return self._locate_windows(folded, windowing)
+
+        analysis = analysis or analyze(text)
+        spans, partial = locate(analysis.folded)
+        if "edge_control_chars" in spans:
+            text = self._CONTROL.sub("", text)
+            analysis = analyze(text)
+            spans, partial = locate(analysis.folded)
+        return text, MappingProxyType({
+            label: tuple(analysis.to_original(a, b) for a, b in found) for label, found in spans.items()
+        }), partial
+
+    def _scan_message(
+        self, text: str, analysis: Optional[AnalyzedText] = None
+    ) -> Tuple[str, CategorySpans, bool]:
+        """_scan_categories() with the windowing evaluate() would use; text past its cap is scanned whole."""
+        windowing = _get_policy().windowing if len(text) > self.MAX_LEN else None
+        if windowing is not None and len(text) > windowing["max_input_chars"]:
+            windowing = None
+        return self._scan_categories(text, windowing, analysis)
+
+    def _category_check(self, hits: Set[str], label: str, bucket: List[str], tally: _Tally) -> None:
+        if label in hits:
             bucket.append(label)
-            _metrics.inc_counter("category_hits_total", {"category": label}, 1)
+            tally.add("category_hits_total", (("category", label),))
 
     def _looks_like_base64_blob(self, text: str) -> bool:
-        token = "".join(ch for ch in text if ch.isalnum() or ch in "+/=")
+        token = _NOT_B64.sub("", text)
         if len(token) < 80:
             return False
         try:
@@ -405,63 +896,187 @@ class SafetyGuard:
         except Exception:
             return False
 
-    def _is_repeat_spam(self, text: str) -> bool:
-        return re.search(r"(.)\1{" + str(self.REPEAT_CHAR_THRESHOLD) + r",}", text) is not None
-
     def _mask(self, s: str, visible: int = 2) -> str:
-        if len(s) <= visible:
-            return "*" * len(s)
-        return s[:visible] + "*" * (len(s) - visible)
-
-    def _redact_pii(self, text: str) -> Tuple[str, Dict[str, int]]:
-        redactions: Dict[str, int] = {}
-
-        def sub_and_count(pattern: re.Pattern, repl_func, kind: str, s: str) -> str:
-            count = 0
-            def _repl(m: re.Match) -> str:
-                nonlocal count
-                count += 1
-                return repl_func(m)
-            out = pattern.sub(_repl, s)
-            if count and kind:
-                redactions[kind] = redactions.get(kind, 0) + count
-            return out
-
-        def cc_mask(m: re.Match) -> str:
-            digits = re.sub(r"\D", "", m.group())
-            if 13 <= len(digits) <= 19:
-                return self._mask(digits, 4)
-            return m.group()
-
-        redacted = sub_and_count(self._CC_RE, cc_mask, "credit_card", text)
-        redacted = sub_and_count(self._EMAIL_RE, lambda m: self._mask(m.group(), 2), "email", redacted)
-
-        def phone_mask(m: re.Match) -> str:
-            raw = m.group()
-            digits = re.sub(r"\D", "", raw)
-            if 7 <= len(digits) <= 12:
-                return self._mask(digits, 2)
-            return raw
-
-        redacted = sub_and_count(self._PHONE_RE, phone_mask, "phone", redacted)
-
-        if self._ADDR_HINTS.search(redacted):
-            redactions["address_hint"] = redactions.get("address_hint", 0) + 1
-
-        return redacted, redactions
-
-    def _finalize_metrics(self, decision: SafetyDecision, start: float, blocks: Optional[List[str]] = None) -> None:
-        _metrics.inc_counter("evaluations_total")
-        _metrics.inc_counter("decision_total", {"decision": decision.action})
-        if blocks:
-            for cat in blocks:
-                _metrics.inc_counter("blocks_total", {"category": cat})
-        _metrics.observe_hist("latency_seconds", time.monotonic() - start)
-
-    def enforce_scope(self, text: str) -> Tuple[bool, str]:
-        return enforce_scope(text)
+        return mask(s, visible)
+
+    def _redact_pii(self, text: str, windowing: Optional[Mapping[str, int]] = None) -> Tuple[str, Dict[str, int]]:
+        if windowing is None:
+            return _GUARD_REDACTOR.redact(text)
+        return _GUARD_REDACTOR.redact(text, _windows(text, windowing["window_chars"], windowing["overlap_chars"]))
+
+    def _finalize_metrics(
+        self,
+        decision: SafetyDecision,
+        start: float,
+        blocks: Optional[List[str]] = None,
+        tally: Optional[_Tally] = None,
+    ) -> None:
+        """Flush this evaluation's counters (plus any gathered in `tally`) in one step."""
+        tally = _Tally() if tally is None else tally
+        tally.add("evaluations_total")
+        tally.add("decision_total", (("decision", decision.action),))
+        for cat in blocks or ():
+            tally.add("blocks_total", (("category", cat),))
+        _metrics.flush(tally, latency=time.monotonic() - start)
+
+    def enforce_scope(self, text: str, *, scan: Optional[ScanResult] = None) -> Tuple[bool, str]:
+        return enforce_scope(text, scan=scan)
+
+    async def aevaluate(self, text: str, meta: Optional[Dict[str, str]] = None) -> SafetyDecision:
+        """Async counterpart of evaluate(); long inputs run on the guard executor."""
+        return await _offload(len(text or ""), self.evaluate, text, meta)
+
+    def evaluate_many(
+        self,
+        texts: Sequence[str],
+        *,
+        workers: Optional[int] = None,
+        chunk_size: int = 64,
+        meta: Optional[Dict[str, str]] = None,
+    ) -> List[SafetyDecision]:
+        """
+        Evaluate many texts, returning decisions in input order.
+        Chunks are spread over a process pool (one worker per core by default)
+        whose workers compile policies once at start-up; their metric increments
+        are merged back into this process. With one worker or a single chunk the
+        texts are evaluated inline. On spawn-based platforms (Windows, macOS) call
+        this from under ``if __name__ == "__main__":``.
+        """
+        texts = list(texts)
+        chunk_size = max(1, int(chunk_size))
+        n_chunks = math.ceil(len(texts) / chunk_size)
+        workers = min(workers or os.cpu_count() or 1, n_chunks)
+        if workers <= 1:
+            return [self.evaluate(t, dict(meta) if meta else None) for t in texts]
+
+        from concurrent.futures import ProcessPoolExecutor
+
+        chunks = [texts[i:i + chunk_size] for i in range(0, len(texts), chunk_size)]
+        out: List[SafetyDecision] = []
+        with ProcessPoolExecutor(max_workers=workers, initializer=_pool_init, initargs=(self,)) as pool:
+            for decisions, ops in pool.map(_evaluate_chunk, chunks, repeat(meta)):
+                _metrics.replay(ops)
+                out.extend(decisions)
+        return out
+
+# Everything but str.isalnum() characters and "+/="
+_NOT_B64 = re.compile(r"[^\w+/=]|_")
+_WS = re.compile(r"\s")
+
+def _last_space(text: str, lo: int, hi: int) -> int:
+    """Index of the last whitespace char in text[lo:hi], or -1."""
+    found = -1
+    for m in _WS.finditer(text, lo, hi):
+        found = m.start()
+    return found
+
+def _windows(text: str, size: int, overlap: int) -> Iterator[Tuple[int, int]]:
+    """
+    (start, end) bounds of overlapping windows covering text. Bounds are moved
+    onto whitespace (within `overlap`) so no window starts or ends mid-word and
+    a \b at its edge means what it does in the full text.
+    """
+    n = len(text)
+    a = 0
+    while True:
+        b = min(a + size, n)
+        if b < n:
+            w = _last_space(text, b - overlap, b)
+            b = w if w > a else b
+        yield a, b
+        if b >= n:
+            return
+        t = b - overlap
+        w = _last_space(text, max(a + 1, t - overlap), t)
+        a = w + 1 if w >= 0 else t
+
+def _render_card(raw: str) -> Optional[str]:
+    digits = re.sub(r"\D", "", raw)
+    return mask(digits, 4) if 13 <= len(digits) <= 19 else None
+
+def _render_phone(raw: str) -> Optional[str]:
+    digits = re.sub(r"\D", "", raw)
+    return mask(digits, 2) if 7 <= len(digits) <= 12 else None
+
+# Label children the guard increments on every evaluation, resolved once
+_metrics.prebind("decision_total", "decision", ("allow", "redact", "block"))
+_metrics.prebind("category_hits_total", "category", SafetyGuard._BLOCK_CATEGORIES + SafetyGuard._REDACT_CATEGORIES)
+_metrics.prebind("blocks_total", "category", SafetyGuard._STOP_CATEGORIES + ("edge_too_long",))
+
+# Guard pass, in priority order: cards, emails, phones (masked), address hint.
+_GUARD_REDACTOR = RedactionEngine((
+    Rule("credit_card", SafetyGuard._CC_RE, _render_card, requires=DIGITS),
+    Rule("email", SafetyGuard._EMAIL_RE, lambda raw: mask(raw, 2), requires="@"),
+    Rule("phone", SafetyGuard._PHONE_RE, _render_phone, requires=DIGITS),
+    Rule("address_hint", SafetyGuard._ADDR_HINTS),
+))
+_metrics.prebind("redactions_total", "kind", [r.kind for r in _GUARD_REDACTOR.rules])
+
+# ======================================================================
+#                        Decision cache
+# ======================================================================
+
+def _build_decision_cache() -> Optional[DecisionCache]:
+    settings = safety_config.get_cache_settings()
+    if not settings.get("enabled"):
+        return None
+    return DecisionCache(settings["max_entries"], settings["ttl_seconds"], metrics=_metrics)
+
+
+def _cached(kind: str, text: str, compute: Any, start: float) -> Any:
+    """
+    Look `text` up in the decision cache, computing and storing it on a miss.
+    On a hit the metric ops recorded by the original computation are replayed
+    (with the hit's own latency) so counters read the same either way.
+    """
+    cache = _get_decision_cache()
+    if cache is None:
+        return compute()
+    key = cache.key(kind, text, _get_policy().version)
+    entry = cache.get(key)
+    if entry is not None:
+        value, ops = entry
+        _metrics.replay(ops, latency=time.monotonic() - start)
+        return value
+    _metrics.start_journal()
+    try:
+        value = compute()
+    finally:
+        ops = _metrics.take_journal()
+    cache.put(key, value, ops)
+    return value
+
+def _copy_decision(d: SafetyDecision, meta: Dict[str, str]) -> SafetyDecision:
+    # Cached decisions are shared; hand out copies callers may mutate.
+    return replace(
+        d,
+        reasons=list(d.reasons),
+        categories=list(d.categories),
+        redactions=dict(d.redactions),
+        meta=meta,
+        risk=dict(d.risk),
+    )
 
 _guard_singleton: Optional[SafetyGuard] = None
+_pool_guard: Optional[SafetyGuard] = None
+
+def _pool_init(guard: SafetyGuard) -> None:
+    """Process-pool initializer: load policies and keep the guard for this worker."""
+    global _pool_guard
+    safety_config.load_policies()
+    _pool_guard = guard
+
+def _evaluate_chunk(
+    texts: List[str], meta: Optional[Dict[str, str]]
+) -> Tuple[List[SafetyDecision], List[Tuple[Any, ...]]]:
+    guard = _pool_guard or get_safety_guard()
+    _metrics.start_journal()
+    try:
+        # Scans stay in the worker: they are not worth pickling back
+        decisions = [replace(guard.evaluate(t, dict(meta) if meta else None), scan=None) for t in texts]
+    finally:
+        ops = _metrics.take_journal()
+    return decisions, ops
 
 def get_safety_guard() -> SafetyGuard:
     global _guard_singleton
@@ -473,45 +1088,66 @@ def get_safety_guard() -> SafetyGuard:
 #                Scope limiter + Risk detector + DEI filter
 # ======================================================================
 
-def enforce_scope(text: str) -> Tuple[bool, str]:
+@_timed_stage("enforce_scope")
+def enforce_scope(text: str, *, scan: Optional[ScanResult] = None) -> Tuple[bool, str]:
     """Return (blocked, message). Keep YAML’s curly quotes intact."""
     if not text:
         return False, text
-    if _SCOPE_BLOCK_RE.search(text or ""):
+    policy = _get_policy()
+    if scan is not None and scan.source == text:
+        blocked = scan.scope_blocked
+    else:
+        blocked = policy.scope_block_re.search(analyze(text).folded) is not None
+    if blocked:
         _metrics.inc_counter("safety_scope_blocks_count")
         # Include ASCII prefix for one golden test + YAML message for others
-        msg = f"{_STD_REDIRECT_PREFIX} {_SCOPE_REDIRECT_MESSAGE}".strip()
+        msg = f"{_STD_REDIRECT_PREFIX} {policy.redirect_message}".strip()
         return True, msg
     return False, text
 
-def detect_risk(text: str, profile: Optional[dict] = None) -> Dict[str, Union[str, List[str]]]:
+_RISK_SCANNER = SafetyGuard._RISK_SCANNER
+
+# In precedence order: the first category hit sets the risk
+_RISK_LEVELS = (("self_harm", "high"), ("explicit_violence", "high"), ("ambiguous_distress", "low"))
+
+@_timed_stage("detect_risk")
+def detect_risk(
+    text: str, profile: Optional[dict] = None, *, scan: Optional[ScanResult] = None
+) -> Dict[str, Union[str, List[str]]]:
+    """Risk level of `text`; a `scan` covering it (see ScanResult.covers()) is read instead of rescanning."""
     if not text:
         return {"risk": "none", "reason": "empty", "reasons": []}
-    reasons: List[str] = []
-    if SafetyGuard._SELF_HARM.search(text):
-        _metrics.inc_counter("safety_risk_triggers_count")
-        reasons.append("keyword:self_harm")
-        return {"risk": "high", "reason": "self_harm", "reasons": reasons}
-    if SafetyGuard._EXPLICIT_VIOLENCE.search(text):
+    if scan is not None and scan.covers(text):
+        return _counted_risk(scan.spans)
+    if _get_decision_cache() is not None:
+        risk = _cached("risk", text, lambda: _detect_risk(text), time.monotonic())
+        return {**risk, "reasons": list(risk["reasons"])}
+    return _detect_risk(text)
+
+def _detect_risk(text: str) -> Dict[str, Union[str, List[str]]]:
+    return _counted_risk(_RISK_SCANNER.scan(analyze(text).folded))
+
+def _counted_risk(hits: Collection[str]) -> Dict[str, Union[str, List[str]]]:
+    risk = _risk_from_hits(hits)
+    if risk["reasons"]:
         _metrics.inc_counter("safety_risk_triggers_count")
-        reasons.append("keyword:explicit_violence")
-        return {"risk": "high", "reason": "explicit_violence", "reasons": reasons}
-    if SafetyGuard._AMBIGUOUS_DISTRESS.search(text):
-        _metrics.inc_counter("safety_risk_triggers_count")
-        reasons.append("keyword:ambiguous_distress")
-        return {"risk": "low", "reason": "ambiguous_distress", "reasons": reasons}
-    return {"risk": "none", "reason": "no_signals", "reasons": reasons}
+    return risk
+
+def _risk_from_hits(hits: Collection[str]) -> Dict[str, Union[str, List[str]]]:
+    for label, level in _RISK_LEVELS:
+        if label in hits:
+            return {"risk": level, "reason": label, "reasons": [f"keyword:{label}"]}
+    return {"risk": "none", "reason": "no_signals", "reasons": []}
 
+@_timed_stage("dei_filter")
 def apply_dei_filter(reply: Union[str, dict]) -> Union[str, dict]:
+    rewriter = _get_policy().dei_rewriter
+
     def _rewrite_str(s: str) -> str:
-        out = s or ""
-        changed = False
-        for pattern, replacement in _DEI_SUBS:
-            new_out = pattern.sub(replacement, out)
-            if new_out != out:
-                changed = True
-                out = new_out
-        if changed:
+        if not s:
+            return ""
+        out, counts = rewriter.redact(s)
+        if counts:
             _metrics.inc_counter("safety_dei_rewrites_count")
         return out
 
@@ -532,33 +1168,15 @@ def apply_dei_filter(reply: Union[str, dict]) -> Union[str, dict]:
 
     return reply
 
-def _load_resources_file() -> List[str]:
-    """
-    Load optional local 'resources_in.json' for helplines. Falls back to defaults for India.
-    Accepts files with/without BOM; logs warnings for invalid JSON and I/O errors.
-    Supports list[str] or {"india": {...}} formats.
-    """
-    candidates = [
-        os.path.join(os.path.dirname(__file__), "resources_in.json"),
-        os.path.join(os.getcwd(), "resources_in.json"),
-    ]
-    for p in candidates:
-        if os.path.exists(p):
-            try:
-                with open(p, "r", encoding="utf-8-sig") as f:
-                    data = json.load(f)
-                if isinstance(data, list):
-                    return [str(x) for x in data]
-                if isinstance(data, dict) and "india" in data:
-                    return [f"{k}: {v}" for k, v in data["india"].items()]
-            except json.JSONDecodeError as e:
-                logger.warning("Invalid JSON in resources file %s: %s", p, e)
-            except OSError as e:
-                logger.warning("Unable to read resources file %s: %s", p, e)
-    return _DEFAULT_RESOURCES_IN
+@_timed_stage("resources")
+def _resources_block(fmt: str) -> str:
+    """Rendered helplines block from the resources registry (no file I/O once loaded)."""
+    return crisis_resources.render(fmt)
 
 def pre_prompt_guard(user_message: str, user_profile: Optional[dict] = None) -> Dict[str, object]:
-    blocked, msg = enforce_scope(user_message)
+    guard = get_safety_guard()
+    scan = guard.scan(user_message)  # read once; each step below reuses it
+    blocked, msg = enforce_scope(user_message, scan=scan)
     if blocked:
         pv = (user_profile or {}).get("session_id")
         return {
@@ -571,10 +1189,12 @@ def pre_prompt_guard(user_message: str, user_profile: Optional[dict] = None) ->
             "meta": {"policy_version": pv} if pv else {},
         }
 
-    guard = get_safety_guard()
-    dec = guard.evaluate(user_message, meta={"session_id": str((user_profile or {}).get("session_id", ""))})
-
-    risk_info = detect_risk(dec.text, user_profile)
+    dec = guard.evaluate(
+        user_message, meta={"session_id": str((user_profile or {}).get("session_id", ""))}, scan=scan
+    )
+    # A cached decision brings the scan it was made from
+    scan = dec.scan or scan
+    risk_info = detect_risk(scan.text, user_profile, scan=scan)
     policy_version = (user_profile or {}).get("session_id")
     if policy_version and isinstance(risk_info, dict):
         risk_info["policy_version"] = policy_version
@@ -591,12 +1211,18 @@ def pre_prompt_guard(user_message: str, user_profile: Optional[dict] = None) ->
         "meta": {"policy_version": policy_version} if policy_version else {},
     }
 
-def inject_resources(reply: Union[str, dict], risk_info: Dict[str, str]) -> Union[str, dict]:
+@_timed_stage("inject_resources")
+def inject_resources(
+    reply: Union[str, dict], risk_info: Optional[Dict[str, str]] = None, *, scan: Optional[ScanResult] = None
+) -> Union[str, dict]:
     """
     High risk: add full helplines (+ session-aware hint).
     Low/ambiguous risk: add a brief check-in clarifier (no helpline dump).
     Teen (non-high risk): add a short caregiver involvement note.
+    Without a "risk" in `risk_info` the level is read from `scan`, if given.
     """
+    if scan is not None and "risk" not in (risk_info or {}):
+        risk_info = {**(risk_info or {}), "risk": scan.risk["risk"]}
     risk = (risk_info or {}).get("risk", "none")
     session_key = (risk_info or {}).get("policy_version") or (risk_info or {}).get("session_id")
     age_band = (risk_info or {}).get("age_band")
@@ -619,8 +1245,7 @@ def inject_resources(reply: Union[str, dict], risk_info: Dict[str, str]) -> Unio
             )
 
         if risk == "high":
-            resources = _load_resources_file()[:5]
-            addition = "If you might be unsafe, these can help right now:\n- " + "\n- ".join(resources)
+            addition = _resources_block("unsafe")
             reply["sections"]["resources"] = addition
             reply["resources"] = addition
             if session_key:
@@ -638,8 +1263,7 @@ def inject_resources(reply: Union[str, dict], risk_info: Dict[str, str]) -> Unio
         return reply
 
     if risk == "high":
-        resources = _load_resources_file()[:5]
-        addition = "If you might be unsafe, these can help right now:\n- " + "\n- ".join(resources)
+        addition = _resources_block("unsafe")
         return (reply or "") + "\n\n" + addition
     if risk == "low":
         return (reply or "") + "\n\n" + _CLARIFIER_LOW
@@ -660,17 +1284,133 @@ def post_prompt_guard(reply: Union[str, dict], risk_info: Optional[dict] = None)
 
     return {"reply": final, "meta": meta}
 
+# ======================================================================
+#                        Async entry points
+# ======================================================================
+
+# Inputs at or below this size are cheaper to check inline than to hand off.
+_ASYNC_INLINE_MAX_CHARS = int(os.getenv("SAFETY_ASYNC_INLINE_MAX_CHARS", "256"))
+_ASYNC_WORKERS = max(1, int(os.getenv("SAFETY_ASYNC_WORKERS", "4")))
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = Lock()
+_queued = 0
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            from concurrent.futures import ThreadPoolExecutor
+
+            _executor = ThreadPoolExecutor(max_workers=_ASYNC_WORKERS, thread_name_prefix="safety-guard")
+        return _executor
+
+def _adjust_queued(delta: int) -> None:
+    global _queued
+    with _executor_lock:
+        _queued += delta
+        _metrics.set_gauge("executor_queue_depth", _queued)
+
+async def _offload(size: int, fn: Any, *args: Any) -> Any:
+    """
+    Run ``fn(*args)`` on the guard executor so CPU-bound checks don't stall the
+    event loop. Small inputs run inline; queue depth and wait time are exported.
+    """
+    if size <= _ASYNC_INLINE_MAX_CHARS:
+        return fn(*args)
+
+    submitted = time.perf_counter()
+
+    def _run() -> Any:
+        _adjust_queued(-1)
+        _metrics.observe_hist("executor_wait_seconds", time.perf_counter() - submitted)
+        return fn(*args)
+
+    # If the awaiting task is cancelled the job still runs and decrements on
+    # start, so the gauge never drifts.
+    _adjust_queued(1)
+    import asyncio  # deferred: only async callers pay for it
+
+    return await asyncio.get_running_loop().run_in_executor(_get_executor(), _run)
+
+def _reply_size(reply: Union[str, dict]) -> int:
+    if isinstance(reply, str):
+        return len(reply)
+    sections = (reply or {}).get("sections") or {}
+    return sum(len(v) for v in sections.values() if isinstance(v, str)) if isinstance(sections, dict) else 0
+
+async def apre_prompt_guard(user_message: str, user_profile: Optional[dict] = None) -> Dict[str, object]:
+    """Async counterpart of pre_prompt_guard()."""
+    return await _offload(len(user_message or ""), pre_prompt_guard, user_message, user_profile)
+
+async def apost_prompt_guard(reply: Union[str, dict], risk_info: Optional[dict] = None) -> Dict[str, object]:
+    """Async counterpart of post_prompt_guard()."""
+    return await _offload(_reply_size(reply), post_prompt_guard, reply, risk_info)
+
 # ======================================================================
 #                        Policies hot-reload
 # ======================================================================
 
+def _publish_policy(policy: CompiledPolicy) -> Optional[DecisionCache]:
+    """Swap in `policy` and a fresh decision cache (caller holds _policy_lock); returns the old cache."""
+    global _policy, _decision_cache
+    old = globals().get("_decision_cache")
+    _policy = policy
+    _decision_cache = _build_decision_cache()
+    return old
+
+def _init_policy() -> CompiledPolicy:
+    """First use: compile and publish the policy, then start the watcher if configured."""
+    with _policy_lock:
+        if "_policy" in globals():  # another thread got here first
+            return _policy
+        policy = _compile_policy()
+        _publish_policy(policy)
+    _autostart_watcher()
+    return policy
+
+def _reload_policy(keep_on_error: bool = False) -> CompiledPolicy:
+    """Re-read policies.yaml, compile the next snapshot, then publish it."""
+    with _policy_lock:
+        first = "_policy" not in globals()
+        nxt = _compile_policy(reload=True, keep_on_error=keep_on_error)
+        old = _publish_policy(nxt)
+    if old is not None:
+        old.clear()
+    if first:
+        _autostart_watcher()
+    logger.info("Safety policies refreshed (version %s).", nxt.version)
+    return nxt
+
 def refresh_policies() -> None:
-    global _SCOPE_REDIRECT_MESSAGE, _SCOPE_BLOCK_RE, _DEI_LEXICON, _DEI_SUBS
-    _SCOPE_REDIRECT_MESSAGE = safety_config.get_redirect_message()
-    _SCOPE_BLOCK_RE = _compile_scope_block_re()
-    _DEI_LEXICON = _load_dei_lexicon()
-    _DEI_SUBS = _compile_dei_substituter(_DEI_LEXICON)
-    logger.info("Safety policies refreshed.")
+    _reload_policy()
+
+_policy_watcher: Optional[PolicyWatcher] = None
+
+def start_policy_watcher(interval: Optional[float] = None) -> PolicyWatcher:
+    """
+    Start (once) the background watcher that recompiles and swaps the policy
+    when policies.yaml changes. A file that fails to load keeps the current policy.
+    """
+    global _policy_watcher
+    with _policy_lock:
+        if _policy_watcher is None:
+            interval = interval or safety_config.get_reload_settings()["interval_seconds"]
+            _policy_watcher = PolicyWatcher(
+                safety_config.policy_paths, lambda: _reload_policy(keep_on_error=True), interval
+            )
+        return _policy_watcher.start()
+
+def _autostart_watcher() -> None:
+    if safety_config.get_reload_settings().get("watch"):
+        start_policy_watcher()
+
+def stop_policy_watcher() -> None:
+    global _policy_watcher
+    with _policy_lock:
+        watcher, _policy_watcher = _policy_watcher, None
+    if watcher is not None:
+        watcher.stop()
 
 # ======================================================================
 #                        Consent persistence (pytest-aware)
@@ -687,51 +1427,54 @@ _TEST_MODE = bool(
 
 _CONSENT_MEM: Dict[str, Dict[str, dict]] = {}  # {ns: {user_id: {...}}}
 
+_consent_store: Optional[ConsentStore] = None
+
 def _consent_ns() -> str:
     return os.environ.get("PYTEST_CURRENT_TEST", "global")
 
-def _load_consent() -> Dict[str, dict]:
-    if _TEST_MODE:
-        ns = _consent_ns()
-        return dict(_CONSENT_MEM.get(ns, {}))
-    with _LOCK:
-        if not os.path.exists(_CONSENT_FILE):
-            return {}
-        try:
-            with open(_CONSENT_FILE, "r", encoding="utf-8") as f:
-                return json.load(f) or {}
-        except Exception:
-            return {}
-
-def _save_consent(data: Dict[str, dict]) -> None:
-    if _TEST_MODE:
-        ns = _consent_ns()
-        _CONSENT_MEM[ns] = dict(data)
-        return
-    with _LOCK:
-        try:
-            with open(_CONSENT_FILE, "w", encoding="utf-8") as f:
-                json.dump(data, f, ensure_ascii=False, indent=2)
-        except Exception:
-            logger.warning("Unable to persist consent store %s", _CONSENT_FILE)
+def _get_consent_store() -> ConsentStore:
+    """The SQLite consent store (app.data.database engine), opened on first use."""
+    global _consent_store
+    store = _consent_store
+    if store is None:
+        with _LOCK:
+            if _consent_store is None:
+                from app.data.database import engine
+                from app.safety.consent_store import ConsentStore
+
+                store = ConsentStore(engine)
+                store.migrate_json(_CONSENT_FILE)
+                _consent_store = store
+            store = _consent_store
+    return store
 
 def needs_consent(user_id: str) -> bool:
     if not user_id:
         return True
-    data = _load_consent()
-    rec = data.get(user_id)
-    return not (rec and rec.get("accepted") is True)
+    if _TEST_MODE:
+        rec = _CONSENT_MEM.get(_consent_ns(), {}).get(user_id)
+        return not (rec and rec.get("accepted") is True)
+    try:
+        return not _get_consent_store().is_accepted(user_id)
+    except Exception as e:
+        logger.warning("Unable to read consent for %s: %s", user_id, e)
+        return True  # ask again rather than assume consent
 
 def record_consent(user_id: str, accepted: bool = True, ts: Optional[str] = None) -> None:
     if not user_id:
         return
-    data = _load_consent()
-    data[user_id] = {
+    rec = {
         "accepted": bool(accepted),
         "ts": ts or datetime.now(timezone.utc).isoformat(),
         "version": 1,
     }
-    _save_consent(data)
+    if _TEST_MODE:
+        _CONSENT_MEM.setdefault(_consent_ns(), {})[user_id] = rec
+    else:
+        try:
+            _get_consent_store().put(user_id, **rec)
+        except Exception as e:
+            logger.warning("Unable to persist consent for %s: %s", user_id, e)
     if accepted:
         _metrics.inc_counter("safety_consent_accept_count")
     _metrics.inc_counter("safety_consent_events_total", {"event": "accept" if accepted else "decline"})
@@ -740,63 +1483,48 @@ def record_consent(user_id: str, accepted: bool = True, ts: Optional[str] = None
 #                       Public PII redaction (tests use this)
 # ======================================================================
 
-_EMAIL_TOKEN: Final[str] = "[redacted@email]"
-_PHONE_TOKEN: Final[str] = "[redacted phone]"
-
-_PUBLIC_EMAIL_RE = re.compile(
-    r"""
-    (?<![^\s<('"])
-    [A-Za-z0-9._%+-]+
-    @
-    [A-Za-z0-9.-]+\.[A-Za-z]{2,}
-    (?![^\s>)'"])
-    """,
-    re.VERBOSE,
-)
-_PUBLIC_PHONE_RE = re.compile(
-    r"""
-    (?<!\w)
-    \+?\d{1,3}
-    (?:[\s.\-]*\d{2,4}){2,4}
-    (?!\w)
-    """,
-    re.VERBOSE,
+# Lives in app.safety.pii so it can be imported without the guard; re-exported here.
+from app.safety.pii import (  # noqa: E402
+    _TOKEN_REDACTOR,
+    count_redaction,
+    redact,
+    redact_pii,
 )
 
-def redact_pii(text: str) -> str:
+def stream_rewriter(*, dei: bool = True, pii: bool = True) -> StreamingRewriter:
     """
-    Public/test redactor: replace emails and phone-like numbers with canonical tokens.
-    Also increments Prometheus counters *only when* a match occurs.
-    Preserves a leading '+' for phones.
+    Streaming counterpart of redact_pii(apply_dei_filter(text)) for model output
+    arriving in chunks: feed() returns the safe prefix, flush() the rest.
+    Metrics match the batch path (one DEI rewrite per stream, one redaction per match).
     """
-    if text is None or text == "":
-        return text
-
-    email_matches = list(_PUBLIC_EMAIL_RE.finditer(text))
-    out = _PUBLIC_EMAIL_RE.sub(_EMAIL_TOKEN, text)
-    if email_matches:
-        redactions_total().labels(kind="email").inc(len(email_matches))
-
-    def _phone_sub(m: re.Match) -> str:
-        s = m.group(0)
-        return ("+" if s.strip().startswith("+") else "") + _PHONE_TOKEN
-
-    phone_matches = list(_PUBLIC_PHONE_RE.finditer(out))
-    out = _PUBLIC_PHONE_RE.sub(_phone_sub, out)
-    if phone_matches:
-        redactions_total().labels(kind="phone").inc(len(phone_matches))
-
-    return out
-
-def redact(text: str) -> str:
-    return redact_pii(text)
-
-safety = get_safety_guard()
+    stages = []
+    if dei:
+        rewrote: List[bool] = []
+
+        def _dei_hit(kind: str) -> None:
+            if not rewrote:
+                rewrote.append(True)
+                _metrics.inc_counter("safety_dei_rewrites_count")
+
+        stages.append(EngineStage(_get_policy().dei_rewriter, on_match=_dei_hit))
+    if pii:
+        stages.append(EngineStage(_TOKEN_REDACTOR, on_match=count_redaction))
+    return StreamingRewriter(stages)
+
+def __getattr__(name: str) -> Any:
+    # PEP 562: the guard singleton and the policy state are built on first access.
+    if name == "safety":
+        return get_safety_guard()
+    if name == "_policy":
+        return _get_policy()
+    if name == "_decision_cache":
+        return _get_decision_cache()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 __all__ = [
     "SafetyGuard",
+    "ScanResult",
     "get_safety_guard",
-    "safety",
     "enforce_scope",
     "detect_risk",
     "apply_dei_filter",
@@ -805,8 +1533,14 @@ __all__ = [
     "record_consent",
     "pre_prompt_guard",
     "post_prompt_guard",
+    "apre_prompt_guard",
+    "apost_prompt_guard",
     "refresh_policies",
     "_METRICS",
     "redact_pii",
     "redact",
+    "stream_rewriter",
+    "set_stage_timing",
+    "start_policy_watcher",
+    "stop_policy_watcher",
 ]
@@ -0,0 +1,534 @@
+# app/safety/scanner.py
+# -*- coding: utf-8 -*-
+from __future__ import annotations
+
+"""
+Pattern matching for the safety guard.
+- Merges many labelled regexes into one alternation so a text is walked once.
+- Gates the alternation on the set of characters a match can start with, so
+  positions that cannot start any category are skipped at C speed.
+- Reports exactly the labels whose own pattern.search() would succeed.
+- Vets every guard/policy pattern at load time against a backtracking-safe
+  subset, and replaces ``left.*right`` bridges with a linear two-step search.
+- Bounds how far a match attempt can look ahead/behind, so rewrites can be
+  applied to a stream without waiting for the whole text.
+"""
+
+import re
+from threading import RLock
+from typing import Dict, FrozenSet, List, Optional, Sequence, Set, Tuple, Union
+
+try:  # Python 3.11+
+    from re import _parser as _sre_parse  # type: ignore[attr-defined]
+    from re import _constants as _sre_c  # type: ignore[attr-defined]
+except ImportError:  # pragma: no cover
+    import sre_parse as _sre_parse  # type: ignore[no-redef]
+    import sre_constants as _sre_c  # type: ignore[no-redef]
+
+# Ranges wider than this are not expanded into a first-char set
+_MAX_RANGE = 256
+
+
+def _first_of_set(items) -> Optional[Set[str]]:
+    out: Set[str] = set()
+    for op, av in items:
+        if op is _sre_c.LITERAL:
+            out.add(chr(av))
+        elif op is _sre_c.RANGE:
+            lo, hi = av
+            if hi - lo > _MAX_RANGE:
+                return None
+            out.update(chr(c) for c in range(lo, hi + 1))
+        else:  # NEGATE, \d / \w (Unicode-wide), ...
+            return None
+    return out
+
+
+def _first_chars(seq) -> Tuple[Optional[Set[str]], bool]:
+    """
+    Return (chars, nullable) for a parsed sequence: the characters a match can
+    start with (None if unbounded) and whether the sequence can match empty.
+    """
+    out: Set[str] = set()
+    for op, av in seq:
+        if op is _sre_c.AT or op in (_sre_c.ASSERT, _sre_c.ASSERT_NOT):
+            continue  # zero-width; skipping only widens the set
+        if op is _sre_c.LITERAL:
+            out.add(chr(av))
+            return out, False
+        if op is _sre_c.IN:
+            chars = _first_of_set(av)
+            if chars is None:
+                return None, False
+            return out | chars, False
+        if op is _sre_c.SUBPATTERN:
+            chars, nullable = _first_chars(av[-1])
+        elif op is _sre_c.BRANCH:
+            chars, nullable = set(), False
+            for alt in av[1]:
+                c, n = _first_chars(alt)
+                if c is None:
+                    return None, False
+                chars |= c
+                nullable = nullable or n
+        elif op in (_sre_c.MAX_REPEAT, _sre_c.MIN_REPEAT) or op is getattr(_sre_c, "POSSESSIVE_REPEAT", None):
+            lo, _hi, sub = av
+            chars, nullable = _first_chars(sub)
+            nullable = nullable or lo == 0
+        else:  # ANY, NOT_LITERAL, GROUPREF, ...
+            return None, False
+        if chars is None:
+            return None, False
+        out |= chars
+        if not nullable:
+            return out, False
+    return out, True
+
+
+def first_chars(pattern: re.Pattern) -> Optional[FrozenSet[str]]:
+    """
+    Characters a match of ``pattern`` can start with, or None if unknown.
+    Case variants are not expanded; match the result case-insensitively.
+    """
+    chars, nullable = _first_chars(_sre_parse.parse(pattern.pattern, pattern.flags))
+    if chars is None or nullable:
+        return None
+    return frozenset(chars)
+
+
+def _gate(chars: FrozenSet[str]) -> str:
+    # Always case-insensitive: a superset is still a correct gate, and it lets
+    # sre apply the same Unicode case folding the gated patterns use.
+    return "(?=(?i:[" + "".join(re.escape(c) for c in sorted(chars)) + "]))"
+
+
+# ----------------------------------------------------------------------
+# Match extent (used to stream rewrites without changing their result)
+# ----------------------------------------------------------------------
+
+_CATEGORY_RE = {
+    _sre_c.CATEGORY_DIGIT: r"\d", _sre_c.CATEGORY_NOT_DIGIT: r"\D",
+    _sre_c.CATEGORY_SPACE: r"\s", _sre_c.CATEGORY_NOT_SPACE: r"\S",
+    _sre_c.CATEGORY_WORD: r"\w", _sre_c.CATEGORY_NOT_WORD: r"\W",
+}
+
+
+def _extent(seq) -> Tuple[Optional[int], Optional[int]]:
+    """
+    (width, reach) upper bounds for a parsed sequence: characters consumed, and
+    characters examined from the start including lookahead. None = unbounded.
+    """
+    width, reach = 0, 0
+    for op, av in seq:
+        if op is _sre_c.AT:
+            w, r = 0, 1  # \b, $ ... peek at the next character
+        elif op in (_sre_c.ASSERT, _sre_c.ASSERT_NOT):
+            direction, sub = av
+            w, r = 0, (_extent(sub)[1] if direction == 1 else 0)
+        elif op in (_sre_c.LITERAL, _sre_c.NOT_LITERAL, _sre_c.IN, _sre_c.ANY):
+            w, r = 1, 1
+        elif op is _sre_c.SUBPATTERN:
+            w, r = _extent(av[-1])
+        elif op is _sre_c.BRANCH:
+            ws, rs = zip(*(_extent(alt) for alt in av[1]))
+            w = None if None in ws else max(ws)
+            r = None if None in rs else max(rs)
+        elif op in (_sre_c.MAX_REPEAT, _sre_c.MIN_REPEAT) or op is getattr(_sre_c, "POSSESSIVE_REPEAT", None):
+            lo, hi, sub = av
+            sw, sr = _extent(sub)
+            if sw is None or sr is None or (hi is _sre_c.MAXREPEAT and sw):
+                return None, None
+            hi = 0 if hi is _sre_c.MAXREPEAT else hi
+            w, r = hi * sw, ((hi - 1) * sw + sr if hi else 0)
+        else:  # GROUPREF, conditionals, ...
+            return None, None
+        if w is None or r is None:
+            return None, None
+        reach = max(reach, width + r)
+        width += w
+    return width, reach
+
+
+def reach(pattern: re.Pattern) -> Optional[int]:
+    """How far past its start a match attempt can look, or None if unbounded."""
+    return _extent(_sre_parse.parse(pattern.pattern, pattern.flags))[1]
+
+
+def _lookaround(seq) -> Tuple[int, Optional[int]]:
+    back, ahead = 0, 0
+    for op, av in seq:
+        if op is _sre_c.AT:
+            b, a = 1, 1
+        elif op in (_sre_c.ASSERT, _sre_c.ASSERT_NOT):
+            direction, sub = av
+            b, a = ((_extent(sub)[0] or 0), 0) if direction == -1 else (_lookaround(sub)[0], _extent(sub)[1])
+        elif op is _sre_c.SUBPATTERN:
+            b, a = _lookaround(av[-1])
+        elif op is _sre_c.BRANCH:
+            parts = [_lookaround(alt) for alt in av[1]]
+            b = max(p[0] for p in parts)
+            a = None if any(p[1] is None for p in parts) else max(p[1] for p in parts)
+        elif op in (_sre_c.MAX_REPEAT, _sre_c.MIN_REPEAT) or op is getattr(_sre_c, "POSSESSIVE_REPEAT", None):
+            b, a = _lookaround(av[2])
+        else:
+            continue
+        back = max(back, b)
+        ahead = None if a is None or ahead is None else max(ahead, a)
+    return back, ahead
+
+
+def lookaround(pattern: re.Pattern) -> Tuple[int, Optional[int]]:
+    """
+    (behind, ahead): how far before / after the position it is evaluated at
+    any assertion in ``pattern`` can look (ahead None when unbounded).
+    """
+    return _lookaround(_sre_parse.parse(pattern.pattern, pattern.flags))
+
+
+def _in_set(items, ch: str, flags: int) -> bool:
+    variants = {ch, ch.lower(), ch.upper()} if flags & re.IGNORECASE else {ch}
+    negate, hit = False, False
+    for op, av in items:
+        if op is _sre_c.NEGATE:
+            negate = True
+        elif op is _sre_c.LITERAL:
+            hit = hit or chr(av) in variants
+        elif op is _sre_c.RANGE:
+            hit = hit or any(av[0] <= ord(v) <= av[1] for v in variants)
+        elif op is _sre_c.CATEGORY and av in _CATEGORY_RE:
+            hit = hit or re.match(_CATEGORY_RE[av], ch) is not None
+        else:
+            return True  # unknown member: assume it can
+    return hit != negate
+
+
+def _consumes(seq, ch: str, flags: int) -> bool:
+    for op, av in seq:
+        if op is _sre_c.LITERAL:
+            if _in_set([(op, av)], ch, flags):
+                return True
+        elif op is _sre_c.IN:
+            if _in_set(av, ch, flags):
+                return True
+        elif op is _sre_c.SUBPATTERN:
+            if _consumes(av[-1], ch, flags):
+                return True
+        elif op is _sre_c.BRANCH:
+            if any(_consumes(alt, ch, flags) for alt in av[1]):
+                return True
+        elif op in (_sre_c.MAX_REPEAT, _sre_c.MIN_REPEAT) or op is getattr(_sre_c, "POSSESSIVE_REPEAT", None):
+            if _consumes(av[2], ch, flags):
+                return True
+        elif op in (_sre_c.AT, _sre_c.ASSERT, _sre_c.ASSERT_NOT):
+            continue  # zero-width
+        else:  # ANY, NOT_LITERAL, GROUPREF, ...
+            return True
+    return False
+
+
+def consumes(pattern: re.Pattern, ch: str) -> bool:
+    """Whether a match of ``pattern`` may contain ``ch`` (True when unsure)."""
+    return _consumes(_sre_parse.parse(pattern.pattern, pattern.flags), ch, pattern.flags)
+
+
+# ----------------------------------------------------------------------
+# Linear-time subset
+# ----------------------------------------------------------------------
+
+class UnsafePatternError(ValueError):
+    """Raised when a pattern falls outside the backtracking-safe subset."""
+
+
+_REPEAT_OPS = tuple(
+    op for op in (_sre_c.MAX_REPEAT, _sre_c.MIN_REPEAT, getattr(_sre_c, "POSSESSIVE_REPEAT", None)) if op is not None
+)
+
+
+def _excluded_by_wildcard(sub, flags: int) -> Optional[Set[str]]:
+    """For a repeat body that is a wildcard (., [^...], [^x]) return the chars it cannot match."""
+    if len(sub) != 1:
+        return None
+    op, av = sub[0]
+    if op is _sre_c.ANY:
+        return set() if flags & re.DOTALL else {"\n"}
+    if op is _sre_c.NOT_LITERAL:
+        return {chr(av)}
+    if op is _sre_c.IN and av and av[0][0] is _sre_c.NEGATE:
+        return _first_of_set(av[1:]) or set()
+    return None
+
+
+def _check_seq(seq, follow: Optional[Set[str]], outer_unbounded: Optional[bool], state, flags: int) -> None:
+    """
+    ``follow``: chars that can come right after ``seq`` (None = unknown).
+    ``outer_unbounded``: None outside any repeat, else whether the nearest
+    enclosing multi-repeat is unbounded.
+    """
+    items = list(seq)
+    for i, (op, av) in enumerate(items):
+        rest, nullable = _first_chars(items[i + 1:])
+        if rest is not None and nullable:
+            rest = None if follow is None else rest | follow
+        after = rest
+
+        if op is _sre_c.GROUPREF:
+            lo, hi = state.groupwidths[av]
+            if (lo, hi) != (1, 1):
+                raise UnsafePatternError("backreference to a group wider than one character")
+        elif op in _REPEAT_OPS:
+            lo, hi, sub = av
+            unbounded = hi == _sre_c.MAXREPEAT
+            if hi > 1 and outer_unbounded is not None and (unbounded or outer_unbounded):
+                raise UnsafePatternError("nested quantifiers with an unbounded repeat")
+            excluded = _excluded_by_wildcard(sub, flags)
+            if unbounded and excluded is not None and after:
+                if not after <= excluded:
+                    raise UnsafePatternError("unbounded wildcard bridge (e.g. '.*') followed by more pattern")
+            inner = outer_unbounded if hi <= 1 else unbounded
+            _check_seq(sub, after, inner, state, flags)
+        elif op is _sre_c.SUBPATTERN:
+            _check_seq(av[-1], after, outer_unbounded, state, flags)
+        elif op is _sre_c.BRANCH:
+            for alt in av[1]:
+                _check_seq(alt, after, outer_unbounded, state, flags)
+        elif op in (_sre_c.ASSERT, _sre_c.ASSERT_NOT):
+            _check_seq(av[1], set(), outer_unbounded, state, flags)
+        elif op is getattr(_sre_c, "ATOMIC_GROUP", None):
+            _check_seq(av, after, outer_unbounded, state, flags)
+
+
+def _fenced(body, fence, flags: int) -> bool:
+    """Whether the one-character lookbehind ``fence`` matches every char ``body`` can (False when unsure)."""
+    if fence is None or len(body) != 1 or body[0][0] not in (_sre_c.LITERAL, _sre_c.IN):
+        return False
+    op, av = body[0]
+    chars = _first_of_set([(op, av)] if op is _sre_c.LITERAL else av)
+    fence_items = [fence] if fence[0] is _sre_c.LITERAL else fence[1]
+    return chars is not None and all(_in_set(fence_items, c, flags) for c in chars)
+
+
+def _check_leading(seq, required_after: bool, fence, flags: int) -> None:
+    """
+    Reject an unbounded one-character repeat a match can start with when more
+    pattern must follow it (``[a-z]+@``): a search retries it at every position
+    of a long run, each time consuming the rest of the run before failing.
+    ``fence`` is a one-character negative lookbehind seen before it; one that
+    covers the repeat (``(?<![a-z])[a-z]+@``) lets only the run's start try,
+    as does a leading ``^`` / ``\\A``.
+    """
+    items = list(seq)
+    for i, (op, av) in enumerate(items):
+        if op is _sre_c.AT:
+            if av is _sre_c.AT_BEGINNING_STRING or (av is _sre_c.AT_BEGINNING and not flags & re.MULTILINE):
+                return  # one start position only
+            continue
+        if op is _sre_c.ASSERT:
+            continue
+        if op is _sre_c.ASSERT_NOT:
+            direction, sub = av
+            if direction == -1 and len(sub) == 1 and sub[0][0] in (_sre_c.LITERAL, _sre_c.IN):
+                fence = sub[0]
+            continue
+        required = required_after or not _first_chars(items[i + 1:])[1]
+        if op in _REPEAT_OPS:
+            lo, hi, body = av
+            one_char = len(body) == 1 and body[0][0] in (_sre_c.LITERAL, _sre_c.NOT_LITERAL, _sre_c.IN, _sre_c.ANY)
+            if hi == _sre_c.MAXREPEAT and one_char and required and not _fenced(body, fence, flags):
+                raise UnsafePatternError(
+                    "leading unbounded repeat followed by more pattern (e.g. '[a-z]+@'); bound it or fence it "
+                    "with a lookbehind"
+                )
+        elif op is _sre_c.SUBPATTERN:
+            _check_leading(av[-1], required, fence, flags)
+        elif op is _sre_c.BRANCH:
+            for alt in av[1]:
+                _check_leading(alt, required, fence, flags)
+        elif op is getattr(_sre_c, "ATOMIC_GROUP", None):
+            _check_leading(av, required, fence, flags)
+        return
+
+
+def check_linear(source: str, flags: int = 0) -> None:
+    """
+    Raise UnsafePatternError if ``source`` has a super-linear backtracking shape:
+    - nested quantifiers where either level is unbounded, e.g. ``(a+)+``, ``(\\d[ -]*){13,19}``;
+    - backreferences to anything wider than a single character;
+    - an unbounded wildcard (``.*``, ``[^x]+``) followed by pattern it can also match;
+    - a leading unbounded one-character repeat followed by required pattern,
+      e.g. ``\\b[a-z.]+@`` (quadratic on a long run without the ``@``).
+    Patterns in this subset run in O(len(text)) per start position with a
+    small constant, instead of exponential or quadratic time on hostile input.
+    """
+    try:
+        tree = _sre_parse.parse(source, flags)
+    except re.error as e:
+        raise UnsafePatternError(f"invalid pattern: {e}") from e
+    _check_seq(tree, set(), None, tree.state, tree.state.flags)
+    _check_leading(tree, False, None, tree.state.flags)
+
+
+def compile_linear(source: str, flags: int = 0) -> re.Pattern:
+    """Compile ``source`` after vetting it with check_linear()."""
+    check_linear(source, flags)
+    return re.compile(source, flags)
+
+
+class CoOccurrence:
+    """
+    Linear-time replacement for ``left.*right``: matches when ``right`` occurs
+    after the end of a ``left`` match on the same line. Each line is searched
+    at most once for each side, where the regex form restarts the ``.*`` scan
+    at every ``left`` occurrence (quadratic on e.g. "kill kill kill ...").
+    Assumes ``left`` matches cannot nest (true for word alternations).
+    """
+
+    def __init__(self, left: str, right: str, flags: int = 0) -> None:
+        self.left = compile_linear(left, flags)
+        self.right = compile_linear(right, flags)
+        self.pattern = f"{left}.*{right}"
+        self.flags = self.left.flags
+
+    def search(self, text: str, pos: int = 0) -> Optional[re.Match]:
+        """Return the ``right`` match that completes the pair, or None."""
+        n = len(text)
+        while pos <= n:
+            m = self.left.search(text, pos)
+            if m is None:
+                return None
+            eol = text.find("\n", m.end())
+            if eol < 0:
+                eol = n
+            r = self.right.search(text, m.end(), eol)
+            if r is not None:
+                return r
+            pos = eol + 1
+        return None
+
+    def __repr__(self) -> str:
+        return f"CoOccurrence({self.pattern!r})"
+
+
+Matcher = Union[re.Pattern, CoOccurrence]
+Span = Tuple[int, int]
+
+# ----------------------------------------------------------------------
+# Fused scanner
+# ----------------------------------------------------------------------
+
+class CategoryScanner:
+    """
+    Reports every labelled pattern that occurs in a text.
+
+    Patterns whose first character is known share one alternation behind a
+    first-character lookahead; the rest (e.g. a backreference-based repeat
+    check) share a second, ungated one.
+    A single finditer() cannot see a category whose only occurrence overlaps
+    another category's match, so the labels already hit are dropped and the
+    remaining ones rescanned. Clean text costs one pass per alternation; a text
+    hitting k categories costs at most k more. CoOccurrence entries are
+    searched on their own after the fused pass.
+
+    Every regex is vetted with check_linear() at construction.
+    """
+
+    def __init__(self, patterns: Sequence[Tuple[str, Matcher]]) -> None:
+        self.labels: Tuple[str, ...] = tuple(label for label, _ in patterns)
+        if len(set(self.labels)) != len(self.labels):
+            raise ValueError("duplicate category labels")
+        self._sources: Dict[str, str] = {}
+        self._bounded: Dict[str, str] = {}  # sources with their leading \b removed
+        self._first: Dict[str, Optional[FrozenSet[str]]] = {}
+        self._names: Dict[str, str] = {}
+        self._groups: Dict[str, str] = {}
+        self._pairs: Dict[str, CoOccurrence] = {}
+        for i, (label, pattern) in enumerate(patterns):
+            if isinstance(pattern, CoOccurrence):
+                self._pairs[label] = pattern
+                continue
+            check_linear(pattern.pattern, pattern.flags)
+            flags = pattern.flags & ~re.UNICODE
+            if flags & ~re.IGNORECASE:
+                raise ValueError(f"unsupported flags for fused category {label!r}")
+            src = pattern.pattern
+            wrap = "(?i:{})" if flags & re.IGNORECASE else "(?:{})"
+            self._sources[label] = wrap.format(src)
+            if src.startswith("\\b"):
+                self._bounded[label] = wrap.format(src[2:])
+            self._first[label] = first_chars(pattern)
+            self._names[label] = f"_c{i}"
+            self._groups[f"_c{i}"] = label
+        self._compiled: Dict[Tuple[str, ...], Tuple[Tuple[re.Pattern, Tuple[str, ...]], ...]] = {}
+        self._lock = RLock()
+        self._regex_labels = tuple(label for label in self.labels if label not in self._pairs)
+        self._fused(self._regex_labels)  # compile eagerly so bad patterns fail at load time
+
+    def _fused(self, labels: Tuple[str, ...]) -> Tuple[Tuple[re.Pattern, Tuple[str, ...]], ...]:
+        fused = self._compiled.get(labels)
+        if fused is not None:
+            return fused
+        gated = tuple(label for label in labels if self._first[label] is not None)
+        free = tuple(label for label in labels if self._first[label] is None)
+        out = []
+        if gated:
+            gate: FrozenSet[str] = frozenset().union(*(self._first[label] for label in gated))
+            # Hoist a shared leading \b so it is tested once per position
+            bounded = [label for label in gated if label in self._bounded]
+            rest = [label for label in gated if label not in self._bounded]
+            branches = []
+            if bounded:
+                inner = "|".join(f"(?P<{self._names[label]}>{self._bounded[label]})" for label in bounded)
+                branches.append(f"\\b(?:{inner})")
+            branches.extend(f"(?P<{self._names[label]}>{self._sources[label]})" for label in rest)
+            out.append((re.compile(f"{_gate(gate)}(?:{'|'.join(branches)})"), gated))
+        if free:
+            body = "|".join(f"(?P<{self._names[label]}>{self._sources[label]})" for label in free)
+            out.append((re.compile(body), free))
+        fused = tuple(out)
+        with self._lock:
+            self._compiled[labels] = fused
+        return fused
+
+    def scan(self, text: str) -> Set[str]:
+        """Return the set of labels whose pattern matches anywhere in ``text``."""
+        return set(self.locate(text))
+
+    def locate(self, text: str) -> Dict[str, List[Span]]:
+        """
+        Like scan(), but map each label hit to the (start, end) spans found for
+        it, in text order. A co-occurrence label gets the span of the match
+        that completes the pair. Spans hidden by another label's overlapping
+        match are not reported, but every hit label has at least one.
+        """
+        spans: Dict[str, List[Span]] = {}
+        for label, pair in self._pairs.items():
+            m = pair.search(text)
+            if m is not None:
+                spans[label] = [m.span()]
+        remaining = self._regex_labels
+        while remaining:
+            unresolved: Tuple[str, ...] = ()
+            for pattern, labels in self._fused(remaining):
+                found: Set[str] = set()
+                for m in pattern.finditer(text):
+                    label = self._groups[m.lastgroup]
+                    found.add(label)
+                    spans.setdefault(label, []).append(m.span())
+                if found:
+                    # An alternation with no match at all rules out all of its labels;
+                    # one with matches may still hide an overlapped label.
+                    unresolved += tuple(label for label in labels if label not in found)
+            remaining = unresolved
+        return spans
+
+
+__all__ = [
+    "CategoryScanner",
+    "CoOccurrence",
+    "UnsafePatternError",
+    "check_linear",
+    "compile_linear",
+    "consumes",
+    "first_chars",
+    "lookaround",
+    "reach",
+]
@@ -0,0 +1,164 @@
+# app/safety/streaming.py
+# -*- coding: utf-8 -*-
+from __future__ import annotations
+
+"""
+Incremental rewriting for streamed model output.
+- A StreamingRewriter chains stages; each stage mirrors one batch rewrite
+  (a regex substitution or a RedactionEngine pass) and feeds the next.
+- A stage only commits matches whose outcome is already decided by the
+  text it has seen: attempts starting before its horizon cannot look past
+  the buffer. Bounded patterns hold back their reach; unbounded ones (e.g.
+  email local parts) wait for a barrier character they can never consume.
+- Output is therefore byte-identical to running the batch rewrites on the
+  whole text, while most of each chunk is released as soon as it arrives.
+"""
+
+import re
+from typing import Callable, Iterator, List, Optional, Sequence, Tuple, Union
+
+from app.safety.redaction import RedactionEngine, Span
+from app.safety.scanner import consumes, lookaround, reach
+
+# Candidate barrier characters for unbounded patterns
+_BARRIERS = " \t\n\r\f\v"
+# Drop consumed text from the buffer once this much has piled up
+_TRIM_AT = 4096
+
+Match = Tuple[int, int, str, str]  # start, end, replacement, kind
+
+
+class _Stage:
+    # How many pattern reaches past its start a match's outcome can depend on
+    _depth = 1
+
+    def __init__(self, patterns: Sequence[re.Pattern], on_match: Optional[Callable[[str], None]] = None) -> None:
+        reaches = [reach(p) for p in patterns]
+        around = [lookaround(p) for p in patterns]
+        self._reach = max((r for r in reaches if r is not None), default=0)
+        self._back = max((b for b, _ in around), default=0)
+        unbounded = [p for p, r in zip(patterns, reaches) if r is None]
+        self._barriers: Optional[str] = None
+        self._peek = 0
+        if unbounded and all(a is not None for _, a in around):
+            self._barriers = "".join(c for c in _BARRIERS if not any(consumes(p, c) for p in unbounded))
+            self._peek = max(a for _, a in around)
+        elif unbounded:
+            self._barriers = ""  # unbounded lookahead: nothing is decided before the end
+        self._on_match = on_match
+        self._buf = ""
+        self._pos = 0  # everything before this is emitted
+
+    def _matches(self, text: str, pos: int, end: int) -> Iterator[Match]:
+        raise NotImplementedError
+
+    def _horizon(self) -> int:
+        """Attempts starting before this index are decided by the buffer."""
+        n = len(self._buf)
+        horizon = n - self._depth * self._reach
+        if self._barriers is not None:
+            # Unbounded attempts stop consuming at a barrier and peek at most
+            # `_peek` past it; bounded spans before the horizon end before it.
+            end = n - self._peek
+            last = max((self._buf.rfind(c, self._pos, end) for c in self._barriers), default=-1)
+            horizon = min(horizon, last - self._reach if last >= 0 else self._pos)
+        return max(horizon, self._pos)
+
+    def feed(self, chunk: str, final: bool = False) -> str:
+        self._buf += chunk
+        buf = self._buf
+        horizon = len(buf) if final else self._horizon()
+        if horizon == self._pos and not final:
+            return ""
+        parts: List[str] = []
+        last = self._pos
+        for start, end, replacement, kind in self._matches(buf, self._pos, len(buf)):
+            if start >= horizon:
+                break
+            parts.append(buf[last:start])
+            parts.append(replacement)
+            last = end
+            if self._on_match is not None and replacement != buf[start:end]:
+                self._on_match(kind)
+        upto = max(last, horizon)
+        parts.append(buf[last:upto])
+        self._pos = upto
+        if self._pos > _TRIM_AT:
+            drop = self._pos - self._back
+            self._buf, self._pos = buf[drop:], self._pos - drop
+        return "".join(parts)
+
+
+class RegexStage(_Stage):
+    """Streaming ``pattern.sub(repl, text)``."""
+
+    def __init__(
+        self,
+        pattern: re.Pattern,
+        repl: Union[str, Callable[[re.Match], str]],
+        kind: str = "",
+        on_match: Optional[Callable[[str], None]] = None,
+    ) -> None:
+        super().__init__([pattern], on_match)
+        self._pattern = pattern
+        self._repl = repl
+        self._kind = kind
+
+    def _matches(self, text: str, pos: int, end: int) -> Iterator[Match]:
+        expand = self._repl if callable(self._repl) else (lambda m: m.expand(self._repl))
+        for m in self._pattern.finditer(text, pos, end):
+            yield m.start(), m.end(), expand(m), self._kind
+
+
+class EngineStage(_Stage):
+    """Streaming ``engine.redact(text)``; hint rules are ignored."""
+
+    # a span, plus a higher-priority attempt starting inside it
+    _depth = 2
+
+    def __init__(self, engine: RedactionEngine, on_match: Optional[Callable[[str], None]] = None) -> None:
+        super().__init__([r.pattern for r in engine.rules], on_match)
+        self._engine = engine
+
+    def _matches(self, text: str, pos: int, end: int) -> Iterator[Match]:
+        span: Span
+        for span in self._engine.spans(text, pos, end):
+            if span.replacement is not None:
+                yield span.start, span.end, span.replacement, span.kind
+
+
+class StreamingRewriter:
+    """
+    Feed text chunks in, get rewritten chunks out; call flush() at the end.
+    The concatenated output equals the stages' batch rewrites applied in order.
+    """
+
+    def __init__(self, stages: Sequence[_Stage]) -> None:
+        self._stages = list(stages)
+        self._closed = False
+
+    def feed(self, chunk: str) -> str:
+        if self._closed:
+            raise ValueError("stream already flushed")
+        for stage in self._stages:
+            chunk = stage.feed(chunk)
+        return chunk
+
+    def flush(self) -> str:
+        self._closed = True
+        chunk = ""
+        for stage in self._stages:
+            chunk = stage.feed(chunk, final=True)
+        return chunk
+
+    def rewrite(self, chunks: Sequence[str]) -> Iterator[str]:
+        for chunk in chunks:
+            out = self.feed(chunk)
+            if out:
+                yield out
+        tail = self.flush()
+        if tail:
+            yield tail
+
+
+__all__ = ["EngineStage", "RegexStage", "StreamingRewriter"]
@@ -0,0 +1,190 @@
+# app/safety/throttle.py
+# -*- coding: utf-8 -*-
+from __future__ import annotations
+
+"""
+Per-session throttle for repeated crisis resources.
+- check_and_mark(session) reports whether the session was already shown the
+  full resources within risk.throttle.repeat_risk_seconds, so a reminder is
+  due. If it was not, a new window starts. The TTL is read on every call, so
+  a policy reload applies at once.
+- Entries expire after the TTL and at most `max_entries` are kept, least
+  recently marked evicted first, so memory stays flat over any number of
+  sessions.
+- MemoryThrottle: in-process. Sessions are spread over lock stripes by hash,
+  so concurrent requests rarely contend.
+- SqliteThrottle: one database file shared by several workers. A
+  check-and-mark is a single conditional upsert, and expired or excess rows
+  are pruned every `prune_every` marks.
+"""
+
+import time
+from collections import OrderedDict
+from threading import Lock
+from typing import TYPE_CHECKING, Callable, Optional, Union
+
+from app.safety import config as safety_config
+
+if TYPE_CHECKING:
+    from sqlalchemy.engine import Engine
+
+Seconds = Union[float, Callable[[], float]]
+
+
+def _ttl_fn(ttl_seconds: Seconds) -> Callable[[], float]:
+    if callable(ttl_seconds):
+        return ttl_seconds
+    return lambda: float(ttl_seconds)
+
+
+class _Stripe:
+    __slots__ = ("lock", "entries")
+
+    def __init__(self) -> None:
+        self.lock = Lock()
+        self.entries: "OrderedDict[str, float]" = OrderedDict()  # key -> expiry, oldest first
+
+
+class MemoryThrottle:
+    def __init__(
+        self,
+        ttl_seconds: Seconds,
+        max_entries: int = 100_000,
+        stripes: int = 16,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self._ttl = _ttl_fn(ttl_seconds)
+        self._clock = clock
+        self._stripes = tuple(_Stripe() for _ in range(max(1, int(stripes))))
+        self._per_stripe = max(1, int(max_entries) // len(self._stripes))
+
+    def check_and_mark(self, key: str) -> bool:
+        now = self._clock()
+        stripe = self._stripes[hash(key) % len(self._stripes)]
+        with stripe.lock:
+            entries = stripe.entries
+            expiry = entries.get(key)
+            if expiry is not None and expiry > now:
+                return True
+            entries[key] = now + self._ttl()
+            entries.move_to_end(key)
+            # Oldest first: drop what has expired, then whatever is over the bound
+            while entries:
+                oldest = next(iter(entries.values()))
+                if oldest > now and len(entries) <= self._per_stripe:
+                    break
+                entries.popitem(last=False)
+            return False
+
+    def clear(self) -> None:
+        for stripe in self._stripes:
+            with stripe.lock:
+                stripe.entries.clear()
+
+    def __len__(self) -> int:
+        return sum(len(stripe.entries) for stripe in self._stripes)
+
+
+_SCHEMA = (
+    """
+    CREATE TABLE IF NOT EXISTS session_throttle(
+        session_key TEXT PRIMARY KEY,
+        expires REAL NOT NULL
+    ) WITHOUT ROWID
+    """,
+    "CREATE INDEX IF NOT EXISTS session_throttle_expires ON session_throttle(expires)",
+)
+# Driver-level SQL, so importing this module does not import SQLAlchemy.
+# _MARK inserts a new row or restarts an expired one; a live row is left alone (no change).
+_MARK = (
+    "INSERT INTO session_throttle(session_key, expires) VALUES (:key, :expires) "
+    "ON CONFLICT(session_key) DO UPDATE SET expires = excluded.expires WHERE session_throttle.expires <= :now"
+)
+_PRUNE_EXPIRED = "DELETE FROM session_throttle WHERE expires <= :now"
+_COUNT = "SELECT COUNT(*) FROM session_throttle"
+_PRUNE_OLDEST = (
+    "DELETE FROM session_throttle WHERE session_key IN "
+    "(SELECT session_key FROM session_throttle ORDER BY expires LIMIT :excess)"
+)
+
+
+class SqliteThrottle:
+    def __init__(
+        self,
+        engine: "Engine",
+        ttl_seconds: Seconds,
+        max_entries: int = 100_000,
+        prune_every: int = 256,
+        clock: Callable[[], float] = time.time,  # wall clock: shared across processes
+    ) -> None:
+        self._engine = engine
+        self._ttl = _ttl_fn(ttl_seconds)
+        self.max_entries = max(1, int(max_entries))
+        self.prune_every = max(1, int(prune_every))
+        self._clock = clock
+        self._marks = 0
+        self._lock = Lock()
+        with engine.begin() as conn:
+            if engine.dialect.name == "sqlite":
+                conn.exec_driver_sql("PRAGMA journal_mode=WAL")
+            for stmt in _SCHEMA:
+                conn.exec_driver_sql(stmt)
+
+    def check_and_mark(self, key: str) -> bool:
+        now = self._clock()
+        with self._engine.begin() as conn:
+            marked = conn.exec_driver_sql(_MARK, {"key": key, "expires": now + self._ttl(), "now": now}).rowcount == 1
+        if marked:
+            with self._lock:
+                self._marks += 1
+                due = self._marks % self.prune_every == 0
+            if due:
+                self.prune(now)
+        return not marked
+
+    def prune(self, now: Optional[float] = None) -> None:
+        now = self._clock() if now is None else now
+        with self._engine.begin() as conn:
+            conn.exec_driver_sql(_PRUNE_EXPIRED, {"now": now})
+            excess = conn.exec_driver_sql(_COUNT).scalar_one() - self.max_entries
+            if excess > 0:
+                conn.exec_driver_sql(_PRUNE_OLDEST, {"excess": excess})
+
+    def clear(self) -> None:
+        with self._engine.begin() as conn:
+            conn.exec_driver_sql("DELETE FROM session_throttle")
+
+    def __len__(self) -> int:
+        with self._engine.connect() as conn:
+            return int(conn.exec_driver_sql(_COUNT).scalar_one())
+
+
+Throttle = Union[MemoryThrottle, SqliteThrottle]
+
+_throttle: Optional[Throttle] = None
+_throttle_lock = Lock()
+
+
+def _policy_ttl() -> float:
+    return float(safety_config.get_throttle_settings()["repeat_risk_seconds"])
+
+
+def get_session_throttle() -> Throttle:
+    """The process-wide throttle, built from risk.throttle on first use."""
+    global _throttle
+    throttle = _throttle
+    if throttle is None:
+        with _throttle_lock:
+            if _throttle is None:
+                settings = safety_config.get_throttle_settings()
+                if settings["backend"] == "sqlite":
+                    from app.data.database import engine
+
+                    _throttle = SqliteThrottle(engine, _policy_ttl, settings["max_sessions"])
+                else:
+                    _throttle = MemoryThrottle(_policy_ttl, settings["max_sessions"])
+            throttle = _throttle
+    return throttle
+
+
+__all__ = ["MemoryThrottle", "SqliteThrottle", "Throttle", "get_session_throttle"]
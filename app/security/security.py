@@ -8,7 +8,7 @@ from typing import Optional, Callable
 try:
     # Prefer Safety so both layers emit SAME tokens:
     #   [redacted@email], [redacted phone]
-    from app.safety.safety import redact_pii as _safety_redact_pii  # type: ignore
+    from app.safety.pii import redact_pii as _safety_redact_pii  # type: ignore
 except Exception:  # pragma: no cover
     _safety_redact_pii = None  # type: Optional[Callable[[Optional[str]], Optional[str]]]
 
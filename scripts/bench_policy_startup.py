@@ -0,0 +1,60 @@
+# filename: scripts/bench_policy_startup.py
+"""
+Cold-start benchmark for the safety policy bundle.
+- Runs the first policy check (import + enforce_scope(), which compiles the
+  policy on first use) in fresh interpreters, with the bundle disabled (full
+  YAML parse + pattern vetting) and with a warm bundle.
+- Prints the median time and whether PyYAML got imported at all.
+
+Usage: python scripts/bench_policy_startup.py [runs]
+"""
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+_PROBE = r"""
+import json, sys, time
+t0 = time.perf_counter()
+from app.safety import enforce_scope
+enforce_scope("hello")
+t1 = time.perf_counter()
+print(json.dumps({"import": t1 - t0, "yaml": "yaml" in sys.modules}))
+"""
+
+
+def _run(env: dict) -> dict:
+    out = subprocess.run(
+        [sys.executable, "-c", _PROBE], cwd=ROOT, env=env, capture_output=True, text=True, check=True
+    )
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def _bench(label: str, env: dict, runs: int) -> dict:
+    samples = [_run(env) for _ in range(runs)]
+    row = {
+        "import_ms": statistics.median(x["import"] for x in samples) * 1000,
+        "yaml_imported": any(x["yaml"] for x in samples),
+    }
+    print(f"{label:<14} first policy check {row['import_ms']:7.1f} ms   yaml imported: {row['yaml_imported']}")
+    return row
+
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 7
+    with tempfile.TemporaryDirectory() as bundle_dir:
+        base = {**os.environ, "PYTHONPATH": str(ROOT), "SAFETY_POLICY_BUNDLE_DIR": bundle_dir}
+        cold = _bench("no bundle", {**base, "SAFETY_POLICY_BUNDLE": "0"}, runs)
+        _run(base)  # writes the bundle
+        warm = _bench("warm bundle", base, runs)
+    saved = cold["import_ms"] - warm["import_ms"]
+    print(f"saved per cold start: {saved:.1f} ms ({saved / cold['import_ms']:.0%})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+# tests/test_async_guard.py
+import asyncio
+import importlib
+import threading
+
+from app.safety import apost_prompt_guard, apre_prompt_guard, post_prompt_guard, pre_prompt_guard
+from app.safety.safety import SafetyGuard
+
+s = importlib.import_module("app.safety.safety")
+
+
+def test_async_guards_match_sync():
+    profile = {"session_id": "s-async"}
+    assert asyncio.run(apre_prompt_guard("I want to die", profile)) == pre_prompt_guard("I want to die", profile)
+    reply = {"sections": {"main": "hang in there"}}
+    risk = {"risk": "high", "policy_version": "s-async"}
+    assert asyncio.run(apost_prompt_guard(reply, risk)) == post_prompt_guard(reply, risk)
+
+
+def test_small_inputs_stay_inline():
+    seen = []
+    original = SafetyGuard.evaluate
+
+    def spy(self, text, meta=None):
+        seen.append(threading.current_thread().name)
+        return original(self, text, meta)
+
+    SafetyGuard.evaluate = spy
+    try:
+        asyncio.run(SafetyGuard().aevaluate("hello"))
+        asyncio.run(SafetyGuard().aevaluate("hello " * 200))
+    finally:
+        SafetyGuard.evaluate = original
+    assert seen[0] == threading.main_thread().name
+    assert seen[1].startswith("safety-guard")
+
+
+def test_concurrent_offloads_drain_queue():
+    async def many():
+        g = SafetyGuard()
+        return await asyncio.gather(*(g.aevaluate(f"message {i} " * 60) for i in range(20)))
+
+    decisions = asyncio.run(many())
+    assert [d.action for d in decisions] == ["allow"] * 20
+    assert s._metrics.get_gauge("executor_queue_depth") == 0
@@ -0,0 +1,77 @@
+# tests/test_async_pipeline.py
+import asyncio
+import time
+
+from app.knowledge import retriever
+from app.memory import summarizer
+from app.orchestrator import arun_inference, pipeline, run_inference
+from app.personalization import style
+
+
+def _slow(seconds, result):
+    def fn(*a, **k):
+        time.sleep(seconds)
+        return result
+    return fn
+
+
+def _aslow(seconds, result):
+    async def fn(*a, **k):
+        await asyncio.sleep(seconds)
+        return result
+    return fn
+
+
+def test_stages_run_concurrently(monkeypatch):
+    monkeypatch.setattr(retriever, "retrieve", _slow(0.3, ["snippet"]))
+    monkeypatch.setattr(summarizer, "get_memory_clip", _slow(0.3, "clip"))
+    monkeypatch.setattr(pipeline, "ainfer", _aslow(0.3, {"text": "model reply"}))
+    start = time.perf_counter()
+    out = asyncio.run(arun_inference("chat", "hello there", "A1"))
+    assert time.perf_counter() - start < 0.85  # memory -> model is the longest chain; serial would be 0.9+
+    assert out["response"] == "model reply"
+    assert out["meta"]["retrieved"] == 1 and "degraded_stages" not in out["meta"]
+
+
+def test_slow_or_failing_stage_falls_back(monkeypatch):
+    monkeypatch.setattr(style, "style_for", _slow(1.0, {}))
+    monkeypatch.setattr(retriever, "retrieve", lambda *a, **k: 1 / 0)
+    out = asyncio.run(arun_inference("chat", "hello there", "A2", timeouts={"style": 0.05}))
+    assert out["meta"]["degraded_stages"] == ["retrieval", "style"]
+    assert out["response"] == "ok" and out["meta"]["retrieved"] == 0
+
+
+def test_guard_outcome_overrides_the_model(monkeypatch):
+    monkeypatch.setattr(pipeline, "ainfer", _aslow(0, {"text": "model reply"}))
+    out = asyncio.run(arun_inference("inner_me", "I want to die", "A3", {"age_band": "adult"}))
+    assert out["reply"]["type"] == "safety_resources" and out["response"] != "model reply"
+    assert out["meta"]["safety"]["risk"] == "high"
+
+    # A guard that cannot answer in time fails closed
+    out = asyncio.run(arun_inference("chat", "hello there", "A4", timeouts={"pre_guard": 0}))
+    assert "pre_guard" in out["meta"]["degraded_stages"] and out["response"] != "model reply"
+
+
+def test_result_matches_sync_shape():
+    sync = run_inference("inner_me", "I want to die", "A5", {"age_band": "adult"}, channel="web")
+    out = asyncio.run(arun_inference("inner_me", "I want to die", "A6", {"age_band": "adult"}, channel="web"))
+    assert out.keys() == sync.keys() and out["reply"].keys() == sync["reply"].keys()
+    assert out["response"] == sync["response"] and out["policy_version"] == sync["policy_version"]
+    assert out["meta"]["channel"] == "web" and out["meta"]["risk_resources_shown"] is True
+
+
+def test_backend_only_sees_what_the_guard_lets_through(monkeypatch):
+    sent = []
+
+    async def record(messages):
+        sent.append(messages[-1]["content"])
+        return {"text": "model reply"}
+
+    monkeypatch.setattr(pipeline, "ainfer", record)
+    out = asyncio.run(arun_inference("chat", "please email me at jane.doe@example.com thanks", "A7"))
+    assert out["meta"]["safety"]["action"] == "redact" and out["response"] == "model reply"
+    assert sent == ["please email me at ja****************** thanks"]
+
+    out = asyncio.run(arun_inference("chat", "diagnose me please", "A8"))
+    assert out["meta"]["safety"]["action"] == "block" and out["response"] != "model reply"
+    assert len(sent) == 1  # a blocked message never reaches the backend
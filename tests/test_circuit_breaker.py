@@ -0,0 +1,86 @@
+# tests/test_circuit_breaker.py
+import asyncio
+
+import pytest
+
+from app.orchestrator import arun_inference, pipeline
+from app.orchestrator.breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+def _breaker(clock, **kw):
+    return CircuitBreaker("test", min_calls=4, window=10, open_seconds=5, probe_calls=2, clock=clock, **kw)
+
+
+def test_trips_on_error_rate_then_half_opens_with_probes():
+    clock = _Clock()
+    b = _breaker(clock)
+    for ok in (True, False, True, False):
+        assert b.allow()
+        b.record(ok, 0.1)
+    assert b.state == OPEN and not b.allow() and b.stats()["rejected"] == 1
+
+    clock.now += 5
+    assert b.state == HALF_OPEN
+    assert b.allow() and b.allow() and not b.allow()  # only probe_calls probes
+    b.record(True, 0.1)
+    b.record(True, 0.1)
+    assert b.state == CLOSED and b.allow()
+
+
+def test_failed_probe_reopens_and_old_samples_expire():
+    clock = _Clock()
+    b = _breaker(clock)
+    for _ in range(3):
+        b.record(False, 0.1)
+    clock.now += 11  # outside the window
+    b.record(True, 0.1)
+    assert b.state == CLOSED
+    for _ in range(4):
+        b.record(False, 0.1)
+    clock.now += 5
+    assert b.allow()
+    b.record(False, 0.1)
+    assert b.state == OPEN
+
+
+def test_trips_on_latency_percentile():
+    clock = _Clock()
+    b = _breaker(clock, slow_seconds=1.0, percentile=75)
+    for latency in (0.1, 0.1, 0.1, 2.0):
+        b.record(True, latency)
+    assert b.state == CLOSED and b.stats()["p99"] == 2.0
+    b.record(True, 2.0)
+    assert b.state == OPEN
+
+
+@pytest.fixture
+def breaker(monkeypatch):
+    b = CircuitBreaker("model", min_calls=2, open_seconds=60)
+    monkeypatch.setattr(pipeline, "_model_breaker", b)
+    return b
+
+
+def test_open_circuit_serves_the_template_without_calling_the_model(breaker, monkeypatch):
+    calls = []
+
+    async def failing(messages):
+        calls.append(messages)
+        raise ConnectionError("backend down")
+
+    monkeypatch.setattr(pipeline, "ainfer", failing)
+    for i in range(2):
+        out = asyncio.run(arun_inference("chat", "hello there", f"CB{i}"))
+        assert out["meta"]["degraded_stages"] == ["model"]
+    assert breaker.state == OPEN and len(calls) == 2
+
+    out = asyncio.run(arun_inference("chat", "hello there", "CB9"))
+    assert len(calls) == 2 and out["meta"]["model_circuit"] == OPEN
+    assert out["response"] == pipeline._safety_preprocess("chat", "hello there")
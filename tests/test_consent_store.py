@@ -0,0 +1,96 @@
+# tests/test_consent_store.py
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+from sqlalchemy import create_engine
+
+from app.safety.consent_store import ConsentStore
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def db_url(tmp_path):
+    return f"sqlite:///{tmp_path / 'consent.db'}"
+
+
+def test_upsert_and_lookup(db_url):
+    store = ConsentStore(create_engine(db_url))
+    assert store.get("u1") is None and store.is_accepted("u1") is False
+    store.put("u1", True, "2026-01-01T00:00:00+00:00")
+    assert store.is_accepted("u1") is True
+    store.put("u1", False, "2026-01-02T00:00:00+00:00")
+    assert store.get("u1") == {"accepted": False, "ts": "2026-01-02T00:00:00+00:00", "version": 1}
+    assert store.is_accepted("u1") is False
+
+
+def test_wal_mode(db_url):
+    engine = create_engine(db_url)
+    ConsentStore(engine)
+    with engine.connect() as conn:
+        assert conn.exec_driver_sql("PRAGMA journal_mode").scalar() == "wal"
+
+
+def test_cache_sees_other_workers(db_url):
+    clock = _Clock()
+    mine = ConsentStore(create_engine(db_url), cache_ttl_seconds=30, clock=clock)
+    other = ConsentStore(create_engine(db_url))
+    assert mine.is_accepted("u") is False
+    other.put("u", True, "t1")
+    assert mine.is_accepted("u") is True  # misses are never cached
+    other.put("u", False, "t2")
+    assert mine.is_accepted("u") is True  # acceptance served from cache ...
+    clock.now = 31
+    assert mine.is_accepted("u") is False  # ... until it expires
+
+
+def test_cache_is_bounded(db_url):
+    store = ConsentStore(create_engine(db_url), cache_size=2)
+    for uid in ("a", "b", "c"):
+        store.put(uid, True, "t")
+    assert list(store._accepted) == ["b", "c"]
+    assert store.is_accepted("a") is True
+
+
+def test_migrates_legacy_json_once(db_url, tmp_path):
+    legacy = tmp_path / "consent_store.json"
+    legacy.write_text(json.dumps({
+        "old": {"accepted": True, "ts": "t0", "version": 1},
+        "kept": {"accepted": True, "ts": "t0", "version": 1},
+        "declined": {"accepted": False, "ts": "t0", "version": 1},
+    }), encoding="utf-8")
+    store = ConsentStore(create_engine(db_url))
+    store.put("kept", False, "t9")  # newer row in the table wins
+    assert store.migrate_json(str(legacy)) == 3
+    assert store.is_accepted("old") and not store.is_accepted("declined")
+    assert store.get("kept")["ts"] == "t9"
+    assert not legacy.exists() and (tmp_path / "consent_store.json.migrated").exists()
+    assert store.migrate_json(str(legacy)) == 0
+
+
+def test_concurrent_workers_do_not_lose_writes(db_url):
+    ConsentStore(create_engine(db_url))
+    worker = (
+        "import sys; from sqlalchemy import create_engine; from app.safety.consent_store import ConsentStore;"
+        "s = ConsentStore(create_engine(sys.argv[1]));"
+        "[s.put(f'{sys.argv[2]}-{i}', True, 't') for i in range(50)]"
+    )
+    env = {**os.environ, "PYTHONPATH": str(ROOT)}
+    procs = [
+        subprocess.Popen([sys.executable, "-c", worker, db_url, f"w{n}"], cwd=ROOT, env=env) for n in range(4)
+    ]
+    assert all(p.wait(timeout=60) == 0 for p in procs)
+    store = ConsentStore(create_engine(db_url))
+    assert all(store.is_accepted(f"w{n}-{i}") for n in range(4) for i in range(50))
@@ -0,0 +1,76 @@
+# tests/test_decision_cache.py
+import importlib
+from dataclasses import replace
+
+import pytest
+
+from app.safety import config as safety_config
+from app.safety.decision_cache import DecisionCache
+from app.safety.safety import SafetyGuard, _METRICS, detect_risk
+
+s = importlib.import_module("app.safety.safety")
+
+
+@pytest.fixture
+def cache(monkeypatch):
+    c = DecisionCache(max_entries=8, ttl_seconds=60, metrics=s._metrics)
+    monkeypatch.setattr(s, "_decision_cache", c)
+    return c
+
+
+def _as_tuple(d):
+    return (d.action, d.text, d.categories, d.reasons, d.redactions, d.risk, d.meta)
+
+
+@pytest.mark.parametrize("text", ["hello", "I'm done", "I want to die", "mail me at a.b@example.com"])
+def test_hits_match_fresh_evaluation(cache, text):
+    fresh = SafetyGuard()._evaluate(text, {})
+    first = SafetyGuard().evaluate(text)
+    second = SafetyGuard().evaluate(text)
+    assert _as_tuple(first) == _as_tuple(second) == _as_tuple(fresh)
+    assert len(cache) == 1
+
+
+def test_hit_still_bumps_counters(cache):
+    SafetyGuard().evaluate("hi there")
+    before = _METRICS["decision_total"], _METRICS["decision_cache_hits_total"]
+    SafetyGuard().evaluate("hi there")
+    assert _METRICS["decision_total"] == before[0] + 1
+    assert _METRICS["decision_cache_hits_total"] == before[1] + 1
+
+    detect_risk("I want to die")
+    risk_before = _METRICS["risk_triggers_count"]
+    assert detect_risk("I want to die")["risk"] == "high"
+    assert _METRICS["risk_triggers_count"] == risk_before + 1
+
+
+def test_copies_are_independent(cache):
+    d = SafetyGuard().evaluate("I want to die", {"session_id": "x"})
+    d.categories.append("tampered")
+    d.meta["extra"] = "1"
+    again = SafetyGuard().evaluate("I want to die")
+    assert "tampered" not in again.categories
+    assert again.meta == {"risk_resources_shown": True}
+
+
+def test_lru_and_ttl_eviction():
+    now = [0.0]
+    c = DecisionCache(max_entries=2, ttl_seconds=10, clock=lambda: now[0])
+    for k in "abc":
+        c.put(k, k, [])
+    assert c.get("a") is None and c.get("c") == ("c", [])
+    now[0] = 11.0
+    assert c.get("c") is None
+    assert len(c) == 1
+
+
+def test_policy_change_invalidates(cache, monkeypatch):
+    SafetyGuard().evaluate("hello")
+    monkeypatch.setattr(s, "_policy", replace(s._policy, version="2:changed"))
+    misses = _METRICS["decision_cache_misses_total"]
+    SafetyGuard().evaluate("hello")
+    assert _METRICS["decision_cache_misses_total"] == misses + 1
+
+
+def test_disabled_by_default():
+    assert safety_config.get_cache_settings()["enabled"] is False
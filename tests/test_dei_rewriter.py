@@ -0,0 +1,64 @@
+# tests/test_dei_rewriter.py
+import importlib
+
+from hypothesis import given, settings, strategies as st
+
+from app.safety.dei import DeiRewriter
+from app.safety.safety import _compile_dei_substituter, apply_dei_filter
+
+s = importlib.import_module("app.safety.safety")
+
+_ENTRIES = ["mentally ill", "ill", "crazy|insane", "insane asylum", "committed suicide", "suicide", "addict", "addicted"]
+_WORDS = ["mentally", "ill", "crazy", "insane", "insanely", "asylum", "committed", "suicide", "addict", "addicted",
+          "Crazy", "ILL", "the", "a", "so", "crazy-ish"]
+
+
+def _sequential(subs, text):
+    # Reference: the previous one-sub()-per-entry loop
+    changed = False
+    for pattern, replacement in subs:
+        out = pattern.sub(replacement, text)
+        changed |= out != text
+        text = out
+    return text, changed
+
+
+@settings(max_examples=300, deadline=None)
+@given(
+    st.lists(st.sampled_from(_ENTRIES), min_size=1, max_size=len(_ENTRIES), unique=True),
+    st.lists(st.sampled_from(_WORDS), max_size=30),
+    st.sampled_from([" ", ", ", "\n"]),
+)
+def test_single_pass_matches_sequential_subs(keys, words, sep):
+    # Replacements contain no lexicon words, so the old loop had nothing to cascade on
+    subs = _compile_dei_substituter({k: f"Q{chr(ord('a') + i)}x" for i, k in enumerate(keys)})
+    text = sep.join(words)
+    out, counts = DeiRewriter(subs).redact(text)
+    assert (out, bool(counts)) == _sequential(subs, text)
+
+
+def test_identity_replacement_is_not_a_rewrite():
+    rewriter = DeiRewriter(_compile_dei_substituter({"victim": "victim"}))
+    assert rewriter.redact("a victim") == ("a victim", {})
+
+
+def test_template_replacements_expand():
+    rewriter = DeiRewriter(_compile_dei_substituter({r"\b(sick)ly\b": r"\1"}))
+    assert rewriter.redact("so sickly") == ("so sick", {r"\b(sick)ly\b": 1})
+
+
+def test_counts_one_rewrite_per_string():
+    before = s._METRICS["dei_rewrites_count"]
+    assert apply_dei_filter("crazy, insane, mentally ill") == (
+        "feeling overwhelmed, feeling overwhelmed, person living with a mental health condition"
+    )
+    assert s._METRICS["dei_rewrites_count"] == before + 1
+    apply_dei_filter("nothing to change")
+    assert s._METRICS["dei_rewrites_count"] == before + 1
+
+
+def test_unicode_case_folding_matches_re():
+    subs = _compile_dei_substituter({"committed suicide": "died by suicide", "victim": "survivor"})
+    for text in ("committed ſuicide", "COMMITTED SUICIDE", "a Kictim victim"):
+        out, counts = DeiRewriter(subs).redact(text)
+        assert (out, bool(counts)) == _sequential(subs, text)
@@ -0,0 +1,51 @@
+# tests/test_import_budget.py
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# Cumulative `python -X importtime` microseconds, best of a few fresh interpreters.
+# Generous on purpose: the guard module alone (patterns, policies, Prometheus)
+# costs several times these, so pulling it back in eagerly blows the budget.
+_BUDGET_US = {"app.safety": 20_000, "app.safety.pii": 60_000}
+
+_HEAVY = ("app.safety.safety", "prometheus_client", "yaml", "asyncio")
+
+
+def _run(*args):
+    env = {**os.environ, "PYTHONPATH": str(ROOT)}
+    return subprocess.run([sys.executable, *args], cwd=ROOT, env=env, capture_output=True, text=True, check=True)
+
+
+def _cumulative_us(module):
+    best = None
+    for _ in range(3):
+        for line in _run("-X", "importtime", "-c", f"import {module}").stderr.splitlines():
+            parts = line.split("|")
+            if len(parts) == 3 and parts[2].strip() == module:
+                us = int(parts[1])
+                best = us if best is None else min(best, us)
+    assert best is not None, f"no importtime line for {module}"
+    return best
+
+
+def test_redact_pii_import_stays_light():
+    probe = f"import sys; from app.safety import redact_pii; print([m for m in {_HEAVY!r} if m in sys.modules])"
+    assert _run("-c", probe).stdout.strip().splitlines()[-1] == "[]"
+
+
+def test_guard_module_defers_policy_and_metrics():
+    probe = (
+        "import importlib, sys; s = importlib.import_module('app.safety.safety');"
+        "print('_policy' in vars(s), s._guard_singleton is None, 'prometheus_client' in sys.modules);"
+        "s.enforce_scope('hi'); print('_policy' in vars(s))"
+    )
+    assert _run("-c", probe).stdout.strip().splitlines()[-2:] == ["False True False", "True"]
+
+
+def test_import_time_budget():
+    for module, budget in _BUDGET_US.items():
+        spent = _cumulative_us(module)
+        assert spent <= budget, f"import {module} took {spent} us (budget {budget} us)"
@@ -0,0 +1,40 @@
+# tests/test_inference_stream.py
+import asyncio
+
+from app.orchestrator import arun_inference_stream, pipeline, run_inference, run_inference_stream
+
+
+async def _collect(agen):
+    return [event async for event in agen]
+
+
+def test_preamble_first_then_body_matches_run_inference():
+    p = {"age_band": "adult"}
+    events = list(run_inference_stream("inner_me", "I want to die", "ST1", p))
+    head, *deltas, end = events
+    sync = run_inference("inner_me", "I want to die", "ST2", p)
+    assert head["event"] == "preamble" and head["response"] is None
+    assert head["reply"]["resources"] == sync["reply"]["resources"]
+    assert head["meta"]["risk_resources_shown"] is True and head["policy_version"] == sync["policy_version"]
+    assert len(deltas) > 1 and all(e["event"] == "delta" for e in deltas)
+    assert end == {"event": "end", "response": sync["response"]}
+    assert "".join(e["text"] for e in deltas) == sync["response"]
+
+
+def test_resources_go_out_before_generation(monkeypatch):
+    gen = run_inference_stream("inner_me", "I want to die", "ST3")
+    monkeypatch.setattr(pipeline, "_safety_preprocess", lambda *a: 1 / 0)
+    assert next(gen)["reply"]["type"] == "safety_resources"
+
+
+def test_async_stream_guards_the_body(monkeypatch):
+    async def _reply(messages):
+        return {"text": "You are not crazy. Call 555-123-4567 now."}
+
+    monkeypatch.setattr(pipeline, "ainfer", _reply)
+    events = asyncio.run(_collect(arun_inference_stream("chat", "hello there", "ST4")))
+    assert events[0]["event"] == "preamble" and events[0]["reply"] == {}
+    body = "".join(e["text"] for e in events if e["event"] == "delta")
+    assert body == events[-1]["response"]
+    assert "crazy" not in body and "555" not in body and "[redacted phone]" in body
+    assert events[-1]["meta"]["safety"]["action"] == "allow"
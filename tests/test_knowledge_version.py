@@ -0,0 +1,59 @@
+# tests/test_knowledge_version.py
+import builtins
+import json
+import os
+
+from app.knowledge.version import VersionProvider, knowledge_version
+from app.orchestrator.pipeline import run_inference
+
+
+def _write(path, data, bom=False):
+    path.write_text(("\ufeff" if bom else "") + json.dumps(data), encoding="utf-8")
+    st = os.stat(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+
+
+def test_reads_once_then_serves_without_io(tmp_path, monkeypatch):
+    path = tmp_path / "knowledge_version.json"
+    _write(path, {"knowledge_version": 4}, bom=True)
+    provider = VersionProvider(path, revalidate_seconds=60)
+    assert provider.get() == 4
+
+    def _no_io(*a, **k):
+        raise AssertionError("file I/O on the request path")
+
+    monkeypatch.setattr(os, "stat", _no_io)
+    monkeypatch.setattr(builtins, "open", _no_io)
+    assert provider.get() == 4
+
+
+def test_change_notifies_subscribers(tmp_path):
+    path = tmp_path / "knowledge_version.json"
+    _write(path, {"version": 1})
+    provider = VersionProvider(path, revalidate_seconds=0)
+    seen = []
+    unsubscribe = provider.subscribe(lambda old, new: seen.append((old, new)))
+    provider.subscribe(lambda old, new: 1 / 0)  # a failing subscriber does not stop the others
+    assert provider.get() == 1 and seen == []
+    _write(path, {"knowledge_version": 2})
+    assert provider.get() == 2 and seen == [(1, 2)]
+    unsubscribe()
+    _write(path, {"knowledge_version": 3})
+    assert provider.refresh() == 3 and seen == [(1, 2)]
+
+
+def test_invalid_or_missing_file_keeps_last_good(tmp_path):
+    path = tmp_path / "knowledge_version.json"
+    assert VersionProvider(path, default=7).get() == 7
+    _write(path, {"knowledge_version": 5})
+    provider = VersionProvider(path, revalidate_seconds=0)
+    assert provider.get() == 5
+    path.write_text("{broken", encoding="utf-8")
+    assert provider.get() == 5
+    _write(path, {"knowledge_version": 0})
+    assert provider.get() == 5
+
+
+def test_pipeline_reports_the_cached_version():
+    out = run_inference("inner_me", "hello", "KV1", {"age_band": "adult"})
+    assert out["policy_version"] == out["meta"]["policy_version"] == knowledge_version.get()
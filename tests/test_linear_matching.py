@@ -0,0 +1,84 @@
+# tests/test_linear_matching.py
+import importlib
+import re
+import time
+
+import pytest
+from hypothesis import given, strategies as st
+
+from app.safety import config as safety_config
+from app.safety.safety import SafetyGuard
+from app.safety.scanner import CoOccurrence, UnsafePatternError, check_linear
+
+# `app.safety.safety` resolves to the guard singleton via the package re-export
+s = importlib.import_module("app.safety.safety")
+
+
+@pytest.mark.parametrize("src", [
+    r"(a+)+$",
+    r"(?:\d[ -]*?){13,19}",
+    r"\bkill\b.*\bmen\b",
+    r"(\w+)\1",
+    r"(?:a.*)?b",
+    r"\b[A-Za-z0-9._%+-]+@[a-z]+",  # quadratic on a long run with no '@'
+    r'[^"]*"',
+    r"(?<!x)[a-z]+@",  # the lookbehind does not fence the run
+])
+def test_checker_rejects_backtracking_shapes(src):
+    with pytest.raises(UnsafePatternError):
+        check_linear(src)
+
+
+@pytest.mark.parametrize("src", [
+    r"\b(diagnos\w*|prescrib\w*|meds?|medication advice|what dose|dosage)\b",
+    r"(.)\1{50,}",
+    r"\bwhich\s+meds?\b",
+    r"\b[A-Za-z0-9._%+-]{1,64}@[a-z]+",
+    r"(?<![^\s<])[A-Za-z0-9._%+-]+@",
+    r"^\s*x+\s*$",
+])
+def test_checker_accepts_safe_patterns(src):
+    check_linear(src)
+
+
+@given(st.lists(st.sampled_from(["kill", "gas", "men", "woman", "x", "\n", "killmen", "-"]), max_size=15))
+def test_cooccurrence_matches_dotstar_regex(words):
+    text = " ".join(words)
+    left, right = r"\b(kill|gas)\b", r"\b(men|woman)\b"
+    legacy = re.compile(f"{left}.*{right}", re.I)
+    assert bool(CoOccurrence(left, right, re.I).search(text)) == bool(legacy.search(text))
+
+
+@pytest.mark.parametrize("hostile", [
+    "kill " * 2000,
+    "dose " * 2000,
+    "🙂" * 40 + "x",
+    "1 " * 5000,
+    "1-" * 5000 + "a",
+])
+def test_hostile_inputs_evaluate_quickly(hostile):
+    text = hostile[:SafetyGuard.MAX_LEN]
+    start = time.perf_counter()
+    SafetyGuard().evaluate(text)
+    assert time.perf_counter() - start < 1.0
+
+
+def test_card_masking_still_works():
+    g = SafetyGuard()
+    for card in ("4111 1111 1111 1111", "4111-1111-1111-1111", "4111111111111111"):
+        d = g.evaluate(f"card {card} thanks")
+        assert d.redactions.get("credit_card") == 1
+        assert card not in d.text
+
+
+def test_unsafe_scope_pattern_dropped_in_linear_mode(monkeypatch):
+    monkeypatch.setattr(safety_config, "get_scope_patterns", lambda: [r"(a+)+$", r"\bprescribe\b"])
+    monkeypatch.setattr(safety_config, "get_matching_mode", lambda: "linear")
+    assert s._compile_scope_block_re().pattern == r"(?:\bprescribe\b)"
+
+    monkeypatch.setattr(safety_config, "get_matching_mode", lambda: "permissive")
+    assert "(a+)+$" in s._compile_scope_block_re().pattern
+
+
+def test_matching_mode_defaults_to_linear():
+    assert safety_config.get_matching_mode() == "linear"
@@ -0,0 +1,110 @@
+# tests/test_model_client.py
+import asyncio
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from app.orchestrator import model
+from app.orchestrator.client import ModelClient, ModelError, RetryBudget
+
+
+class _Stub(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive
+    script = []  # status codes (or raw 200 bodies) to answer with, then 200
+    peers = set()
+
+    def do_POST(self):
+        self.peers.add(self.client_address)
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        status = self.script.pop(0) if self.script else 200
+        payload = json.dumps({"choices": [{"message": {"content": f"echo {body['messages'][-1]['content']}"}}]})
+        data = payload.encode() if status == 200 else b"{}"
+        if isinstance(status, bytes):
+            status, data = 200, status
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    _Stub.script, _Stub.peers = [], set()
+    srv = ThreadingHTTPServer(("127.0.0.1", 0), _Stub)
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{srv.server_port}"
+    srv.shutdown()
+    srv.server_close()
+
+
+def _client(url, **kw):
+    return ModelClient(url, model="stub", backoff=0.001, max_backoff=0.01, **kw)
+
+
+def test_sync_and_async_share_one_keepalive_connection(server):
+    client = _client(server)
+    try:
+        assert client.complete([{"role": "user", "content": "a"}])["text"] == "echo a"
+        assert asyncio.run(client.acomplete([{"role": "user", "content": "b"}]))["text"] == "echo b"
+        assert client.complete([{"role": "user", "content": "c"}])["text"] == "echo c"
+        assert len(_Stub.peers) == 1  # one connection, reused across both paths
+        stats = client.stats()
+        assert stats["requests"] == 3 and stats["in_flight"] == 0 and stats["connections"] == 1
+    finally:
+        client.close()
+
+
+def test_retries_transient_errors(server):
+    _Stub.script = [503, 429]
+    client = _client(server)
+    try:
+        assert client.complete([{"role": "user", "content": "x"}])["text"] == "echo x"
+        assert client.stats()["retries"] == 2
+        _Stub.script = [400]  # not retryable
+        with pytest.raises(ModelError):
+            client.complete([{"role": "user", "content": "x"}])
+    finally:
+        client.close()
+
+
+def test_retry_budget_stops_retry_storms(server):
+    _Stub.script = [500] * 10
+    client = _client(server, max_attempts=5, budget=RetryBudget(ratio=0, min_per_second=0, cap=1))
+    try:
+        with pytest.raises(ModelError):
+            client.complete([{"role": "user", "content": "x"}])
+        stats = client.stats()
+        assert stats["retries"] == 1 and stats["budget_exhausted"] == 1 and stats["errors"] == 1
+        assert len(_Stub.script) == 8  # two attempts, not five
+    finally:
+        client.close()
+
+
+def test_infer_uses_the_configured_backend(server, monkeypatch):
+    assert model.infer([{"role": "user", "content": "hi"}]) == {"text": "ok"}  # no backend configured
+    client = _client(server)
+    monkeypatch.setattr("app.orchestrator.client.get_model_client", lambda: client)
+    try:
+        assert model.infer([{"role": "user", "content": "hi"}])["text"] == "echo hi"
+        assert asyncio.run(model.ainfer([{"role": "user", "content": "yo"}]))["text"] == "echo yo"
+    finally:
+        client.close()
+
+
+def test_malformed_body_is_a_model_error(server):
+    _Stub.script = [b"<html>oops", b'{"choices": []}']
+    client = _client(server)
+    try:
+        for _ in range(2):
+            with pytest.raises(ModelError):
+                client.complete([{"role": "user", "content": "x"}])
+        stats = client.stats()
+        assert stats["errors"] == 2 and stats["requests"] == 0
+    finally:
+        client.close()
@@ -0,0 +1,78 @@
+# tests/test_policy_bundle.py
+import importlib
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+from app.safety import config as safety_config
+from app.safety import policy_bundle
+
+s = importlib.import_module("app.safety.safety")
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+@pytest.fixture
+def bundle_dir(tmp_path, monkeypatch):
+    monkeypatch.setenv("SAFETY_POLICY_BUNDLE_DIR", str(tmp_path))
+    monkeypatch.delenv("SAFETY_POLICY_BUNDLE", raising=False)
+    return tmp_path
+
+
+def _fields(p):
+    return (
+        p.version, p.redirect_message, p.scope_block_re.pattern, p.scope_block_re.flags, dict(p.dei_lexicon),
+        [(x.pattern, x.flags, r) for x, r in p.dei_subs], p.windowing,
+    )
+
+
+def test_bundle_round_trip_skips_yaml(bundle_dir, monkeypatch):
+    parsed = s._compile_policy(reload=True)
+    assert os.path.exists(policy_bundle.bundle_path())
+
+    def _no_yaml(path):
+        raise AssertionError("policies.yaml parsed despite a matching bundle")
+
+    monkeypatch.setattr(safety_config, "_load_yaml_file", _no_yaml)
+    loaded = s._compile_policy(reload=True)
+    assert _fields(loaded) == _fields(parsed)
+    assert safety_config.get_policy_version() == parsed.version
+
+
+def test_changed_source_falls_back_to_parsing(bundle_dir):
+    s._compile_policy(reload=True)
+    path, data = safety_config.policy_source()
+    assert policy_bundle.load(policy_bundle.source_key((path, data + b"\n# edited\n"))) is None
+    assert policy_bundle.load(policy_bundle.source_key((path, data))) is not None
+
+
+def test_corrupt_bundle_is_ignored(bundle_dir):
+    parsed = s._compile_policy(reload=True)
+    Path(policy_bundle.bundle_path()).write_bytes(b"\x00not marshal")
+    assert _fields(s._compile_policy(reload=True)) == _fields(parsed)
+
+
+def test_disabled_writes_nothing(bundle_dir, monkeypatch):
+    monkeypatch.setenv("SAFETY_POLICY_BUNDLE", "0")
+    s._compile_policy(reload=True)
+    assert not os.path.exists(policy_bundle.bundle_path())
+
+
+def test_warm_cold_start_never_imports_yaml(bundle_dir):
+    env = {**os.environ, "PYTHONPATH": str(ROOT)}
+    probe = "import sys; from app.safety import enforce_scope; enforce_scope('hi'); print('yaml' in sys.modules)"
+    first = subprocess.run([sys.executable, "-c", probe], cwd=ROOT, env=env, capture_output=True, text=True)
+    second = subprocess.run([sys.executable, "-c", probe], cwd=ROOT, env=env, capture_output=True, text=True)
+    assert first.stdout.strip().splitlines()[-1] == "True"
+    assert second.stdout.strip().splitlines()[-1] == "False"
+
+
+def test_code_change_invalidates_the_bundle(bundle_dir, monkeypatch):
+    s._compile_policy(reload=True)
+    source = safety_config.policy_source()
+    assert policy_bundle.load(policy_bundle.source_key(source)) is not None
+    monkeypatch.setattr(policy_bundle, "code_fingerprint", lambda: "edited-normalizer")
+    assert policy_bundle.load(policy_bundle.source_key(source)) is None
@@ -0,0 +1,114 @@
+# tests/test_policy_reload.py
+import dataclasses
+import importlib
+import os
+import threading
+
+import pytest
+
+from app.safety import config as safety_config
+from app.safety.policy_snapshot import PolicyWatcher
+from app.safety.safety import apply_dei_filter, enforce_scope, refresh_policies
+
+s = importlib.import_module("app.safety.safety")
+
+_POLICY = """
+version: 1
+scope:
+  block_patterns:
+    - (?i)\\bdosage\\b
+  redirect_message: "{msg}"
+dei:
+  lexicon:
+    "crazy": "{crazy}"
+"""
+
+
+def _write(path, msg="Please ask a clinician.", crazy="feeling overwhelmed"):
+    path.write_text(_POLICY.format(msg=msg, crazy=crazy), encoding="utf-8")
+    # make sure the watcher sees a new mtime even on coarse-grained filesystems
+    st = os.stat(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+
+
+@pytest.fixture
+def policy_file(tmp_path, monkeypatch):
+    path = tmp_path / "policies.yaml"
+    _write(path)
+    monkeypatch.setattr(safety_config, "_candidate_policy_paths", lambda: [str(path)])
+    refresh_policies()
+    yield path
+    monkeypatch.undo()
+    refresh_policies()
+
+
+def test_snapshot_is_immutable():
+    policy = s._policy
+    with pytest.raises(dataclasses.FrozenInstanceError):
+        policy.version = "x"
+    with pytest.raises(TypeError):
+        policy.dei_lexicon["crazy"] = "x"
+
+
+def test_refresh_publishes_a_new_snapshot(policy_file):
+    before = s._policy
+    _write(policy_file, msg="Talk to your doctor.")
+    refresh_policies()
+    assert s._policy is not before
+    assert s._policy.version != before.version
+    assert enforce_scope("what dosage?") == (True, "I can't help with diagnosis or medications. Talk to your doctor.")
+    # a reader still holding the old snapshot sees it whole
+    assert before.redirect_message == "Please ask a clinician."
+
+
+def test_watcher_reloads_after_file_settles(policy_file):
+    watcher = PolicyWatcher(safety_config.policy_paths, lambda: s._reload_policy(keep_on_error=True), interval=60)
+    assert watcher.check() is False
+    _write(policy_file, crazy="having a hard time")
+    assert watcher.check() is False  # changed since the last poll: wait one more
+    assert apply_dei_filter("so crazy") == "so feeling overwhelmed"
+    assert watcher.check() is True
+    assert apply_dei_filter("so crazy") == "so having a hard time"
+    assert watcher.check() is False
+
+
+def test_invalid_file_keeps_current_policy(policy_file):
+    version = s._policy.version
+    policy_file.write_text("scope: [unclosed", encoding="utf-8")
+    s._reload_policy(keep_on_error=True)
+    assert s._policy.version == version
+    assert enforce_scope("what dosage?")[0] is True
+
+
+def test_reload_under_load_has_no_torn_reads(policy_file):
+    outputs = set()
+    errors = []
+    stop = threading.Event()
+
+    def reader():
+        while not stop.is_set():
+            try:
+                outputs.add(apply_dei_filter("crazy"))
+            except Exception as e:  # pragma: no cover - failure path
+                errors.append(e)
+
+    threads = [threading.Thread(target=reader) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for i in range(20):
+        _write(policy_file, crazy=f"variant {i % 2}")
+        refresh_policies()
+    stop.set()
+    for t in threads:
+        t.join()
+    assert not errors
+    assert outputs <= {"feeling overwhelmed", "variant 0", "variant 1"}
+
+
+def test_background_watcher_starts_once():
+    try:
+        w = s.start_policy_watcher(interval=30)
+        assert s.start_policy_watcher() is w and w.running
+    finally:
+        s.stop_policy_watcher()
+    assert not w.running
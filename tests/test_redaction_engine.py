@@ -0,0 +1,98 @@
+# tests/test_redaction_engine.py
+import re
+
+from hypothesis import given, strategies as st
+
+from app.safety.redaction import RedactionEngine, Rule, mask
+from app.safety.pii import _EMAIL_TOKEN, _PHONE_TOKEN, _PUBLIC_EMAIL_RE, _PUBLIC_PHONE_RE
+from app.safety.safety import SafetyGuard, redact_pii
+
+_TOKENS = [
+    "hello", "street", "pin code", "a.b@example.com", "555-123-4567", "+91 98765 43210",
+    "4111 1111 1111 1111", "4111111111111111", "12", "98765", "x@y.io", "(555) 123 4567", "st.", "@", "-", ".",
+]
+
+
+def _sequential_guard(text):
+    # Reference: the previous three-pass implementation (rejected spans not counted)
+    redactions = {}
+
+    def sub(pattern, render, kind, s):
+        count = 0
+
+        def repl(m):
+            nonlocal count
+            out = render(m.group())
+            count += out != m.group()
+            return out
+
+        out = pattern.sub(repl, s)
+        if count:
+            redactions[kind] = redactions.get(kind, 0) + count
+        return out
+
+    def digits_mask(lo, hi, visible):
+        def render(raw):
+            d = re.sub(r"\D", "", raw)
+            return mask(d, visible) if lo <= len(d) <= hi else raw
+        return render
+
+    g = SafetyGuard
+    out = sub(g._CC_RE, digits_mask(13, 19, 4), "credit_card", text)
+    out = sub(g._EMAIL_RE, lambda raw: mask(raw, 2), "email", out)
+    out = sub(g._PHONE_RE, digits_mask(7, 12, 2), "phone", out)
+    if g._ADDR_HINTS.search(out):
+        redactions["address_hint"] = 1
+    return out, redactions
+
+
+def _sequential_tokens(text):
+    out = _PUBLIC_EMAIL_RE.sub(_EMAIL_TOKEN, text)
+    return _PUBLIC_PHONE_RE.sub(lambda m: ("+" if m.group().strip().startswith("+") else "") + _PHONE_TOKEN, out)
+
+
+@given(st.lists(st.sampled_from(_TOKENS), max_size=10), st.sampled_from(["", " ", "-"]))
+def test_token_mode_matches_sequential_passes(words, sep):
+    text = sep.join(words)
+    assert redact_pii(text) == _sequential_tokens(text)
+
+
+@given(st.lists(st.sampled_from(_TOKENS), max_size=10))
+def test_guard_mode_matches_sequential_passes(words):
+    text = " and ".join(words)
+    assert SafetyGuard()._redact_pii(text) == _sequential_guard(text)
+
+
+@given(st.lists(st.sampled_from(_TOKENS), max_size=40))
+def test_windowed_guard_mode_matches_one_pass(words):
+    text = " and ".join(words)
+    windowing = {"window_chars": 64, "overlap_chars": 24}
+    assert SafetyGuard()._redact_pii(text, windowing) == SafetyGuard()._redact_pii(text)
+
+
+def test_higher_priority_match_cuts_lower_span():
+    # the phone run reaches into the email's local part; the email wins
+    assert redact_pii("+1 555 123 4567@ex.com") == f"+{_PHONE_TOKEN} {_EMAIL_TOKEN}"
+
+
+def test_rejected_spans_are_left_alone_and_not_counted():
+    text = "order 12345678901234567890123"
+    assert SafetyGuard()._redact_pii(text) == (text, {})
+    assert SafetyGuard().evaluate(text).action == "allow"
+
+
+def test_hints_count_once_and_engine_skips_absent_rules():
+    engine = RedactionEngine((
+        Rule("digits", re.compile(r"\b\d{3}\b"), lambda raw: "###", requires="0123456789"),
+        Rule("hint", re.compile(r"\bstreet\b", re.I)),
+    ))
+    assert engine.redact("Street 123 street 456") == ("Street ### street ###", {"hint": 1, "digits": 2})
+    assert engine.redact("no numbers here") == ("no numbers here", {})
+
+
+def test_non_ascii_digits_are_still_redacted():
+    # \d matches any Unicode digit, so the digit prefilter must too
+    for text in ("फ़ोन ९८७६५४३२१० करें", "card ４１１１ １１１１ １１１１ １１１１"):
+        assert redact_pii(text) != text
+        d = SafetyGuard().evaluate(text)
+        assert d.text != text and d.redactions
@@ -0,0 +1,60 @@
+# tests/test_resources_registry.py
+import json
+import os
+
+import pytest
+
+from app.orchestrator.pipeline import _resources_string_for_india
+from app.safety.resources import DEFAULT_RESOURCES, ResourcesRegistry, crisis_resources
+from app.safety.safety import SafetyGuard, inject_resources
+
+
+def _write(path, data):
+    path.write_text(json.dumps(data), encoding="utf-8")
+    st = os.stat(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+
+
+@pytest.fixture
+def resources_file(tmp_path):
+    path = tmp_path / "resources_in.json"
+    _write(path, ["Line A: 1", "Line B: 2"])
+    return path
+
+
+def test_loads_once_and_serves_without_io(resources_file, monkeypatch):
+    reg = ResourcesRegistry(lambda: [str(resources_file)], revalidate_seconds=60)
+    first = reg.render("unsafe")
+    assert first == "If you might be unsafe, these can help right now:\n- Line A: 1\n- Line B: 2"
+
+    def _no_io(*a, **k):
+        raise AssertionError("file I/O on the request path")
+
+    monkeypatch.setattr(os, "stat", _no_io)
+    assert reg.render("unsafe") is first
+    assert reg.render("crisis_help") == "Crisis help (India)\n- Line A: 1\n- Line B: 2"
+
+
+def test_revalidates_by_mtime(resources_file):
+    reg = ResourcesRegistry(lambda: [str(resources_file)], revalidate_seconds=0)
+    before = reg.snapshot()
+    assert reg.snapshot() is before  # unchanged file: same snapshot
+    _write(resources_file, {"india": {"Helpline": "999"}, "UK": {"Samaritans": "116 123"}})
+    assert reg.items() == ("Helpline: 999",)
+    assert reg.render("crisis_help", locale="uk") == "Crisis help (Uk)\n- Samaritans: 116 123"
+    assert reg.items("fr") == ("Helpline: 999",)  # unknown locale: default
+
+
+def test_invalid_file_falls_back(tmp_path, resources_file):
+    bad = tmp_path / "bad.json"
+    bad.write_text("[unclosed", encoding="utf-8")
+    assert ResourcesRegistry(lambda: [str(bad), str(resources_file)]).items() == ("Line A: 1", "Line B: 2")
+    assert ResourcesRegistry(lambda: [str(bad)]).items() == DEFAULT_RESOURCES
+
+
+def test_guard_and_pipeline_share_the_registry():
+    block = crisis_resources.render("unsafe")
+    assert _resources_string_for_india() == block
+    assert inject_resources("ok", {"risk": "high"}) == "ok\n\n" + block
+    d = SafetyGuard().evaluate("I want to die")
+    assert d.text.endswith(crisis_resources.render("crisis_help"))
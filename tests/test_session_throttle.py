@@ -1,5 +1,12 @@
 # tests/test_session_throttle.py
+import threading
+
+import pytest
+
 from app.orchestrator.pipeline import run_inference
+from app.safety import config as safety_config
+from app.safety.throttle import MemoryThrottle, SqliteThrottle
+
 
 def test_per_session_throttle():
     p = {"age_band": "adult"}
@@ -12,4 +19,86 @@ def test_per_session_throttle():
 
     out3 = run_inference("inner_me", "I want to die", "S2", p)
     meta3 = out3.get("meta", {})
-    assert meta3.get("risk_resources_shown")  # new session gets full list
\ No newline at end of file
+    assert meta3.get("risk_resources_shown")  # new session gets full list
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_policy_supplies_the_window():
+    settings = safety_config.get_throttle_settings()
+    assert settings["repeat_risk_seconds"] == 180 and settings["backend"] == "memory"
+
+
+def test_missing_throttle_keys_take_defaults(monkeypatch):
+    monkeypatch.setattr(safety_config, "load_policies", lambda: {"risk": {"throttle": {"repeat_risk_seconds": 30}}})
+    settings = safety_config.get_throttle_settings()
+    assert settings["repeat_risk_seconds"] == 30 and settings["max_sessions"] == 100_000
+    assert settings["backend"] == "memory"
+
+
+def test_memory_throttle_expires_and_stays_bounded():
+    clock = _Clock()
+    t = MemoryThrottle(60, max_entries=64, stripes=4, clock=clock)
+    assert t.check_and_mark("s") is False and t.check_and_mark("s") is True
+    clock.now += 61
+    assert t.check_and_mark("s") is False  # window over: full resources again
+    for i in range(10_000):
+        t.check_and_mark(f"user-{i}")
+    assert len(t) <= 64
+    clock.now += 61
+    t.check_and_mark("late")
+    assert t.check_and_mark("user-9999") is False  # expired entries are gone
+
+
+def test_memory_throttle_marks_once_under_contention():
+    t = MemoryThrottle(60)
+    results = []
+    barrier = threading.Barrier(8)
+
+    def worker():
+        barrier.wait()
+        results.append(t.check_and_mark("same"))
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for th in threads:
+        th.start()
+    for th in threads:
+        th.join()
+    assert sorted(results) == [False] + [True] * 7
+
+
+@pytest.fixture
+def engine(tmp_path):
+    """New engines on one database file; skips the SQLite tests without sqlalchemy."""
+    sqlalchemy = pytest.importorskip("sqlalchemy")
+    url = f"sqlite:///{tmp_path / 'throttle.db'}"
+    return lambda: sqlalchemy.create_engine(url)
+
+
+def test_sqlite_throttle_is_shared_between_workers(engine):
+    clock = _Clock()
+    a = SqliteThrottle(engine(), 60, clock=clock)
+    b = SqliteThrottle(engine(), lambda: 60, clock=clock)
+    assert a.check_and_mark("s") is False
+    assert b.check_and_mark("s") is True
+    clock.now += 61
+    assert b.check_and_mark("s") is False and a.check_and_mark("s") is True
+
+
+def test_sqlite_throttle_prunes(engine):
+    clock = _Clock()
+    t = SqliteThrottle(engine(), 60, max_entries=10, prune_every=5, clock=clock)
+    for i in range(25):
+        clock.now += 1
+        t.check_and_mark(f"s{i}")
+    assert len(t) <= 10
+    assert t.check_and_mark("s24") is True  # newest kept
+    clock.now += 120
+    t.prune()
+    assert len(t) == 0
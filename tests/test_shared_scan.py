@@ -0,0 +1,109 @@
+# tests/test_shared_scan.py
+import importlib
+import re
+from dataclasses import replace
+from types import MappingProxyType
+
+import pytest
+from hypothesis import given, settings, strategies as st
+
+from app.safety.decision_cache import DecisionCache
+from app.safety.safety import (
+    SafetyGuard,
+    detect_risk,
+    enforce_scope,
+    get_safety_guard,
+    inject_resources,
+    pre_prompt_guard,
+)
+
+s = importlib.import_module("app.safety.safety")
+
+_WORDS = [
+    "hello", "I", "want", "to", "die", "i'm done", "nothing matters", "napalm", "suicide",
+    "mail", "a.b@example.com", "skip my meds", "jailbreak", "today", "\x00", "cryptocurrency",
+]
+
+
+def _old_pre_prompt(text, profile):
+    blocked, msg = enforce_scope(text)
+    if blocked:
+        return "block", msg, None
+    dec = get_safety_guard().evaluate(text)
+    return dec.action, dec.text, detect_risk(dec.text, profile)
+
+
+class _Counting:
+    def __init__(self, scanner):
+        self.scanner, self.calls = scanner, 0
+
+    def locate(self, text):
+        self.calls += 1
+        return self.scanner.locate(text)
+
+
+@pytest.fixture
+def counting(monkeypatch):
+    spy = _Counting(SafetyGuard._SCANNER)
+    monkeypatch.setattr(SafetyGuard, "_SCANNER", spy)
+    monkeypatch.setattr(s, "_RISK_SCANNER", None)  # detect_risk must not rescan
+    return spy
+
+
+@pytest.mark.parametrize("text", ["I want to die", "I'm done with all this", "mail me at a.b@example.com", "hi"])
+def test_pre_prompt_guard_scans_once(counting, text):
+    out = pre_prompt_guard(text)
+    assert counting.calls == 1
+    assert out["risk_info"]["risk"] == {"I want to die": "high", "I'm done with all this": "low"}.get(text, "none")
+
+
+def test_cached_decision_needs_no_scan(counting, monkeypatch):
+    monkeypatch.setattr(s, "_decision_cache", DecisionCache(max_entries=8, ttl_seconds=60, metrics=s._metrics))
+    first = pre_prompt_guard("I'm done")
+    second = pre_prompt_guard("I'm done")
+    assert counting.calls == 1
+    assert first == second
+
+
+@settings(max_examples=150, deadline=None)
+@given(st.lists(st.sampled_from(_WORDS), min_size=1, max_size=12))
+def test_matches_separate_scans(words):
+    text = " ".join(words)
+    out = pre_prompt_guard(text, {"age_band": "adult"})
+    action, reply_text, risk = _old_pre_prompt(text, {"age_band": "adult"})
+    assert (out["action"], out["text"]) == (action, reply_text)
+    if risk is not None:
+        assert out["risk_info"] == {**risk, "age_band": "adult"}
+
+
+def test_scan_spans_and_reuse():
+    guard = SafetyGuard()
+    scan = guard.scan("ok\x00 I want to die, nothing matters")
+    assert scan.text == "ok I want to die, nothing matters"
+    (a, b), = scan.spans["self_harm"]
+    assert scan.text[a:b] == "I want to die"
+    assert scan.hits == {"self_harm", "ambiguous_distress"}
+    assert scan.covers(scan.text) and scan.covers(scan.source) and not scan.covers("other")
+    assert detect_risk(scan.text, scan=scan) == detect_risk(scan.text)
+    assert inject_resources("reply", scan=scan) == inject_resources("reply", {"risk": "high"})
+    assert inject_resources("reply", {"risk": "none"}, scan=scan) == "reply"
+    d = guard.evaluate(scan.source, scan=scan)
+    assert d.scan is scan and d.action == "block" and "edge_control_chars" in d.categories
+
+
+def test_scope_block_skips_category_scan(counting, monkeypatch):
+    monkeypatch.setattr(s, "_policy", replace(s._policy, scope_block_re=re.compile("crypto")))
+    scan = get_safety_guard().scan("tell me about crypto")
+    assert enforce_scope(scan.source, scan=scan)[0] is True
+    assert counting.calls == 0
+
+
+def test_partial_windowed_scan_does_not_settle_risk(monkeypatch):
+    windowing = MappingProxyType({"window_chars": 64, "overlap_chars": 16, "max_input_chars": 5000})
+    monkeypatch.setattr(s, "_policy", replace(s._policy, windowing=windowing))
+    monkeypatch.setattr(SafetyGuard, "MAX_LEN", 100)
+    text = "child porn links " + "today I walked home " * 40 + "I want to kill myself"
+    scan = get_safety_guard().scan(text)
+    assert scan.partial and not scan.covers(text)
+    out = pre_prompt_guard(text)
+    assert out["action"] == "block" and out["risk"] == "high"
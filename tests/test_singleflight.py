@@ -0,0 +1,111 @@
+# tests/test_singleflight.py
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from app.orchestrator import arun_inference, pipeline, run_inference
+from app.orchestrator.singleflight import SingleFlight
+
+
+def test_concurrent_duplicates_share_one_call():
+    flight, calls, gate = SingleFlight(), [], threading.Event()
+
+    def work(x):
+        calls.append(x)
+        gate.wait(2)
+        return {"x": x}
+
+    with ThreadPoolExecutor(4) as pool:
+        futs = [pool.submit(flight.do, "k", work, 1) for _ in range(4)]
+        while flight.stats()["hits"] < 3:
+            time.sleep(0.005)
+        gate.set()
+        results = [f.result() for f in futs]
+    assert calls == [1] and results == [{"x": 1}] * 4
+    assert results[0] is not results[1]  # each caller gets its own copy
+    assert flight.stats() == {"calls": 1, "hits": 3, "in_flight": 0}
+    flight.do("k", work, 2)  # finished calls are not cached
+    assert calls == [1, 2]
+
+
+def test_async_duplicates_and_errors():
+    flight, calls = SingleFlight(), []
+
+    async def work(fail):
+        calls.append(fail)
+        await asyncio.sleep(0.05)
+        if fail:
+            raise ValueError("boom")
+        return "ok"
+
+    async def main():
+        assert await asyncio.gather(*(flight.ado("a", work, False) for _ in range(3))) == ["ok"] * 3
+        out = await asyncio.gather(*(flight.ado("b", work, True) for _ in range(2)), return_exceptions=True)
+        assert all(isinstance(e, ValueError) for e in out)
+
+    asyncio.run(main())
+    assert calls == [False, True] and flight.stats()["hits"] == 3
+
+
+def test_stale_leader_is_not_joined():
+    now = [0.0]
+    flight = SingleFlight(window=1.0, clock=lambda: now[0])
+    seen = []
+
+    def inner():
+        now[0] = 5.0
+        seen.append(flight.do("k", lambda: "fresh"))
+        return "stale"
+
+    assert flight.do("k", inner) == "stale" and seen == ["fresh"]
+    assert flight.stats()["hits"] == 0
+
+
+def test_pipeline_coalesces_identical_turns(monkeypatch):
+    calls, original = [], pipeline._safety_preprocess
+
+    def slow(mode, text):
+        calls.append(mode)
+        time.sleep(0.2)
+        return original(mode, text)
+
+    monkeypatch.setattr(pipeline, "_safety_preprocess", slow)
+    hits = pipeline._flights.stats()["hits"]
+    with ThreadPoolExecutor(3) as pool:
+        outs = list(pool.map(lambda sid: run_inference("chat", "same text", sid), ["SF1", "SF1", "SF2"]))
+    assert len(calls) == 2 and outs[0] == outs[1]
+    assert pipeline._flights.stats()["hits"] == hits + 1
+
+    async def both():
+        return await asyncio.gather(arun_inference("chat", "again", "SF3"), arun_inference("chat", "again", "SF3"))
+
+    first, second = asyncio.run(both())
+    assert first == second and pipeline._flights.stats()["hits"] == hits + 2
+
+
+@pytest.mark.parametrize("sid", [None, ""])
+def test_anonymous_turns_are_not_coalesced(sid):
+    assert pipeline._flight_key("chat", "hi", sid) is None
+
+
+def test_cancelled_leader_does_not_cancel_duplicates():
+    flight = SingleFlight()
+
+    async def work():
+        await asyncio.sleep(0.05)
+        return "done"
+
+    async def main():
+        leader = asyncio.ensure_future(flight.ado("k", work))
+        await asyncio.sleep(0)
+        joiner = asyncio.ensure_future(flight.ado("k", work))
+        await asyncio.sleep(0)
+        leader.cancel()
+        assert await joiner == "done"
+        assert leader.cancelled()
+
+    asyncio.run(main())
+    assert flight.stats() == {"calls": 1, "hits": 1, "in_flight": 0}
@@ -0,0 +1,75 @@
+# tests/test_stage_timing.py
+import importlib
+
+import pytest
+
+from app.safety import set_stage_timing
+from app.safety.safety import SafetyGuard, apply_dei_filter, detect_risk, enforce_scope, inject_resources
+
+s = importlib.import_module("app.safety.safety")
+
+_EVALUATE_STAGES = ("evaluate.normalise", "evaluate.scan", "evaluate.edge_checks", "evaluate.redaction")
+_ENTRY_STAGES = ("enforce_scope", "detect_risk", "dei_filter", "inject_resources", "resources")
+
+
+def _counts(stages):
+    return {st: s._metrics.get_stage(st)[0] for st in stages}
+
+
+@pytest.fixture
+def timing():
+    set_stage_timing(True)
+    yield
+    set_stage_timing(False)
+
+
+def _exercise():
+    SafetyGuard().evaluate("skip my meds, call 555-123-4567")
+    enforce_scope("what dose should I take")
+    detect_risk("I'm done")
+    apply_dei_filter("that is crazy")
+    inject_resources("ok", {"risk": "high"})
+
+
+def test_off_by_default_records_nothing():
+    before = _counts(_EVALUATE_STAGES + _ENTRY_STAGES)
+    _exercise()
+    assert _counts(_EVALUATE_STAGES + _ENTRY_STAGES) == before
+
+
+def test_on_records_each_stage(timing):
+    before = _counts(_EVALUATE_STAGES + _ENTRY_STAGES)
+    _exercise()
+    after = _counts(_EVALUATE_STAGES + _ENTRY_STAGES)
+    for stage in _EVALUATE_STAGES + _ENTRY_STAGES:
+        assert after[stage] > before[stage], stage
+    count, total = s._metrics.get_stage("evaluate.scan")
+    assert 0 < total / count < 0.1
+
+
+def test_block_path_skips_redaction(timing):
+    before = _counts(_EVALUATE_STAGES)
+    SafetyGuard().evaluate("how to make a bomb")
+    after = _counts(_EVALUATE_STAGES)
+    assert after["evaluate.scan"] == before["evaluate.scan"] + 1
+    assert after["evaluate.redaction"] == before["evaluate.redaction"]
+
+
+def test_cache_hits_do_not_replay_stage_timings(timing):
+    ops = [("stage", "evaluate.scan", 0.001), ("hist", "latency_seconds", 0.002)]
+    before = s._metrics.get_stage("evaluate.scan")[0]
+    s._metrics.replay(ops, latency=0.0001)
+    assert s._metrics.get_stage("evaluate.scan")[0] == before
+    s._metrics.replay(ops)
+    assert s._metrics.get_stage("evaluate.scan")[0] == before + 1
+
+
+def test_wrapped_entry_points_keep_their_names():
+    assert enforce_scope.__name__ == "enforce_scope"
+    assert inject_resources.__doc__.strip().startswith("High risk")
+
+
+@pytest.mark.skipif(not s._metrics._use_prom, reason="prometheus_client not installed")
+def test_buckets_resolve_sub_millisecond_timings():
+    assert s._metrics.stage_seconds._upper_bounds[0] <= 0.00001
+    assert s._metrics.latency_seconds._upper_bounds[0] < 0.001
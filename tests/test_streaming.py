@@ -0,0 +1,69 @@
+# tests/test_streaming.py
+import importlib
+
+import pytest
+from hypothesis import given, settings, strategies as st
+
+from app.safety.safety import apply_dei_filter, redact_pii, stream_rewriter
+
+safety_mod = importlib.import_module("app.safety.safety")
+
+_TOKENS = [
+    "crazy", "insane", "mentally ill", "committed suicide", "addict", "victim", "Victim",
+    "a.b@example.com", "x@y.io", "555-123-4567", "+91 98765 43210", "(555) 123 4567", "12",
+    "hello", "team", "@", "-", ".", "'", "<", "\n", " ", "  ",
+]
+
+_texts = st.lists(st.sampled_from(_TOKENS), max_size=30).map(lambda ws: "".join(
+    w if i % 2 else w + " " for i, w in enumerate(ws)
+))
+
+
+def _chunked(text, cuts):
+    bounds = sorted({c % (len(text) + 1) for c in cuts} | {0, len(text)})
+    return [text[a:b] for a, b in zip(bounds, bounds[1:])]
+
+
+@settings(max_examples=300, deadline=None)
+@given(_texts, st.lists(st.integers(min_value=0, max_value=10_000), max_size=12))
+def test_stream_matches_batch(text, cuts):
+    out = "".join(stream_rewriter().rewrite(_chunked(text, cuts)))
+    assert out == redact_pii(apply_dei_filter(text))
+
+
+@settings(max_examples=100, deadline=None)
+@given(_texts)
+def test_stream_token_by_token(text):
+    out = "".join(stream_rewriter().rewrite(list(text)))
+    assert out == redact_pii(apply_dei_filter(text))
+
+
+def test_safe_prefix_is_released_early():
+    head = "You are not crazy. Call me at 555-123-4567. " + "Take a slow breath with me. " * 6
+    rw = stream_rewriter()
+    first = rw.feed(head)
+    assert first.startswith("You are not feeling overwhelmed. Call me at [redacted phone].")
+    assert "555" not in first
+    rest = rw.feed("Or mail a.b@example.com please") + rw.flush()
+    assert first + rest == redact_pii(apply_dei_filter(head + "Or mail a.b@example.com please"))
+
+
+def test_long_stream_trims_buffer():
+    text = "word " * 3000 + "call 555-123-4567 now"
+    rw = stream_rewriter()
+    out = "".join(rw.feed(text[i:i + 7]) for i in range(0, len(text), 7)) + rw.flush()
+    assert out == redact_pii(text)
+    assert all(len(stage._buf) < 4096 + 64 for stage in rw._stages)
+
+
+def test_feed_after_flush_raises():
+    rw = stream_rewriter()
+    rw.flush()
+    with pytest.raises(ValueError):
+        rw.feed("more")
+
+
+def test_dei_metric_counts_once_per_stream():
+    before = safety_mod._METRICS["dei_rewrites_count"]
+    list(stream_rewriter(pii=False).rewrite(["that is crazy ", "and insane"]))
+    assert safety_mod._METRICS["dei_rewrites_count"] == before + 1
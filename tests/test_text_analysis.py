@@ -0,0 +1,55 @@
+# tests/test_text_analysis.py
+from hypothesis import given, strategies as st
+
+from app.orchestrator.pipeline import run_inference
+from app.safety.analysis import _LOOKALIKES, analyze
+from app.safety.safety import SafetyGuard, detect_risk, enforce_scope
+
+_FULL_WIDTH = "Ｉ ｗａｎｔ ｔｏ ｄｉｅ"
+_HOMOGLYPH = "ѕuісіdе"  # Cyrillic s, i, e
+_MATH_BOLD = "𝐬𝐮𝐢𝐜𝐢𝐝𝐞"
+
+
+def test_folds_evasions_to_plain_words():
+    assert analyze(_FULL_WIDTH).folded == "i want to die"
+    assert analyze(_HOMOGLYPH).folded == "suicide"
+    assert analyze(_MATH_BOLD).folded == "suicide"
+    assert analyze("ﬁne STRASSE Straße").tokens == ("fine", "strasse", "strasse")
+
+
+def test_ascii_fast_path():
+    a = analyze("Hello World")
+    assert a.is_ascii and a.folded == "hello world" and a.to_original(6, 11) == (6, 11)
+
+
+@given(st.text(alphabet=st.sampled_from("aZ ßﬁＳé\u0301İѕ𝐬ǅ\x001"), max_size=40))
+def test_offsets_point_back_to_the_source(text):
+    a = analyze(text)
+    for i, ch in enumerate(a.folded):
+        start, end = a.to_original(i, i + 1)
+        piece = analyze(text[start:end]).folded
+        assert ch in piece or ch in piece.translate(_LOOKALIKES)  # lookalikes fold by context
+    if text:
+        assert a.to_original(0, len(a.folded)) == (0, len(text))
+
+
+def test_guard_sees_through_evasions():
+    for text in (_FULL_WIDTH, _HOMOGLYPH, _MATH_BOLD):
+        d = SafetyGuard().evaluate(text)
+        assert d.action == "block" and "self_harm" in d.categories
+        assert detect_risk(text)["risk"] == "high"
+    scan = SafetyGuard().scan("ok " + _FULL_WIDTH)
+    (a, b), = scan.spans["self_harm"]
+    assert scan.text[a:b] == _FULL_WIDTH
+
+
+def test_scope_and_pipeline_use_the_folded_text():
+    assert enforce_scope("ＤＩＡＧＮＯＳＥ me please")[0] == enforce_scope("diagnose me please")[0]
+    assert run_inference("chat", _HOMOGLYPH, session_id="fold-1")["reply"]["type"] == "safety_resources"
+
+
+def test_plain_cyrillic_and_greek_are_not_read_as_latin():
+    for text in ("Встреча в ср. в 10 утра", "Привет, как дела?", "Καλημέρα σε όλους"):
+        assert analyze(text).folded == text.casefold()
+        assert SafetyGuard().evaluate(text).action == "allow"
+    assert analyze("ср ѕuісіdе").folded == "ср suicide"  # only the mixed word is folded
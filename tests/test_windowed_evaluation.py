@@ -0,0 +1,99 @@
+# tests/test_windowed_evaluation.py
+import importlib
+import time
+from dataclasses import replace
+from types import MappingProxyType
+
+import pytest
+from hypothesis import given, settings, strategies as st
+
+from app.safety.safety import SafetyGuard, _windows
+
+s = importlib.import_module("app.safety.safety")
+
+_SMALL = {"window_chars": 64, "overlap_chars": 16, "max_input_chars": 5000}
+
+_WORDS = [
+    "today", "I", "walked", "home", "with", "notes", "about", "family", "suicide", "napalm",
+    "i'm done", "jailbreak", "all-in", "skip my meds", "ketamine", "reaction", "uncommitted",
+]
+
+
+@pytest.fixture
+def windowed(monkeypatch):
+    monkeypatch.setattr(s, "_policy", replace(s._policy, windowing=MappingProxyType(dict(_SMALL))))
+    monkeypatch.setattr(SafetyGuard, "MAX_LEN", 100)
+    return SafetyGuard()
+
+
+def test_disabled_by_default_still_blocks():
+    assert s._policy.windowing is None
+    d = SafetyGuard().evaluate("word " * (SafetyGuard.MAX_LEN // 5 + 1))
+    assert d.action == "block" and "edge_too_long" in d.categories
+
+
+def test_long_text_is_evaluated(windowed):
+    d = windowed.evaluate("today I walked home " * 50)
+    assert d.action == "allow"
+    assert "windowed_evaluation" in d.reasons
+
+
+def test_ingress_cap_still_blocks(windowed):
+    d = windowed.evaluate("a " * 3000)
+    assert d.action == "block"
+    assert "text_exceeds_max_len_5000" in d.reasons
+
+
+def test_redactions_merge_across_windows(windowed):
+    text = "mail a.b@example.com " + "today I walked home " * 40 + "call 555-123-4567 or c.d@example.org"
+    d = windowed.evaluate(text)
+    assert d.action == "redact"
+    assert d.redactions == {"email": 2, "phone": 1}
+    assert d.text == windowed._redact_pii(text)[0]
+
+
+def test_redaction_is_bounded_by_the_windows(monkeypatch):
+    windowing = MappingProxyType({"window_chars": 8192, "overlap_chars": 256, "max_input_chars": 1_048_576})
+    monkeypatch.setattr(s, "_policy", replace(s._policy, windowing=windowing))
+    start = time.perf_counter()
+    d = SafetyGuard().evaluate("a." * 50_000 + "@b")  # quadratic for an unbounded email scan
+    assert d.action == "allow" and time.perf_counter() - start < 3.0
+
+
+def test_stops_at_first_blocking_window(windowed, monkeypatch):
+    calls = []
+    locate = windowed._SCANNER.locate
+    monkeypatch.setattr(windowed, "_SCANNER", type("Spy", (), {"locate": lambda self, t: calls.append(t) or locate(t)})())
+    d = windowed.evaluate("how to make a bomb " + "today I walked home " * 40)
+    assert d.action == "block" and "explicit_violence" in d.categories
+    assert len(calls) == 1
+
+
+def test_self_harm_after_a_blocking_window_is_still_seen(windowed):
+    text = "child porn links " + "today I walked home " * 40 + "I want to kill myself, skip my meds"
+    d = windowed.evaluate(text)
+    assert d.action == "block" and {"sexual_minors", "self_harm"} <= set(d.categories)
+    assert d.risk["risk"] == "high" and d.meta["risk_resources_shown"] is True
+    assert "medical_risk_advice" not in d.scan.hits and d.scan.partial  # only risk categories were sought
+
+
+@settings(max_examples=200, deadline=None)
+@given(st.lists(st.sampled_from(_WORDS), min_size=1, max_size=80), st.sampled_from([" ", "\n", "  "]))
+def test_windows_see_what_the_full_scan_sees(words, sep):
+    guard = SafetyGuard()
+    text = sep.join(words)
+    full = guard._SCANNER.scan(text) - {"hate_threat", "unsafe_drug"}  # co-occurrence is per window
+    got = guard._scan_windows(text, _SMALL) - {"hate_threat", "unsafe_drug"}
+    if full.intersection(SafetyGuard._STOP_CATEGORIES):
+        assert got.intersection(SafetyGuard._STOP_CATEGORIES)
+        assert s._risk_from_hits(got) == s._risk_from_hits(full)
+    else:
+        assert got == full
+
+
+@given(st.text(alphabet="ab \n", max_size=600))
+def test_windows_cover_and_overlap(text):
+    bounds = list(_windows(text, 64, 16))
+    assert bounds[0][0] == 0 and bounds[-1][1] == len(text)
+    for (a, b), (c, _) in zip(bounds, bounds[1:]):
+        assert a < c <= b - 16
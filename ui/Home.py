@@ -3,6 +3,7 @@
 import sys
 from pathlib import Path
 from app.safety.safety import needs_consent, get_consent_text, record_consent
+from app.safety.resources import crisis_resources
 from app.observability import metrics
 
 USER_ID = "local_user"  # later we’ll store real IDs
@@ -62,31 +63,19 @@ if st.button("Send"):
                 for item in v:
                     st.write(f"- {item}")
 
-    # Risk resources (if any)
-    resources = out.get("resources")
-    if resources:
+    # Risk resources (if any) -- same registry the guard and the pipeline render from
+    if out.get("resources") or (out.get("reply") or {}).get("resources"):
         st.subheader("Crisis Resources (India)")
-        # Render as a simple table
-        rows = []
-        for r in resources:
-            rows.append({
-                "Name": r.get("name", ""),
-                "Type": r.get("type", ""),
-                "Phone": r.get("phone", ""),
-                "URL": r.get("url", ""),
-                "Notes": r.get("notes", ""),
-            })
+        helplines = crisis_resources.items()
         # lightweight table rendering without pandas dependency in UI
+        rows = []
+        for line in helplines:
+            name, _, phone = line.partition(": ")
+            rows.append({"Name": name, "Phone": phone})
         st.table(rows)
 
         # Copyable helplines text
-        helplines_text = []
-        for r in resources:
-            line = f"{r.get('name','')} — {r.get('phone','').strip()} {r.get('url','')}".strip()
-            helplines_text.append(line)
-        helplines_blob = "\n".join(helplines_text).strip()
-
-        st.text_area("Copy helplines", value=helplines_blob, height=120)
+        st.text_area("Copy helplines", value="\n".join(helplines), height=120)
 
     # Debug / meta
     with st.expander("Details"):